@@ -0,0 +1,291 @@
+import asyncio
+import hashlib
+import math
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from metrics import Counter, Gauge, Histogram
+
+# Retry-After is never suggested further out than this
+MAX_RETRY_AFTER = 60
+
+ADMITTED_IN_FLIGHT = Gauge("jobmatch_admission_in_flight", "Requests holding an admission slot", ["lane"])
+ADMISSION_QUEUED = Gauge("jobmatch_admission_queued", "Requests waiting for an admission slot", ["lane"])
+ADMISSION_WAIT_SECONDS = Histogram(
+    "jobmatch_admission_wait_seconds", "Time admitted requests spent waiting for a slot", ["lane"]
+)
+ADMISSION_REJECTED = Counter(
+    "jobmatch_admission_rejected_total",
+    "Requests shed by admission control, by reason (queue_full, client_queue_full, queue_timeout)",
+    ["lane", "reason"]
+)
+
+
+class Rejected(Exception):
+    """A request turned away by a lane: answered with `status` and a Retry-After"""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lane:
+    """A concurrency limit with a bounded wait queue, served round-robin across clients
+
+    At most `concurrency` requests hold a slot. Up to `queue_size` more wait,
+    no more than `per_client` of them from one client. When a slot frees up
+    it goes to the next client in turn, so one client sending a burst cannot
+    push everyone else's requests to the back of the queue.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, per_client: int, timeout: float):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.per_client = per_client
+        self.timeout = timeout
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        # Waiters per client, in the order clients take their turn
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        # Moving average of how long a request holds its slot, for Retry-After
+        self._service_time = 1.0
+        self._in_flight = ADMITTED_IN_FLIGHT.labels(name)
+        self._queued = ADMISSION_QUEUED.labels(name)
+        self._wait = ADMISSION_WAIT_SECONDS.labels(name)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the queue ahead drained at the current pace"""
+        estimate = self._service_time * (self.queued + 1) / self.concurrency
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(estimate)))
+
+    def _reject(self, status: int, reason: str) -> Rejected:
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        return Rejected(status, reason, self.retry_after())
+
+    async def acquire(self, client: str):
+        """Take a slot, waiting in the client's queue if needed; raises Rejected"""
+        if self.active < self.concurrency and self.queued == 0:
+            self._take()
+            return
+        if self.queued >= self.queue_size:
+            raise self._reject(503, "queue_full")
+        waiters = self._waiting.get(client)
+        if waiters is not None and len(waiters) >= self.per_client:
+            raise self._reject(429, "client_queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(client, deque()).append(waiter)
+        self.queued += 1
+        self._queued.inc()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            self._forget(client, waiter)
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(503, "queue_timeout")
+            raise
+        self._wait.observe(time.perf_counter() - start)
+
+    def release(self, held: Optional[float] = None):
+        """Give a slot back (`held` seconds after it was taken) and hand it to the next client in turn"""
+        if held is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * held
+        self.active -= 1
+        self._in_flight.dec()
+        while self._waiting:
+            client, waiters = next(iter(self._waiting.items()))
+            waiter = waiters.popleft()
+            self._dequeued()
+            if waiters:
+                self._waiting.move_to_end(client)
+            else:
+                del self._waiting[client]
+            if not waiter.done():
+                self._take()
+                waiter.set_result(None)
+                return
+
+    def _take(self):
+        self.active += 1
+        self._in_flight.inc()
+
+    def _dequeued(self):
+        self.queued -= 1
+        self._queued.dec()
+
+    def _forget(self, client: str, waiter: asyncio.Future):
+        waiters = self._waiting.get(client)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self._dequeued()
+        if not waiters:
+            del self._waiting[client]
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queued": self.queued,
+            "queue_size": self.queue_size,
+            "clients_waiting": len(self._waiting),
+            "rejected": self.rejected,
+            "retry_after": self.retry_after()
+        }
+
+
+def _lane_from_env(name: str, concurrency: int, queue_size: int) -> Lane:
+    prefix = f"ADMISSION_{name.upper()}"
+    return Lane(
+        name,
+        int(os.environ.get(f"{prefix}_CONCURRENCY", str(concurrency))),
+        int(os.environ.get(f"{prefix}_QUEUE", str(queue_size))),
+        int(os.environ.get("ADMISSION_PER_CLIENT_QUEUE", "4")),
+        float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "15"))
+    )
+
+
+class AdmissionController:
+    """Lanes for the expensive routes; everything else is never queued
+
+    Listings, downloads, polling, health and metrics don't go through a lane,
+    so analysis traffic can't starve them. Lanes are per worker, and exist
+    once `configure` has sized them; until then nothing is limited.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+        # Digests of the API keys clients may be told apart by; other keys are ignored
+        self.api_keys = {
+            _key_digest(key.strip().encode("latin-1"))
+            for key in os.environ.get("ADMISSION_API_KEYS", "").split(",") if key.strip()
+        }
+        self.lanes: Dict[str, Lane] = {}
+        self.routes: List[Tuple[str, "re.Pattern", str]] = [
+            ("POST", re.compile(r"^/(?:analyze-job-match/(?:stream)?|process-document/[^/]+)$"), "analysis"),
+            ("POST", re.compile(r"^/batch-analyze/$"), "batch"),
+            ("POST", re.compile(r"^/(?:upload-resume/|upload-job-description/)$"), "upload"),
+            ("POST", re.compile(r"^/analysis-tasks/$"), "tasks"),
+        ]
+        self.reserved_threads = 0
+
+    def configure(self, io_threads: int, batch_concurrency: int, task_workers: int):
+        """Size the lanes from the I/O thread pool
+
+        Every admitted analysis, upload part and task submission holds an I/O
+        thread, a batch holds up to `batch_concurrency`, and the task workers
+        hold `task_workers` more. Defaults split what is left after
+        ADMISSION_RESERVED_IO_THREADS, so listings and downloads always find
+        a free thread; settings that overcommit the pool are reported.
+        """
+        self.reserved_threads = int(os.environ.get("ADMISSION_RESERVED_IO_THREADS", str(max(4, io_threads // 8))))
+        budget = max(4, io_threads - self.reserved_threads - task_workers)
+        analysis = max(1, budget // 3)
+        batch = max(1, budget // 4 // batch_concurrency)
+        # Submitting a task is a quick SQLite insert; the work runs on the task workers
+        tasks = 2
+        upload = max(1, budget - analysis - batch * batch_concurrency - tasks)
+        self.lanes = {
+            "analysis": _lane_from_env("analysis", analysis, 32),
+            "batch": _lane_from_env("batch", batch, 8),
+            "upload": _lane_from_env("upload", upload, 64),
+            "tasks": _lane_from_env("tasks", tasks, 64),
+        }
+        threads = sum(
+            lane.concurrency * (batch_concurrency if name == "batch" else 1) for name, lane in self.lanes.items()
+        ) + task_workers
+        if self.enabled and threads > io_threads - self.reserved_threads:
+            print(f"Admission lanes can hold {threads} I/O threads, more than the {io_threads} in "
+                  f"IO_THREAD_POOL_SIZE less {self.reserved_threads} reserved; listings and downloads may wait")
+
+    def lane_for(self, method: str, path: str) -> Optional[Lane]:
+        for route_method, pattern, name in self.routes:
+            if method == route_method and pattern.match(path):
+                return self.lanes.get(name)
+        return None
+
+    def client_key(self, scope) -> str:
+        """Who a request counts against: a known API key if it sends one, otherwise its IP
+
+        Behind a proxy the IP is only the client's if uvicorn trusts the proxy's
+        X-Forwarded-For (FORWARDED_ALLOW_IPS); otherwise every request shares
+        the proxy's address.
+        """
+        api_key = dict(scope["headers"]).get(b"x-api-key")
+        if api_key and self.api_keys:
+            digest = _key_digest(api_key)
+            if digest in self.api_keys:
+                return f"key:{digest}"
+        client = scope.get("client")
+        return f"ip:{client[0]}" if client else "ip:unknown"
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "reserved_io_threads": self.reserved_threads,
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()}
+        }
+
+
+def _key_digest(api_key: bytes) -> str:
+    # Only digests are kept, so keys don't sit in memory in the clear
+    return hashlib.sha256(api_key).hexdigest()[:16]
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting expensive requests through their lane
+
+    A request waits for a slot, then holds it until its response is fully
+    sent (SSE streams included). When its lane's queue is full, the client
+    already has too many requests waiting, or the wait runs past
+    ADMISSION_QUEUE_TIMEOUT, it is answered straight away with 503 (or 429
+    for a client over its share) and a Retry-After.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        lane = self.controller.lane_for(scope["method"], scope["path"])
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await lane.acquire(self.controller.client_key(scope))
+        except Rejected as rejection:
+            detail = (
+                "Too many of your requests are already waiting; retry later"
+                if rejection.status == 429 else "Server is busy; retry later"
+            )
+            response = JSONResponse(
+                status_code=rejection.status,
+                content={"detail": detail, "reason": rejection.reason, "lane": lane.name},
+                headers={"Retry-After": str(rejection.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release(time.perf_counter() - start)
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from metrics import count_cache
+
+DEFAULT_CACHE_PATH = "uploads/analysis_cache.db"
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of extracted document text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """Durable store of analysis results keyed by both texts, model and prompt version
+
+    Backed by SQLite; anything offering get/put/invalidate with the same
+    signatures can stand in for it.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        self.db_path = db_path or os.environ.get("ANALYSIS_CACHE_PATH", DEFAULT_CACHE_PATH)
+        # 0 keeps results until they are invalidated explicitly
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(
+            os.environ.get("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600))
+        )
+        self.hits = 0
+        self.misses = 0
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    resume_hash TEXT NOT NULL,
+                    job_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    expires REAL,
+                    PRIMARY KEY (resume_hash, job_hash, model, prompt_version)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_job ON analyses (job_hash)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, resume_text: str, job_text: str, model: str,
+            prompt_version: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for this pair, or None if missing or expired"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM analyses "
+                "WHERE resume_hash = ? AND job_hash = ? AND model = ? AND prompt_version = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (text_hash(resume_text), text_hash(job_text), model, prompt_version, time.time())
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            count_cache("analysis", False)
+            return None
+        self.hits += 1
+        count_cache("analysis", True)
+        return json.loads(row[0])
+
+    def put(self, resume_text: str, job_text: str, model: str, prompt_version: str,
+            result: Dict[str, Any]):
+        """Store a result for this pair, replacing any previous one"""
+        now = time.time()
+        expires = now + self.ttl_seconds if self.ttl_seconds else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses "
+                "(resume_hash, job_hash, model, prompt_version, result, created, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (text_hash(resume_text), text_hash(job_text), model, prompt_version,
+                 json.dumps(result), now, expires)
+            )
+
+    def invalidate(self, resume_hash: Optional[str] = None, job_hash: Optional[str] = None,
+                   model: Optional[str] = None, prompt_version: Optional[str] = None) -> int:
+        """Delete cached results matching every given field; no fields clears everything"""
+        clauses = []
+        params = []
+        for column, value in (("resume_hash", resume_hash), ("job_hash", job_hash),
+                              ("model", model), ("prompt_version", prompt_version)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            return conn.execute(f"DELETE FROM analyses{where}", params).rowcount
+
+    def purge_expired(self) -> int:
+        """Delete results past their TTL"""
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM analyses WHERE expires IS NOT NULL AND expires <= ?", (time.time(),)
+            ).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and the number of stored results"""
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "ttl_seconds": self.ttl_seconds}
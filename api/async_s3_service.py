@@ -0,0 +1,166 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+import s3_operations as operations
+from concurrency import run_io
+from metadata_index import MetadataIndex
+from s3_operations import CALL, EACH, INDEX, LIST, READ, Operation, S3Request
+from s3_service import get_bucket_name, get_client_kwargs
+
+
+class AsyncS3Service:
+    """aiobotocore implementation of the S3Service interface
+
+    The client and its connection pool are created on first use inside the
+    running event loop and shared by every request on the worker.
+    """
+
+    def __init__(self):
+        self.bucket_name = get_bucket_name()
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._client = None
+        self._client_lock = asyncio.Lock()
+        self.metadata_index = MetadataIndex()
+
+    async def _get_client(self):
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    from aiobotocore.session import get_session
+                    exit_stack = AsyncExitStack()
+                    self._client = await exit_stack.enter_async_context(
+                        get_session().create_client('s3', **get_client_kwargs())
+                    )
+                    self._exit_stack = exit_stack
+        return self._client
+
+    @property
+    def client_ready(self) -> bool:
+        return self._client is not None
+
+    async def warm_up(self):
+        """Create the client ahead of the first request"""
+        await self._get_client()
+
+    async def close(self):
+        """Close the client and its connection pool"""
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self._client = None
+
+    async def _run(self, operation: Operation) -> Any:
+        """Drive a shared operation, awaiting each step on the shared client"""
+        result, error = None, None
+        while True:
+            try:
+                request = operation.throw(error) if error else operation.send(result)
+            except StopIteration as done:
+                return done.value
+            try:
+                result, error = await self._serve(request), None
+            except ClientError as e:
+                result, error = None, e
+
+    async def _serve(self, request: S3Request) -> Any:
+        if request.kind == INDEX:
+            return await run_io(request.target, *request.args, **request.kwargs)
+        client = await self._get_client()
+        if request.kind == CALL:
+            return await getattr(client, request.target)(**request.kwargs)
+        if request.kind == READ:
+            response = await client.get_object(**request.kwargs)
+            async with response['Body'] as stream:
+                return await stream.read()
+        if request.kind == LIST:
+            objects = []
+            async for page in client.get_paginator('list_objects_v2').paginate(**request.kwargs):
+                objects.extend(page.get('Contents', []))
+            return objects
+        if request.kind == EACH:
+            return await asyncio.gather(*(self._serve_or_error(call) for call in request.target))
+        raise ValueError(f"Unknown S3 request: {request.kind}")
+
+    async def _serve_or_error(self, request: S3Request) -> Any:
+        try:
+            return await self._serve(request)
+        except ClientError as e:
+            return e
+
+    async def upload_file(self, file_content: bytes, s3_key: str,
+                          original_filename: str, file_type: str, content_hash: Optional[str] = None) -> Dict:
+        """Upload file to S3 with metadata"""
+        return await self._run(operations.upload_file(
+            self.bucket_name, self.metadata_index, file_content, s3_key, original_filename, file_type, content_hash
+        ))
+
+    async def start_multipart_upload(self, s3_key: str, original_filename: str, file_type: str) -> str:
+        """Begin a multipart upload with the same metadata as upload_file; returns the upload id"""
+        return await self._run(operations.start_multipart_upload(self.bucket_name, s3_key, original_filename, file_type))
+
+    async def upload_part(self, s3_key: str, upload_id: str, part_number: int, body: bytes) -> Dict:
+        """Upload one part (at least 5MB, except the last) of a multipart upload"""
+        return await self._run(operations.upload_part(self.bucket_name, s3_key, upload_id, part_number, body))
+
+    async def complete_multipart_upload(self, s3_key: str, upload_id: str, parts: List[Dict],
+                                        original_filename: str, file_type: str, size: int,
+                                        content_hash: Optional[str] = None) -> Dict:
+        """Finish a multipart upload and index it; returns the same shape as upload_file"""
+        return await self._run(operations.complete_multipart_upload(
+            self.bucket_name, self.metadata_index, s3_key, upload_id, parts,
+            original_filename, file_type, size, content_hash
+        ))
+
+    async def abort_multipart_upload(self, s3_key: str, upload_id: str):
+        """Discard an unfinished multipart upload and its parts"""
+        await self._run(operations.abort_multipart_upload(self.bucket_name, s3_key, upload_id))
+
+    async def find_duplicate(self, prefix: str, content_hash: str) -> Optional[Dict]:
+        """An existing document under prefix with this SHA-256, confirmed to still be in S3"""
+        return await self._run(operations.find_duplicate(self.bucket_name, self.metadata_index, prefix, content_hash))
+
+    async def create_upload_url(self, s3_key: str, original_filename: str, file_type: str,
+                                size: int, expires_in: int, content_hash: Optional[str] = None) -> Dict:
+        """Presigned PUT for a browser upload straight to S3 (see s3_operations.create_upload_url)"""
+        return await self._run(operations.create_upload_url(
+            self.bucket_name, s3_key, original_filename, file_type, size, expires_in, content_hash
+        ))
+
+    async def create_download_url(self, s3_key: str, download_name: str, expires_in: int) -> str:
+        """Presigned GET that downloads the object as an attachment named download_name"""
+        return await self._run(operations.create_download_url(self.bucket_name, s3_key, download_name, expires_in))
+
+    async def register_upload(self, s3_key: str, file_type: str) -> Optional[Dict]:
+        """Index an object uploaded directly to S3; None if it isn't there"""
+        return await self._run(operations.register_upload(self.bucket_name, self.metadata_index, s3_key, file_type))
+
+    async def read_range(self, s3_key: str, length: int) -> bytes:
+        """The first `length` bytes of an object"""
+        return await self._run(operations.read_range(self.bucket_name, s3_key, length))
+
+    async def list_files(self, prefix: str) -> List[Dict]:
+        """List files in S3 with metadata from the local index; unindexed objects are described concurrently"""
+        return await self._run(operations.list_files(self.bucket_name, self.metadata_index, prefix))
+
+    async def reconcile_index(self, prefix: str, rebuild: bool = False) -> Dict[str, int]:
+        """Bring the metadata index for a prefix in line with the bucket"""
+        return await self._run(operations.reconcile_index(self.bucket_name, self.metadata_index, prefix, rebuild))
+
+    async def download_file(self, s3_key: str) -> bytes:
+        """Download file from S3"""
+        return await self._run(operations.download_file(self.bucket_name, s3_key))
+
+    async def put_artifact(self, s3_key: str, body: bytes, content_type: str = 'application/json'):
+        """Store a derived object; artifacts are not indexed or listed"""
+        await self._run(operations.put_artifact(self.bucket_name, s3_key, body, content_type))
+
+    async def get_artifact(self, s3_key: str) -> Optional[bytes]:
+        """Return a derived object's bytes, or None if it doesn't exist"""
+        return await self._run(operations.get_artifact(self.bucket_name, s3_key))
+
+    async def delete_file(self, s3_key: str) -> bool:
+        """Delete file from S3"""
+        return await self._run(operations.delete_file(self.bucket_name, self.metadata_index, s3_key))
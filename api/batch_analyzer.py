@@ -0,0 +1,198 @@
+import asyncio
+import os
+import random
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from concurrency import run_io
+
+# The OpenAI SDK is slow to import; it is loaded with the client, on the first analysis
+if TYPE_CHECKING:
+    import openai
+
+
+class TokenBucket:
+    """Async token bucket: `capacity` tokens, refilled continuously at `rate` per second"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until `amount` tokens are available and take them"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits, plus a shared pause after 429s"""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        rpm = requests_per_minute or int(os.environ.get("OPENAI_RPM_LIMIT", "500"))
+        tpm = tokens_per_minute or int(os.environ.get("OPENAI_TPM_LIMIT", "200000"))
+        self.requests = TokenBucket(rpm, rpm / 60)
+        self.tokens = TokenBucket(tpm, tpm / 60)
+        self._paused_until = 0.0
+        self.rate_limited = 0
+
+    def pause(self, seconds: float):
+        """Hold back every caller for `seconds`, e.g. after a 429 with Retry-After"""
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, estimated_tokens: int):
+        """Wait for any pause to lapse, then for request and token budget"""
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+
+
+def retry_after_seconds(error: "openai.RateLimitError", attempt: int) -> float:
+    """Delay requested by a 429, falling back to exponential backoff with jitter"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+
+class BatchAnalyzer:
+    """Analyze one resume against many jobs concurrently within OpenAI rate limits"""
+
+    def __init__(self, job_matcher, rate_limiter: RateLimiter,
+                 max_concurrency: Optional[int] = None, max_retries: Optional[int] = None):
+        self.job_matcher = job_matcher
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency or int(os.environ.get("BATCH_MAX_CONCURRENCY", "5"))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("BATCH_MAX_RETRIES", "5"))
+        # Shared by every batch on the worker, so concurrent batches don't multiply the parallelism
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Jobs a packed call didn't return a valid result for
+        self.packed_retries = 0
+
+    async def _call_with_retries(self, estimated_tokens: int, fn, *args):
+        """Run one OpenAI-backed call within the rate limits, retrying 429s after their Retry-After"""
+        import openai
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                await self.rate_limiter.acquire(estimated_tokens)
+                try:
+                    return await run_io(fn, *args, raise_on_rate_limit=True)
+                except openai.RateLimitError as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    self.rate_limiter.pause(retry_after_seconds(e, attempt))
+                    attempt += 1
+
+    async def _analyze_one(self, resume_text: str, job_text: str) -> Dict[str, Any]:
+        import openai
+        cached = await run_io(self.job_matcher.get_cached, resume_text, job_text)
+        if cached is not None:
+            return cached
+
+        try:
+            return await self._call_with_retries(
+                self.job_matcher.estimate_tokens(resume_text, job_text),
+                self.job_matcher.analyze_job_match, resume_text, job_text
+            )
+        except openai.RateLimitError as e:
+            return self.job_matcher.fallback_result(resume_text, job_text, e)
+
+    async def _analyze_group(self, resume_text: str, job_texts: List[str]) -> List[Dict[str, Any]]:
+        """One packed call for several jobs; entries it couldn't produce are analyzed on their own"""
+        import openai
+        if len(job_texts) == 1:
+            return [await self._analyze_one(resume_text, job_texts[0])]
+        try:
+            packed = await self._call_with_retries(
+                self.job_matcher.estimate_packed_tokens(resume_text, job_texts),
+                self.job_matcher.analyze_packed, resume_text, job_texts
+            )
+        except openai.RateLimitError:
+            packed = [None] * len(job_texts)
+        retry = [index for index, result in enumerate(packed) if result is None]
+        self.packed_retries += len(retry)
+        retried = await asyncio.gather(*(self._analyze_one(resume_text, job_texts[index]) for index in retry))
+        for index, result in zip(retry, retried):
+            packed[index] = result
+        return packed
+
+    async def _analyze_packed(self, resume_text: str, job_texts: List[str]) -> List[Dict[str, Any]]:
+        cached = await asyncio.gather(
+            *(run_io(self.job_matcher.get_cached, resume_text, job_text, packed=True) for job_text in job_texts)
+        )
+        results: List[Optional[Dict[str, Any]]] = list(cached)
+        pending = [index for index, result in enumerate(cached) if result is None]
+        if not pending:
+            return results
+
+        groups = self.job_matcher.pack_jobs(resume_text, [job_texts[index] for index in pending])
+        group_results = await asyncio.gather(*(
+            self._analyze_group(resume_text, [job_texts[pending[i]] for i in group]) for group in groups
+        ))
+        for group, analyses in zip(groups, group_results):
+            for i, analysis in zip(group, analyses):
+                results[pending[i]] = analysis
+        return results
+
+    async def analyze(self, resume_text: str, job_descriptions: List[Dict[str, str]],
+                      fast: bool = False, packed: bool = False) -> List[Dict[str, Any]]:
+        """
+        Analyze one resume against multiple job descriptions
+
+        Args:
+            resume_text: The candidate's resume text
+            job_descriptions: Job descriptions with "text" and optional "title",
+                "filename" and "company"
+            fast: Score locally by skill overlap instead of calling OpenAI
+            packed: Send several jobs per OpenAI call, so the instructions and
+                resume are sent once per group instead of once per job
+
+        Returns:
+            List of analysis results, sorted by match score
+        """
+        job_texts = [job.get("text", "") for job in job_descriptions]
+        if fast:
+            analyses = [self.job_matcher.quick_score(resume_text, job_text) for job_text in job_texts]
+        elif packed:
+            analyses = await self._analyze_packed(resume_text, job_texts)
+        else:
+            analyses = await asyncio.gather(
+                *(self._analyze_one(resume_text, job_text) for job_text in job_texts)
+            )
+
+        results = []
+        for job_data, analysis in zip(job_descriptions, analyses):
+            analysis = dict(analysis)
+            analysis.update({
+                "job_title": job_data.get("title", "Unknown Position"),
+                "job_filename": job_data.get("filename", ""),
+                "company": job_data.get("company", "Not specified")
+            })
+            results.append(analysis)
+
+        # One sort once everything is in (highest score first)
+        results.sort(key=lambda x: x.get("match_score", 0), reverse=True)
+        return results
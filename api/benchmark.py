@@ -0,0 +1,620 @@
+"""
+Offline end-to-end benchmark: throughput, latency and memory per endpoint.
+
+Starts the API under uvicorn against a local S3 stand-in (moto server) and a
+fake OpenAI-compatible server with configurable latency and error rates,
+uploads a generated corpus of PDF/DOCX/TXT resumes and job descriptions, then
+drives upload, list, process-document and analyze traffic at a fixed
+concurrency. Reports req/s, p50/p95/p99 latency and the API process's peak RSS
+per scenario, and writes everything to a JSON file so runs can be compared.
+
+Needs moto with its server extra (pip install "moto[server]") unless
+--s3-endpoint points at another S3-compatible store.
+
+Usage:
+    python benchmark.py                                   # all scenarios, defaults
+    python benchmark.py --concurrency 32 --requests 400 --scenarios upload,list
+    python benchmark.py --llm-latency 2 --llm-error-rate 0.05 --app-env S3_BACKEND=aiobotocore
+    python benchmark.py --compare benchmark-results/before.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from skill_scorer import SKILLS
+
+SCENARIOS = ("upload", "list", "process", "analyze")
+API_DIR = Path(__file__).resolve().parent
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- Corpus -------------------------------------------------------------------
+
+ROLES = ["Backend Engineer", "Data Scientist", "Frontend Developer", "DevOps Engineer",
+         "Machine Learning Engineer", "Product Manager", "Full Stack Developer", "Data Engineer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Hooli", "Stark Industries", "Wayne Tech"]
+DEGREES = ["Bachelor of Science in Computer Science", "Master of Science in Data Science",
+           "Bachelor of Engineering", "PhD in Machine Learning", "BSc in Mathematics"]
+VERBS = ["Built", "Designed", "Led", "Maintained", "Migrated", "Optimized", "Shipped", "Scaled"]
+
+
+def resume_text(rng: random.Random, paragraphs: int) -> str:
+    skills = rng.sample(list(SKILLS), 12)
+    lines = [f"{rng.choice(['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan'])} {rng.choice(['Lee', 'Kim', 'Patel', 'Garcia'])}",
+             f"{rng.choice(ROLES)} | {rng.randint(1, 15)} years of experience", "",
+             "Summary", f"{rng.choice(ROLES)} focused on {skills[0]} and {skills[1]}.", "",
+             "Skills", ", ".join(skills), "", "Experience"]
+    for _ in range(paragraphs):
+        lines.append(f"{rng.choice(ROLES)}, {rng.choice(COMPANIES)} ({rng.randint(2010, 2020)} - {rng.randint(2021, 2025)})")
+        for _ in range(4):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(skills)} services handling "
+                         f"{rng.randint(1, 900)}k requests per day with {rng.choice(skills)}")
+    lines += ["", "Education", rng.choice(DEGREES)]
+    return "\n".join(lines)
+
+
+def job_text(rng: random.Random, paragraphs: int) -> str:
+    skills = rng.sample(list(SKILLS), 10)
+    lines = [f"{rng.choice(ROLES)} at {rng.choice(COMPANIES)}", "",
+             "Responsibilities"]
+    for _ in range(paragraphs):
+        lines.append(f"- {rng.choice(VERBS)} and operate systems built on {rng.choice(skills)}")
+    lines += ["", "Requirements", f"- {rng.randint(2, 8)}+ years of experience",
+              *(f"- Strong {skill} skills" for skill in skills[:6]),
+              f"- {rng.choice(DEGREES)} or equivalent", "",
+              "Nice to have", *(f"- {skill}" for skill in skills[6:]), "",
+              "Benefits", "- Remote friendly, learning budget, health insurance"]
+    return "\n".join(lines)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace").decode("latin-1")
+
+
+def make_pdf(text: str, lines_per_page: int = 45) -> bytes:
+    """A minimal text PDF (Helvetica, one content stream per page) without a PDF library"""
+    lines = text.splitlines() or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+    objects: List[bytes] = []
+    page_ids = [3 + 2 * i for i in range(len(pages))]
+    font_id = 3 + 2 * len(pages)
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(pages)} >>".encode())
+    for page_id, page_lines in zip(page_ids, pages):
+        body = "BT /F1 10 Tf 14 TL 50 780 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in page_lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {page_id + 1} 0 R "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(text: str) -> bytes:
+    from docx import Document
+    document = Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def render(text: str, extension: str) -> bytes:
+    if extension == ".pdf":
+        return make_pdf(text)
+    if extension == ".docx":
+        return make_docx(text)
+    return text.encode("utf-8")
+
+
+def generate_corpus(seed: int, count: int, paragraphs: int) -> Dict[str, List[Dict[str, Any]]]:
+    """`count` resumes and job descriptions, cycling through PDF, DOCX and TXT"""
+    rng = random.Random(seed)
+    extensions = [".pdf", ".docx", ".txt"]
+    corpus: Dict[str, List[Dict[str, Any]]] = {"resume": [], "job_description": []}
+    for i in range(count):
+        extension = extensions[i % len(extensions)]
+        corpus["resume"].append({"name": f"resume_{i}{extension}", "text": resume_text(rng, paragraphs)})
+        corpus["job_description"].append({"name": f"job_{i}{extension}", "text": job_text(rng, paragraphs)})
+    for documents in corpus.values():
+        for document in documents:
+            document["content"] = render(document["text"], Path(document["name"]).suffix)
+    return corpus
+
+
+# --- Stand-ins ----------------------------------------------------------------
+
+def fake_analysis(rng: random.Random) -> Dict[str, Any]:
+    score = rng.randint(20, 95)
+    return {
+        "recommendation": "APPLY" if score >= 70 else "DECENT_CHANCE" if score >= 40 else "AVOID",
+        "match_score": score,
+        "confidence_score": rng.randint(60, 95),
+        "strengths": ["Relevant experience", "Strong Python skills"],
+        "weaknesses": ["Limited Kubernetes experience"],
+        "missing_skills": ["Kubernetes"],
+        "experience_match": "Experience level matches the requirements",
+        "education_match": "Education meets the requirements",
+        "detailed_reasoning": "Benchmark stand-in analysis. " * 20
+    }
+
+
+def create_fake_openai_app(latency: float, jitter: float, error_rate: float, rate_limit_rate: float,
+                           seed: int):
+    """OpenAI-compatible /v1/chat/completions answering with canned analyses"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI()
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(max(0.0, rng.gauss(latency, jitter)))
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(status_code=429, headers={"retry-after": "1"},
+                                content={"error": {"message": "Rate limit reached", "type": "requests"}})
+        if roll < rate_limit_rate + error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Injected failure", "type": "server_error"}})
+
+        prompt = body["messages"][-1]["content"]
+        # Packed prompts label their jobs J1, J2, ...
+        job_ids = re.findall(r'JOB "(J\d+)":', prompt)
+        if job_ids:
+            content = json.dumps({"results": [{"job_id": job_id, **fake_analysis(rng)} for job_id in job_ids]})
+        else:
+            content = json.dumps(fake_analysis(rng))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                 "total_tokens": (len(prompt) + len(content)) // 4}
+
+        if body.get("stream"):
+            async def chunks():
+                for start in range(0, len(content), 40):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                             "model": body["model"],
+                             "choices": [{"index": 0, "delta": {"content": content[start:start + 40]},
+                                          "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                done = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": body["model"], "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                yield f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n"
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        return {
+            "id": completion_id, "object": "chat.completion", "created": created, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app, stats
+
+
+class ThreadedServer:
+    """A uvicorn server on a background thread"""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def start_moto(port: int):
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit('❌ moto is not installed: pip install "moto[server]", or pass --s3-endpoint')
+    # moto serves through werkzeug, which logs every request
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    return server
+
+
+def create_bucket(endpoint: str, bucket: str, env: Dict[str, str]):
+    import boto3
+    client = boto3.client(
+        "s3", endpoint_url=endpoint, region_name=env["AWS_REGION"],
+        aws_access_key_id=env["AWS_ACCESS_KEY_ID"], aws_secret_access_key=env["AWS_SECRET_ACCESS_KEY"]
+    )
+    try:
+        client.create_bucket(Bucket=bucket)
+    except client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+
+# --- API process --------------------------------------------------------------
+
+def read_rss_kb(pid: int, field: str = "VmRSS") -> Optional[int]:
+    """Resident set size of a process from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class RSSSampler:
+    """Track the peak RSS of a process while a scenario runs"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self):
+        while True:
+            rss = read_rss_kb(self.pid)
+            if rss is not None:
+                self.peak_kb = max(self.peak_kb or 0, rss)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        if self.pid is not None:
+            self._task = asyncio.get_running_loop().create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc):
+        if self._task is not None:
+            self._task.cancel()
+
+
+def start_api(port: int, env: Dict[str, str], log_path: Path) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=API_DIR, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, process: Optional[subprocess.Popen], timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API did not become ready")
+
+
+# --- Scenarios ----------------------------------------------------------------
+
+async def run_scenario(name: str, requests: int, concurrency: int, pid: Optional[int],
+                       make_request: Callable[[int], Awaitable[httpx.Response]],
+                       outcome: Optional[Callable[[httpx.Response], str]] = None) -> Dict[str, Any]:
+    """Send `requests` requests with `concurrency` in flight and summarize them
+
+    `outcome` labels successful responses (e.g. analyses that fell back to the
+    local scorer) so degraded-but-200 answers show up in the results.
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    outcomes: Dict[str, int] = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                response = await make_request(index)
+                status = str(response.status_code)
+                if outcome is not None and response.is_success:
+                    label = outcome(response)
+                    outcomes[label] = outcomes.get(label, 0) + 1
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    with RSSSampler(pid) as sampler:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "statuses": statuses,
+        "outcomes": outcomes,
+        "duration_s": round(elapsed, 3),
+        "req_per_s": round(requests / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "mean": round(statistics.mean(latencies) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1)
+        },
+        "peak_rss_mb": round(sampler.peak_kb / 1024, 1) if sampler.peak_kb else None
+    }
+    latency = result["latency_ms"]
+    print(f"   {name:<8} {result['req_per_s']:>8} req/s  p50={latency['p50']}ms  p95={latency['p95']}ms  "
+          f"p99={latency['p99']}ms  errors={errors}  peak RSS={result['peak_rss_mb']}MB")
+    return result
+
+
+def unique_variant(document: Dict[str, Any], index: int) -> bytes:
+    """The document with a distinguishing line, so deduplication doesn't short-circuit uploads"""
+    text = f"{document['text']}\nReference {index}-{uuid.uuid4().hex[:8]}"
+    return render(text, Path(document["name"]).suffix)
+
+
+async def seed_documents(client: httpx.AsyncClient, corpus, concurrency: int) -> Dict[str, List[str]]:
+    """Upload the corpus once; later scenarios read and analyze these documents"""
+    routes = {"resume": "/upload-resume/", "job_description": "/upload-job-description/"}
+    keys: Dict[str, List[str]] = {"resume": [], "job_description": []}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload(doc_type: str, document: Dict[str, Any]):
+        async with semaphore:
+            response = await client.post(routes[doc_type], files={"file": (document["name"], document["content"])})
+            response.raise_for_status()
+            keys[doc_type].append(response.json()["s3_key"])
+
+    await asyncio.gather(*(upload(doc_type, document) for doc_type, documents in corpus.items()
+                           for document in documents))
+    return keys
+
+
+async def run_benchmark(args, client: httpx.AsyncClient, pid: Optional[int], corpus) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    print(f"\n📦 Seeding {len(corpus['resume'])} resumes and {len(corpus['job_description'])} job descriptions")
+    keys = await seed_documents(client, corpus, args.concurrency)
+    resumes, jobs = sorted(keys["resume"]), sorted(keys["job_description"])
+    # Let background text extraction finish so it doesn't bleed into the first scenario
+    await asyncio.sleep(args.settle)
+
+    print(f"\n📊 {args.requests} requests per scenario, concurrency {args.concurrency}")
+    for scenario in args.scenarios:
+        outcome = None
+        if scenario == "upload":
+            documents = corpus["resume"]
+            payloads = [(documents[i % len(documents)]["name"], unique_variant(documents[i % len(documents)], i))
+                        for i in range(args.requests)]
+            make_request = lambda i: client.post("/upload-resume/", files={"file": payloads[i]})
+        elif scenario == "list":
+            make_request = lambda i: client.get("/resumes/", params={"limit": 50})
+        elif scenario == "process":
+            make_request = lambda i: client.post(
+                f"/process-document/{Path(resumes[i % len(resumes)]).name}", params={"doc_type": "resume"}
+            )
+        else:
+            # Distinct pairs first, so repeats only come from the analysis cache once every pair has run
+            pairs = [(resume, job) for job in jobs for resume in resumes]
+            random.Random(args.seed).shuffle(pairs)
+            make_request = lambda i: client.post("/analyze-job-match/", data={
+                "resume_filename": pairs[i % len(pairs)][0], "job_filename": pairs[i % len(pairs)][1],
+                "mode": args.analysis_mode
+            })
+            outcome = lambda response: response.json().get("analysis", {}).get("processing_status", "unknown")
+        results[scenario] = await run_scenario(
+            scenario, args.requests, args.concurrency, pid, make_request, outcome
+        )
+    return results
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    """Print req/s and p95 changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n🔁 Compared with {baseline_path} ({baseline.get('started', '?')})")
+    for scenario, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if not before:
+            print(f"   {scenario:<8} (not in baseline)")
+            continue
+        def change(now, then):
+            return f"{(now - then) / then * 100:+.1f}%" if then else "n/a"
+        print(f"   {scenario:<8} req/s {before['req_per_s']} → {result['req_per_s']} "
+              f"({change(result['req_per_s'], before['req_per_s'])})  "
+              f"p95 {before['latency_ms']['p95']} → {result['latency_ms']['p95']}ms "
+              f"({change(result['latency_ms']['p95'], before['latency_ms']['p95'])})")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main_async(args) -> Dict[str, Any]:
+    started = datetime.now().isoformat(timespec="seconds")
+    corpus = generate_corpus(args.seed, args.corpus_size, args.paragraphs)
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+            await wait_until_ready(client, None)
+            scenarios = await run_benchmark(args, client, None, corpus)
+        return {"started": started, "target": args.base_url, "scenarios": scenarios}
+
+    workdir = Path(tempfile.mkdtemp(prefix="jobmatch-bench-"))
+    s3_endpoint = args.s3_endpoint
+    moto = None
+    if not s3_endpoint:
+        moto_port = free_port()
+        moto = start_moto(moto_port)
+        s3_endpoint = f"http://127.0.0.1:{moto_port}"
+    openai_port = free_port()
+    fake_openai_app, openai_stats = create_fake_openai_app(
+        args.llm_latency, args.llm_jitter, args.llm_error_rate, args.llm_rate_limit_rate, args.seed
+    )
+    fake_openai = ThreadedServer(fake_openai_app, openai_port)
+    fake_openai.start()
+
+    env = {
+        "S3_ENDPOINT_URL": s3_endpoint,
+        "S3_BUCKET_NAME": args.bucket,
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "AWS_REGION": "us-east-1",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        # tiktoken downloads its vocabulary on first use
+        "PROMPT_TOKENIZER": "approx",
+        "METADATA_INDEX_PATH": str(workdir / "metadata_index.db"),
+        "ANALYSIS_CACHE_PATH": str(workdir / "analysis_cache.db"),
+        "JOB_VECTOR_INDEX_PATH": str(workdir / "job_vectors.npz"),
+        "TASK_QUEUE_PATH": str(workdir / "task_queue.db"),
+    }
+    env.update(dict(item.split("=", 1) for item in args.app_env))
+    create_bucket(s3_endpoint, args.bucket, env)
+
+    api_port = free_port()
+    log_path = workdir / "api.log"
+    process = start_api(api_port, env, log_path)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", timeout=args.timeout,
+                                     limits=httpx.Limits(max_connections=args.concurrency * 2)) as client:
+            await wait_until_ready(client, process)
+            idle_rss = read_rss_kb(process.pid)
+            scenarios = await run_benchmark(args, client, process.pid, corpus)
+            overall_peak = read_rss_kb(process.pid, "VmHWM")
+    except Exception:
+        print(f"API log: {log_path}")
+        raise
+    finally:
+        process.terminate()
+        process.wait(timeout=15)
+        fake_openai.stop()
+        if moto is not None:
+            moto.stop()
+
+    print(f"\n🤖 Fake OpenAI: {openai_stats['requests']} calls, {openai_stats['errors']} injected errors, "
+          f"{openai_stats['rate_limited']} rate limited")
+    return {
+        "started": started,
+        "target": "local",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "concurrency": args.concurrency, "requests": args.requests, "corpus_size": args.corpus_size,
+            "paragraphs": args.paragraphs, "analysis_mode": args.analysis_mode, "seed": args.seed,
+            "llm_latency": args.llm_latency, "llm_jitter": args.llm_jitter,
+            "llm_error_rate": args.llm_error_rate, "llm_rate_limit_rate": args.llm_rate_limit_rate,
+            "s3": "external" if args.s3_endpoint else "moto", "app_env": dict(item.split("=", 1) for item in args.app_env)
+        },
+        "api_rss_mb": {
+            "idle": round(idle_rss / 1024, 1) if idle_rss else None,
+            "peak": round(overall_peak / 1024, 1) if overall_peak else None
+        },
+        "fake_openai": dict(openai_stats),
+        "scenarios": scenarios
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once")
+    parser.add_argument("--corpus-size", type=int, default=12, help="Resumes and job descriptions to generate (each)")
+    parser.add_argument("--paragraphs", type=int, default=6, help="Experience/responsibility blocks per document")
+    parser.add_argument("--analysis-mode", choices=["full", "fast"], default="full")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake OpenAI mean latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="Fake OpenAI latency std deviation (s)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of OpenAI calls answered 500")
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0, help="Fraction answered 429")
+    parser.add_argument("--s3-endpoint", help="Use this S3-compatible endpoint instead of starting moto")
+    parser.add_argument("--bucket", default="jobmatch-bench")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the API process (repeatable)")
+    parser.add_argument("--base-url", help="Benchmark a running server instead (no stand-ins, no RSS)")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait after seeding the corpus")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Results file (default: benchmark-results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+    args.scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(main_async(args))
+    output = Path(args.output or f"benchmark-results/{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\n✅ Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
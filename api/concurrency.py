@@ -0,0 +1,80 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+# Blocking I/O (boto3, the OpenAI client) runs on a bounded thread pool,
+# CPU-bound document parsing runs on a process pool so it doesn't hold the GIL
+IO_THREAD_POOL_SIZE = int(os.environ.get("IO_THREAD_POOL_SIZE", "32"))
+CPU_PROCESS_POOL_SIZE = int(os.environ.get("CPU_PROCESS_POOL_SIZE", str(os.cpu_count() or 1)))
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_cpu_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool for blocking I/O"""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=IO_THREAD_POOL_SIZE,
+            thread_name_prefix="io-worker"
+        )
+    return _io_executor
+
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool for CPU-bound work"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ProcessPoolExecutor(max_workers=CPU_PROCESS_POOL_SIZE)
+    return _cpu_executor
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking I/O call on the thread pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+
+_EXHAUSTED = object()
+
+
+async def iterate_io(iterator: Iterator) -> AsyncIterator:
+    """Consume a blocking iterator (e.g. a streaming OpenAI response) on the thread pool"""
+    try:
+        while True:
+            item = await run_io(next, iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+    finally:
+        # Stop the producer too if the consumer goes away early
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await run_io(close)
+
+
+async def run_io_or_await(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await func if it is a coroutine function, otherwise run it on the thread pool"""
+    if asyncio.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await run_io(func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a CPU-bound call on the process pool; func and its arguments must be picklable"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    """Shut down both pools, waiting for in-flight work to finish"""
+    global _io_executor, _cpu_executor
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=True)
+        _io_executor = None
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=True)
+        _cpu_executor = None
@@ -1,97 +1,207 @@
+import io
 import os
+import re
 from pathlib import Path
-from typing import Dict, Any
-import PyPDF2
-import docx
-from langchain.schema import Document
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# PyPDF2, python-docx and LangChain are imported where they're used: the API process
+# only parses on the process pool, and LangChain is only needed by create_document
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+# A path, raw bytes or a binary file-like object
+DocumentSource = Union[str, Path, bytes, bytearray, memoryview, BinaryIO]
 
 class DocumentProcessor:
     """Process and extract text from various document formats"""
     
-    def __init__(self):
+    def __init__(self, max_pages: Optional[int] = None, max_chars: Optional[int] = None,
+                 pdf_workers: Optional[int] = None):
         self.supported_extensions = {'.pdf', '.docx', '.doc', '.txt'}
+        # Extraction budget: matching only needs so much text, 0 means unlimited
+        self.max_pages = max_pages if max_pages is not None else int(os.environ.get('EXTRACT_MAX_PAGES', '50'))
+        self.max_chars = max_chars if max_chars is not None else int(os.environ.get('EXTRACT_MAX_CHARS', '100000'))
+        # Page-parallel PDF extraction splits a document across this many worker processes
+        self.pdf_workers = pdf_workers if pdf_workers is not None else int(os.environ.get('PDF_EXTRACT_WORKERS', '1'))
+        self.pdf_parallel_min_pages = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', '8'))
     
-    def extract_text(self, file_path: str) -> str:
-        """Extract text from a document file"""
-        file_path = Path(file_path)
-        
-        if not file_path.exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
-        
-        extension = file_path.suffix.lower()
+    def extract_text(self, source: DocumentSource, filename: Optional[str] = None) -> str:
+        """Extract text from a document path, bytes or file-like object
+
+        For in-memory sources the type is taken from `filename`'s extension.
+        """
+        if isinstance(source, (str, Path)):
+            source = Path(source)
+            if not source.exists():
+                raise FileNotFoundError(f"File not found: {source}")
+            extension = source.suffix.lower()
+        else:
+            if not filename:
+                raise ValueError("filename is required to detect the type of in-memory documents")
+            extension = Path(filename).suffix.lower()
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                source = io.BytesIO(source)
         
         if extension == '.pdf':
-            return self._extract_from_pdf(file_path)
+            return self._extract_from_pdf(source)
         elif extension in ['.docx', '.doc']:
-            return self._extract_from_docx(file_path)
+            return self._extract_from_docx(source)
         elif extension == '.txt':
-            return self._extract_from_txt(file_path)
+            return self._extract_from_txt(source)
         else:
             raise ValueError(f"Unsupported file type: {extension}")
     
-    def _extract_from_pdf(self, file_path: Path) -> str:
+    def join_text(self, chunks: Iterable[str]) -> str:
+        """Join text chunks line by line, stopping once the character budget is spent"""
+        parts = []
+        total = 0
+        for chunk in chunks:
+            parts.append(chunk)
+            total += len(chunk) + 1
+            if self.max_chars and total >= self.max_chars:
+                break
+        text = "\n".join(parts).strip()
+        return text[:self.max_chars] if self.max_chars else text
+    
+    def iter_pdf_pages(self, source: DocumentSource, start: int = 0,
+                       end: Optional[int] = None) -> Iterator[str]:
+        """Yield the text of each PDF page in turn, parsing pages only as they're consumed"""
+        import PyPDF2
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        pdf_reader = PyPDF2.PdfReader(source)
+        page_count = len(pdf_reader.pages)
+        end = page_count if end is None else min(end, page_count)
+        for index in range(start, end):
+            yield pdf_reader.pages[index].extract_text() or ""
+    
+    def _extract_from_pdf(self, source: Union[Path, BinaryIO]) -> str:
         """Extract text from PDF files"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text.strip()
+            # The generator stops parsing pages as soon as the budget is spent
+            return self.join_text(self.iter_pdf_pages(source, end=self.max_pages or None))
         except Exception as e:
             raise Exception(f"Error reading PDF: {str(e)}")
     
-    def _extract_from_docx(self, file_path: Path) -> str:
-        """Extract text from DOCX files"""
+    def count_pdf_pages(self, content: bytes) -> int:
+        """Number of pages in a PDF, without extracting any text"""
+        import PyPDF2
         try:
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            return len(PyPDF2.PdfReader(io.BytesIO(content)).pages)
+        except Exception as e:
+            raise Exception(f"Error reading PDF: {str(e)}")
+    
+    def pdf_page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        """Split the pages within budget into one contiguous range per worker"""
+        if self.max_pages:
+            page_count = min(page_count, self.max_pages)
+        if self.pdf_workers <= 1 or page_count < self.pdf_parallel_min_pages:
+            return [(0, page_count)]
+        chunk_size = -(-page_count // self.pdf_workers)
+        return [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+    
+    def extract_pdf_pages(self, content: bytes, start: int, end: int) -> List[str]:
+        """Extract one range of PDF pages; run on a worker process for page-parallel extraction"""
+        try:
+            pages = []
+            total = 0
+            for page_text in self.iter_pdf_pages(content, start, end):
+                pages.append(page_text)
+                total += len(page_text)
+                if self.max_chars and total >= self.max_chars:
+                    break
+            return pages
+        except Exception as e:
+            raise Exception(f"Error reading PDF: {str(e)}")
+    
+    def _iter_docx_blocks(self, doc) -> Iterator[str]:
+        from docx.text.paragraph import Paragraph
+        # Paragraphs and tables in document order; a table row becomes one tab-separated line
+        for block in doc.iter_inner_content():
+            if isinstance(block, Paragraph):
+                yield block.text
+                continue
+            for row in block.rows:
+                cells = []
+                seen = set()
+                for cell in row.cells:
+                    # Merged cells are returned once per grid column they span
+                    if id(cell._tc) in seen:
+                        continue
+                    seen.add(id(cell._tc))
+                    cells.append(cell.text)
+                yield "\t".join(cells)
+    
+    def _extract_from_docx(self, source: Union[Path, BinaryIO]) -> str:
+        """Extract text from DOCX files, including table cells"""
+        try:
+            import docx
+            doc = docx.Document(source)
+            return self.join_text(self._iter_docx_blocks(doc))
         except Exception as e:
             raise Exception(f"Error reading DOCX: {str(e)}")
     
-    def _extract_from_txt(self, file_path: Path) -> str:
+    def _extract_from_txt(self, source: Union[Path, BinaryIO]) -> str:
         """Extract text from TXT files"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read().strip()
+            limit = self.max_chars or -1
+            if isinstance(source, Path):
+                with open(source, 'r', encoding='utf-8') as file:
+                    return file.read(limit).strip()
+            return source.read().decode('utf-8')[:self.max_chars or None].strip()
         except Exception as e:
             raise Exception(f"Error reading TXT: {str(e)}")
     
-    def create_document(self, file_path: str, doc_type: str) -> Document:
+    def create_document(self, source: DocumentSource, doc_type: str,
+                        filename: Optional[str] = None) -> "Document":
         """Create a LangChain Document object"""
-        text = self.extract_text(file_path)
+        from langchain.schema import Document
+        text, metadata = self._extract_with_metadata(source, doc_type, filename)
+        return Document(page_content=text, metadata=metadata)
+    
+    def _extract_with_metadata(self, source: DocumentSource, doc_type: str,
+                               filename: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        text = self.extract_text(source, filename)
+        
+        if isinstance(source, (str, Path)):
+            source_name = str(source)
+            filename = filename or Path(source).name
+        else:
+            source_name = filename
         
         metadata = {
-            "source": file_path,
+            "source": source_name,
             "type": doc_type,  # "resume" or "job_description"
-            "filename": Path(file_path).name
+            "filename": filename
         }
-        
-        return Document(page_content=text, metadata=metadata)
+        return text, metadata
     
-    def process_resume(self, file_path: str) -> Dict[str, Any]:
-        """Process a resume and extract structured information"""
-        document = self.create_document(file_path, "resume")
-        
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Collapse runs of spaces and blank lines left behind by PDF/DOCX extraction"""
+        text = text.replace("\u00a0", " ").replace("\r\n", "\n").replace("\r", "\n")
+        text = re.sub(r"[ \t\f\v]+", " ", text)
+        text = re.sub(r" *\n *", "\n", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        return text.strip()
+    
+    def process_text(self, text: str, doc_type: str, filename: str) -> Dict[str, Any]:
+        """Build the processing result for text that has already been extracted"""
+        return self._summarize(text, {"source": filename, "type": doc_type, "filename": filename})
+    
+    def _summarize(self, text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
         # Basic processing - we'll enhance this with LLM analysis later
         return {
-            "raw_text": document.page_content,
-            "metadata": document.metadata,
-            "word_count": len(document.page_content.split()),
-            "char_count": len(document.page_content)
+            "raw_text": text,
+            "metadata": metadata,
+            "word_count": len(text.split()),
+            "char_count": len(text)
         }
     
-    def process_job_description(self, file_path: str) -> Dict[str, Any]:
+    def process_resume(self, source: DocumentSource, filename: Optional[str] = None) -> Dict[str, Any]:
+        """Process a resume and extract structured information"""
+        return self._summarize(*self._extract_with_metadata(source, "resume", filename))
+    
+    def process_job_description(self, source: DocumentSource, filename: Optional[str] = None) -> Dict[str, Any]:
         """Process a job description and extract structured information"""
-        document = self.create_document(file_path, "job_description")
-        
-        # Basic processing - we'll enhance this with LLM analysis later
-        return {
-            "raw_text": document.page_content,
-            "metadata": document.metadata,
-            "word_count": len(document.page_content.split()),
-            "char_count": len(document.page_content)
-        }
\ No newline at end of file
+        return self._summarize(*self._extract_with_metadata(source, "job_description", filename))
\ No newline at end of file
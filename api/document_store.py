@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Optional, Tuple
+
+from concurrency import run_io, run_io_or_await
+from document_processor import DocumentProcessor
+from metadata_index import ARTIFACT_SUFFIX, DOCUMENT_PREFIXES
+from metrics import count_bytes, stage
+from profiler import profile_cold, run_cpu_profiled
+from singleflight import SingleFlight
+from text_cache import TextCache, content_hash
+
+# Metrics stage for each extension's extraction
+EXTRACT_STAGES = {'.pdf': 'extract_pdf', '.docx': 'extract_docx', '.doc': 'extract_docx', '.txt': 'extract_txt'}
+
+
+def artifact_key(s3_key: str) -> str:
+    """Key of the extracted-text artifact stored next to a document"""
+    return str(PurePosixPath(s3_key).with_suffix(ARTIFACT_SUFFIX))
+
+
+class DocumentTextStore:
+    """Resolve an S3 key to extracted text, skipping work that was already done
+
+    Lookup order: (S3 key, ETag) alias in the text cache; the text artifact
+    written at ingest; download and hash, then the cache by content hash;
+    finally a full parse. Whatever is found is written back to the cache.
+    """
+
+    def __init__(self, s3_service, doc_processor: DocumentProcessor, text_cache: TextCache):
+        self.s3_service = s3_service
+        self.doc_processor = doc_processor
+        self.text_cache = text_cache
+        # Concurrent requests for the same object share one S3 GET
+        self.download_flight = SingleFlight("s3_download")
+
+    def _etag_for(self, s3_key: str) -> Optional[str]:
+        entry = self.s3_service.metadata_index.get(s3_key)
+        return entry["etag"] if entry else None
+
+    def _lookup_by_key(self, s3_key: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (etag, cached text) for a key without touching S3"""
+        etag = self._etag_for(s3_key)
+        digest = self.text_cache.lookup_alias(s3_key, etag)
+        text = self.text_cache.get(digest) if digest else None
+        return etag, text
+
+    async def download(self, s3_key: str) -> bytes:
+        """Download an object, coalescing concurrent downloads of the same key"""
+        return await self.download_flight.do(
+            s3_key, lambda: run_io_or_await(self.s3_service.download_file, s3_key)
+        )
+
+    def _remember(self, s3_key: str, etag: Optional[str], digest: str, text: str):
+        self.text_cache.put(digest, text)
+        self.text_cache.add_alias(s3_key, etag, digest)
+
+    async def _extract(self, s3_key: str, content: bytes) -> str:
+        extension = Path(s3_key).suffix.lower()
+        # Timed here rather than in the worker process, so the histogram includes pool queueing
+        stage_name = EXTRACT_STAGES.get(extension, "extract_other")
+        count_bytes(stage_name, len(content))
+        with stage(stage_name):
+            return await self._extract_text(s3_key, extension, content)
+
+    async def _extract_text(self, s3_key: str, extension: str, content: bytes) -> str:
+        processor = self.doc_processor
+        if extension == '.pdf' and processor.pdf_workers > 1:
+            page_count = await run_cpu_profiled(processor.count_pdf_pages, content)
+            ranges = processor.pdf_page_ranges(page_count)
+            if len(ranges) > 1:
+                # Large PDFs are split into page ranges parsed side by side on the process pool
+                chunks = await asyncio.gather(
+                    *(run_cpu_profiled(processor.extract_pdf_pages, content, start, end) for start, end in ranges)
+                )
+                text = processor.join_text(page for chunk in chunks for page in chunk)
+                return processor.normalize_text(text)
+
+        text = await run_cpu_profiled(processor.extract_text, content, Path(s3_key).name)
+        return processor.normalize_text(text)
+
+    async def read_artifact(self, s3_key: str) -> Optional[Dict[str, Any]]:
+        """The stored text artifact for a document, or None if it hasn't been ingested"""
+        body = await run_io_or_await(self.s3_service.get_artifact, artifact_key(s3_key))
+        if body is None:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    async def get_text(self, s3_key: str) -> str:
+        """Extracted text for an S3 object"""
+        # A "cold" profiled request parses the document again
+        cold = profile_cold()
+        etag, text = await run_io(self._lookup_by_key, s3_key)
+        if text is not None and not cold:
+            return text
+
+        artifact = None if cold else await self.read_artifact(s3_key)
+        if artifact is not None:
+            await run_io(self._remember, s3_key, etag, artifact["content_hash"], artifact["text"])
+            return artifact["text"]
+
+        content = await self.download(s3_key)
+        digest = await run_io(content_hash, content)
+        text = None if cold else await run_io(self.text_cache.get, digest)
+        if text is None:
+            text = await self._extract(s3_key, content)
+        await run_io(self._remember, s3_key, etag, digest, text)
+        return text
+
+    async def process(self, s3_key: str, doc_type: str) -> Dict[str, Any]:
+        """Processing result (text, metadata, counts) for an S3 object"""
+        text = await self.get_text(s3_key)
+        return self.doc_processor.process_text(text, doc_type, Path(s3_key).name)
+
+    async def ingest(self, s3_key: str, content: Optional[bytes] = None) -> Dict[str, Any]:
+        """Extract a document once and store its text artifact next to it"""
+        if content is None:
+            content = await self.download(s3_key)
+        digest = await run_io(content_hash, content)
+        text = await run_io(self.text_cache.get, digest)
+        if text is None:
+            text = await self._extract(s3_key, content)
+
+        artifact = {
+            "source_key": s3_key,
+            "content_hash": digest,
+            "text": text,
+            "word_count": len(text.split()),
+            "char_count": len(text),
+            "extracted_at": time.time()
+        }
+        await run_io_or_await(
+            self.s3_service.put_artifact, artifact_key(s3_key), json.dumps(artifact).encode("utf-8")
+        )
+        etag = await run_io(self._etag_for, s3_key)
+        await run_io(self._remember, s3_key, etag, digest, text)
+        return artifact
+
+    async def ingest_quietly(self, s3_key: str, content: Optional[bytes] = None):
+        """Background-task wrapper: a failed ingest only means analysis parses later"""
+        try:
+            await self.ingest(s3_key, content)
+        except Exception as e:
+            print(f"Ingest failed for {s3_key}: {str(e)}")
+
+
+async def backfill(store: DocumentTextStore, prefixes, force: bool = False) -> Dict[str, int]:
+    """Write text artifacts for documents that don't have one yet"""
+    counts = {"ingested": 0, "skipped": 0, "failed": 0}
+    for prefix in prefixes:
+        for entry in await run_io_or_await(store.s3_service.list_files, prefix):
+            s3_key = entry["filename"]
+            if not force and await store.read_artifact(s3_key) is not None:
+                counts["skipped"] += 1
+                continue
+            try:
+                await store.ingest(s3_key)
+                counts["ingested"] += 1
+            except Exception as e:
+                print(f"❌ {s3_key}: {str(e)}")
+                counts["failed"] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write extracted-text artifacts for existing documents")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--prefix", action="append", help="Prefix to process (default: resumes/ and job_descriptions/)")
+    parser.add_argument("--force", action="store_true", help="Re-extract documents that already have an artifact")
+    args = parser.parse_args()
+
+    from concurrency import shutdown_executors
+    from s3_service import create_s3_service
+
+    async def run_backfill():
+        service = create_s3_service()
+        store = DocumentTextStore(service, DocumentProcessor(), TextCache())
+        try:
+            return await backfill(store, args.prefix or DOCUMENT_PREFIXES, force=args.force)
+        finally:
+            if hasattr(service, "close"):
+                await service.close()
+
+    counts = asyncio.run(run_backfill())
+    shutdown_executors()
+    print(f"✅ {counts['ingested']} ingested, {counts['skipped']} skipped, {counts['failed']} failed")
@@ -1,30 +1,184 @@
 import os
-import openai
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import json
 import re
 from datetime import datetime
+from skill_scorer import SkillScorer
+from prompt_builder import PromptBuilder
+from metrics import count_fallback, count_tokens, stage
+
+ANALYSIS_GUIDELINES = """ANALYSIS INSTRUCTIONS:
+1. Carefully compare the resume against job requirements
+2. Look for matching skills, experience, education, and qualifications
+3. Identify gaps and missing requirements
+4. Consider experience level (junior, mid, senior) compatibility
+5. Evaluate education requirements vs candidate background
+
+RECOMMENDATION CRITERIA:
+- APPLY: 70%+ match, most requirements met, good fit
+- DECENT_CHANCE: 40-69% match, some gaps but worth trying
+- AVOID: <40% match, major gaps, poor fit or overqualified"""
+
+RESULT_FORMAT = """{
+    "recommendation": "APPLY/AVOID/DECENT_CHANCE",
+    "match_score": 85,
+    "confidence_score": 90,
+    "strengths": ["List of matching qualifications", "Strong Python skills", "Relevant experience"],
+    "weaknesses": ["Missing requirements", "Limited experience in X"],
+    "missing_skills": ["Specific skills from job not in resume"],
+    "experience_match": "How experience level matches requirements",
+    "education_match": "How education matches requirements",
+    "detailed_reasoning": "Detailed explanation of the recommendation with specific examples"
+}"""
+
+# Field types every analysis result must have
+RESULT_SCHEMA = {
+    "recommendation": str,
+    "match_score": (int, float),
+    "confidence_score": (int, float),
+    "strengths": list,
+    "weaknesses": list,
+    "missing_skills": list,
+    "experience_match": str,
+    "education_match": str,
+    "detailed_reasoning": str
+}
+RECOMMENDATIONS = ("APPLY", "DECENT_CHANCE", "AVOID")
+
+def validate_result(result: Any) -> bool:
+    """Whether a parsed analysis has every result field, with the right types and ranges"""
+    if not isinstance(result, dict):
+        return False
+    for field, expected in RESULT_SCHEMA.items():
+        value = result.get(field)
+        if not isinstance(value, expected) or isinstance(value, bool):
+            return False
+    return result["recommendation"] in RECOMMENDATIONS and 0 <= result["match_score"] <= 100
+
+def strip_code_fence(text: str) -> str:
+    """The JSON inside a markdown code block, or the text unchanged"""
+    if "```json" in text:
+        json_start = text.find("```json") + 7
+        json_end = text.find("```", json_start)
+        return text[json_start:json_end].strip()
+    if "```" in text:
+        json_start = text.find("```") + 3
+        json_end = text.rfind("```")
+        return text[json_start:json_end].strip()
+    return text
+
+SYSTEM_MESSAGE = "You are an expert career counselor. Always respond with valid JSON in the exact format requested."
 
 class JobMatcher:
     """AI-powered job matching using OpenAI directly"""
     
-    def __init__(self, openai_api_key: str):
-        """Initialize the job matcher with OpenAI API key"""
-        self.client = openai.OpenAI(api_key=openai_api_key)
+    # Bump whenever the prompt or response handling changes so cached results are not reused
+    PROMPT_VERSION = "2"
+    # Packed results come from the multi-job prompt with each job cut to a share of the
+    # token budget; they are cached apart so single analyses never get them back
+    PACKED_PROMPT_VERSION = f"{PROMPT_VERSION}-packed"
+    MAX_COMPLETION_TOKENS = 1500
+    # Rough size of the fixed instructions around the two documents
+    PROMPT_OVERHEAD_CHARS = 2000
+    # Packed (several jobs per call) requests: completion room per job, and the model's output cap
+    COMPLETION_TOKENS_PER_JOB = 600
+    MAX_PACKED_COMPLETION_TOKENS = 4096
+    
+    def __init__(self, openai_api_key: Optional[str], result_cache=None):
+        """Initialize the job matcher with OpenAI API key and an optional AnalysisCache"""
+        # The client is created on first use; importing the SDK and building it takes ~1s
+        self.openai_api_key = openai_api_key
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.model = os.environ.get("OPENAI_MODEL", "gpt-3.5-turbo")
+        self.result_cache = result_cache
+        self.skill_scorer = SkillScorer()
+        # Documents are cleaned and cut to PROMPT_MAX_INPUT_TOKENS before they go in the prompt
+        self.prompt_builder = PromptBuilder(self.model)
+        self.max_jobs_per_call = int(os.environ.get("MULTI_JOB_MAX_PER_CALL", "5"))
+    
+    @property
+    def client(self):
+        """The OpenAI client; without an API key (here or in OPENAI_API_KEY) creating it raises"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import openai
+                    self._client = openai.OpenAI(api_key=self.openai_api_key or None)
+        return self._client
+    
+    @property
+    def client_ready(self) -> bool:
+        return self._client is not None
+    
+    @property
+    def configured(self) -> bool:
+        return bool(self.openai_api_key or os.environ.get("OPENAI_API_KEY"))
+    
+    def warm_up(self):
+        """Create the client and load the tokenizer ahead of the first analysis"""
+        self.client
+        self.prompt_builder.count_tokens("")
+    
+    def quick_score(self, resume_text: str, job_description: str) -> Dict[str, Any]:
+        """Instant local analysis from skill overlap, without calling OpenAI"""
+        result = self.skill_scorer.score(resume_text, job_description)
+        result["cache_hit"] = False
+        return result
+    
+    def get_cached(self, resume_text: str, job_description: str, packed: bool = False) -> Optional[Dict[str, Any]]:
+        """Return a cached analysis for this pair without calling OpenAI, if there is one
+
+        With `packed`, a result from an earlier packed call is good enough too.
+        """
+        if self.result_cache is None:
+            return None
+        cached = self.result_cache.get(resume_text, job_description, self.model, self.PROMPT_VERSION)
+        if cached is None and packed:
+            cached = self.result_cache.get(resume_text, job_description, self.model, self.PACKED_PROMPT_VERSION)
+        if cached is not None:
+            cached["cache_hit"] = True
+        return cached
     
-    def analyze_job_match(self, resume_text: str, job_description: str) -> Dict[str, Any]:
+    def estimate_tokens(self, resume_text: str, job_description: str) -> int:
+        """Rough upper bound on the tokens one analysis consumes (prompt plus completion)"""
+        document_tokens = min((len(resume_text) + len(job_description)) // 4, self.prompt_builder.max_input_tokens)
+        return document_tokens + self.PROMPT_OVERHEAD_CHARS // 4 + self.MAX_COMPLETION_TOKENS
+    
+    def analyze_job_match(self, resume_text: str, job_description: str,
+                          raise_on_rate_limit: bool = False) -> Dict[str, Any]:
         """
         Analyze how well a resume matches a job description
         
         Args:
             resume_text: Extracted text from resume
             job_description: Extracted text from job posting
+            raise_on_rate_limit: Raise openai.RateLimitError instead of retrying
+                internally or returning an error result, for callers that schedule
+                their own retries
             
         Returns:
-            Structured analysis with recommendation and detailed insights
+            Structured analysis with recommendation and detailed insights;
+            `cache_hit` says whether it came from the result cache
         """
-        try:
-            prompt = f"""
+        cached = self.get_cached(resume_text, job_description)
+        if cached is not None:
+            return cached
+        
+        analysis_result = self._run_analysis(resume_text, job_description, raise_on_rate_limit)
+        
+        # Only clean results are worth replaying
+        if self.result_cache is not None and analysis_result.get("processing_status") == "success":
+            self.result_cache.put(resume_text, job_description, self.model, self.PROMPT_VERSION, analysis_result)
+        
+        analysis_result["cache_hit"] = False
+        return analysis_result
+    
+    def build_messages(self, resume_text: str, job_description: str) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """Chat messages asking for the JSON analysis of one resume/job pair, and their token usage"""
+        resume_text, job_description, budget_report = self.prompt_builder.fit(resume_text, job_description)
+        prompt = f"""
 You are an expert career counselor and recruiter with 20+ years of experience. 
 Analyze how well this resume matches the job description and provide actionable insights.
 
@@ -34,100 +188,316 @@ RESUME:
 JOB DESCRIPTION:
 {job_description}
 
-ANALYSIS INSTRUCTIONS:
-1. Carefully compare the resume against job requirements
-2. Look for matching skills, experience, education, and qualifications
-3. Identify gaps and missing requirements
-4. Consider experience level (junior, mid, senior) compatibility
-5. Evaluate education requirements vs candidate background
-
-RECOMMENDATION CRITERIA:
-- APPLY: 70%+ match, most requirements met, good fit
-- DECENT_CHANCE: 40-69% match, some gaps but worth trying
-- AVOID: <40% match, major gaps, poor fit or overqualified
+{ANALYSIS_GUIDELINES}
 
 Please provide your analysis in this exact JSON format:
-{{
-    "recommendation": "APPLY/AVOID/DECENT_CHANCE",
-    "match_score": 85,
-    "confidence_score": 90,
-    "strengths": ["List of matching qualifications", "Strong Python skills", "Relevant experience"],
-    "weaknesses": ["Missing requirements", "Limited experience in X"],
-    "missing_skills": ["Specific skills from job not in resume"],
-    "experience_match": "How experience level matches requirements",
-    "education_match": "How education matches requirements",
-    "detailed_reasoning": "Detailed explanation of the recommendation with specific examples"
-}}
+{RESULT_FORMAT}
 
 ANALYSIS:
 """
-
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert career counselor. Always respond with valid JSON in the exact format requested."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=1500
-            )
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
+        token_usage = {
+            "prompt_tokens": sum(self.prompt_builder.count_tokens(message["content"]) for message in messages),
+            "completion_tokens": None,
+            "max_input_tokens": budget_report["max_input_tokens"],
+            "resume_tokens": budget_report["resume"]["tokens"],
+            "job_tokens": budget_report["job_description"]["tokens"],
+            "truncated": budget_report["resume"]["truncated"] or budget_report["job_description"]["truncated"],
+            "dropped_sections": {
+                "resume": budget_report["resume"]["dropped_sections"],
+                "job_description": budget_report["job_description"]["dropped_sections"]
+            }
+        }
+        return messages, token_usage
+    
+    def _run_analysis(self, resume_text: str, job_description: str,
+                      raise_on_rate_limit: bool = False) -> Dict[str, Any]:
+        """Call OpenAI and parse its answer into the analysis result"""
+        import openai
+        try:
+            # The client's own retries would hide 429s from a caller that schedules around them
+            client = self.client.with_options(max_retries=0) if raise_on_rate_limit else self.client
+            messages, token_usage = self.build_messages(resume_text, job_description)
+            with stage("llm_call"):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.2,
+                    max_tokens=self.MAX_COMPLETION_TOKENS
+                )
             
             analysis_text = response.choices[0].message.content.strip()
+            analysis_result = self.parse_analysis(analysis_text, resume_text, job_description)
             
-            # Try to parse JSON response
+            # Prefer OpenAI's own count over the local one when it reports usage
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                token_usage.update(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+            count_tokens(token_usage["prompt_tokens"], token_usage["completion_tokens"])
+            analysis_result["token_usage"] = token_usage
+            return analysis_result
+                
+        except openai.RateLimitError as e:
+            if raise_on_rate_limit:
+                raise
+            return self.fallback_result(resume_text, job_description, e)
+        except Exception as e:
+            return self.fallback_result(resume_text, job_description, e)
+    
+    def stream_analysis(self, resume_text: str, job_description: str) -> Iterator[str]:
+        """Yield the analysis completion text piece by piece as OpenAI generates it"""
+        messages, _ = self.build_messages(resume_text, job_description)
+        # llm_call covers the whole stream, from the request to the last token
+        with stage("llm_call"):
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.2,
+                max_tokens=self.MAX_COMPLETION_TOKENS,
+                stream=True
+            )
             try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                if hasattr(stream, "close"):
+                    stream.close()
+    
+    def complete_streamed_analysis(self, resume_text: str, job_description: str,
+                                   analysis_text: str) -> Dict[str, Any]:
+        """Parse a fully streamed completion and cache it like analyze_job_match would"""
+        analysis_result = self.parse_analysis(analysis_text.strip(), resume_text, job_description)
+        _, token_usage = self.build_messages(resume_text, job_description)
+        token_usage["completion_tokens"] = self.prompt_builder.count_tokens(analysis_text)
+        count_tokens(token_usage["prompt_tokens"], token_usage["completion_tokens"])
+        analysis_result["token_usage"] = token_usage
+        if self.result_cache is not None and analysis_result.get("processing_status") == "success":
+            self.result_cache.put(resume_text, job_description, self.model, self.PROMPT_VERSION, analysis_result)
+        analysis_result["cache_hit"] = False
+        return analysis_result
+    
+    def parse_analysis(self, analysis_text: str, resume_text: str, job_description: str) -> Dict[str, Any]:
+        """Turn the model's answer into the analysis result"""
+        # Try to parse JSON response
+        try:
+            with stage("parse"):
                 # Extract JSON from response if it's wrapped in markdown
-                if "```json" in analysis_text:
-                    json_start = analysis_text.find("```json") + 7
-                    json_end = analysis_text.find("```", json_start)
-                    analysis_text = analysis_text[json_start:json_end].strip()
-                elif "```" in analysis_text:
-                    json_start = analysis_text.find("```") + 3
-                    json_end = analysis_text.rfind("```")
-                    analysis_text = analysis_text[json_start:json_end].strip()
+                analysis_text = strip_code_fence(analysis_text)
                 
                 analysis_result = json.loads(analysis_text)
-                
-                # Add metadata
-                analysis_result.update({
-                    "analysis_timestamp": datetime.now().isoformat(),
-                    "ai_model": "gpt-3.5-turbo",
-                    "processing_status": "success"
-                })
-                
-                return analysis_result
-                
-            except json.JSONDecodeError as e:
-                # Fallback parsing if JSON fails
-                return self._fallback_parse(analysis_text, str(e))
-                
-        except Exception as e:
-            return {
-                "processing_status": "error",
-                "error_message": str(e),
-                "recommendation": "AVOID",
-                "match_score": 0,
-                "confidence_score": 0,
-                "strengths": [],
-                "weaknesses": ["Analysis failed"],
-                "missing_skills": [],
-                "experience_match": "Could not analyze",
-                "education_match": "Could not analyze",
-                "detailed_reasoning": f"Analysis failed due to error: {str(e)}",
-                "analysis_timestamp": datetime.now().isoformat()
+            
+            # Add metadata
+            analysis_result.update({
+                "analysis_timestamp": datetime.now().isoformat(),
+                "ai_model": self.model,
+                "processing_status": "success"
+            })
+            
+            return analysis_result
+            
+        except json.JSONDecodeError as e:
+            # Fallback parsing if JSON fails
+            return self._fallback_parse(analysis_text, str(e), resume_text, job_description)
+    
+    def pack_jobs(self, resume_text: str, job_descriptions: List[str]) -> List[List[int]]:
+        """Group job indexes into packed requests that fit the prompt budget and per-call job limit"""
+        budget = self.prompt_builder.max_input_tokens
+        resume_tokens = min(self.prompt_builder.count_tokens(resume_text), budget // 2)
+        job_budget = budget - resume_tokens
+        groups, current, used = [], [], 0
+        for index, job_description in enumerate(job_descriptions):
+            tokens = min(self.prompt_builder.count_tokens(job_description), job_budget)
+            if current and (used + tokens > job_budget or len(current) >= self.max_jobs_per_call):
+                groups.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += tokens
+        if current:
+            groups.append(current)
+        return groups
+    
+    def estimate_packed_tokens(self, resume_text: str, job_descriptions: List[str]) -> int:
+        """Rough upper bound on the tokens one packed analysis consumes"""
+        document_chars = len(resume_text) + sum(len(job) for job in job_descriptions)
+        document_tokens = min(document_chars // 4, self.prompt_builder.max_input_tokens)
+        return document_tokens + self.PROMPT_OVERHEAD_CHARS // 4 + self._packed_completion_tokens(len(job_descriptions))
+    
+    def _packed_completion_tokens(self, job_count: int) -> int:
+        return min(self.MAX_PACKED_COMPLETION_TOKENS, self.COMPLETION_TOKENS_PER_JOB * job_count)
+    
+    def build_packed_messages(self, resume_text: str,
+                              job_descriptions: List[str]) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """Chat messages asking for one analysis per job, and each job's share of the token usage"""
+        builder = self.prompt_builder
+        job_count = len(job_descriptions)
+        job_tokens = [builder.count_tokens(job_description) for job_description in job_descriptions]
+        half = builder.max_input_tokens // 2
+        resume_fitted, resume_report = builder.fit_document(
+            resume_text, "resume", max(half, builder.max_input_tokens - sum(job_tokens))
+        )
+        
+        # Shortest jobs first, so space they don't need goes to the longer ones
+        remaining = builder.max_input_tokens - resume_report["tokens"]
+        fitted_jobs: List[str] = [""] * job_count
+        job_reports: List[Dict[str, Any]] = [{}] * job_count
+        for position, index in enumerate(sorted(range(job_count), key=lambda i: job_tokens[i])):
+            share = remaining // (job_count - position)
+            fitted_jobs[index], job_reports[index] = builder.fit_document(
+                job_descriptions[index], "job_description", share
+            )
+            remaining -= job_reports[index]["tokens"]
+        
+        jobs_block = "\n\n".join(
+            f'JOB "J{index + 1}":\n{job_text}' for index, job_text in enumerate(fitted_jobs)
+        )
+        prompt = f"""
+You are an expert career counselor and recruiter with 20+ years of experience. 
+Analyze how well this resume matches each of the job descriptions below and provide actionable insights.
+Assess every job on its own, as if it were the only one.
+
+RESUME:
+{resume_fitted}
+
+JOB DESCRIPTIONS:
+{jobs_block}
+
+{ANALYSIS_GUIDELINES}
+
+Respond with a JSON object {{"results": [...]}} holding exactly one entry per job, each with
+"job_id" set to the job's id (e.g. "J1") and otherwise in this exact format:
+{RESULT_FORMAT}
+
+ANALYSIS:
+"""
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
+        prompt_tokens = sum(builder.count_tokens(message["content"]) for message in messages)
+        usages = [
+            {
+                # The shared prompt is split evenly across the packed jobs
+                "prompt_tokens": round(prompt_tokens / job_count),
+                "completion_tokens": None,
+                "packed_jobs": job_count,
+                "max_input_tokens": builder.max_input_tokens,
+                "resume_tokens": resume_report["tokens"],
+                "job_tokens": job_report["tokens"],
+                "truncated": resume_report["truncated"] or job_report["truncated"],
+                "dropped_sections": {
+                    "resume": resume_report["dropped_sections"],
+                    "job_description": job_report["dropped_sections"]
+                }
             }
+            for job_report in job_reports
+        ]
+        return messages, usages
+    
+    def analyze_packed(self, resume_text: str, job_descriptions: List[str],
+                       raise_on_rate_limit: bool = False) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze one resume against several job descriptions in a single OpenAI call
+        
+        The result format is the same as analyze_job_match. Valid results are
+        cached under PACKED_PROMPT_VERSION, for packed calls only. Entries that are missing or
+        don't match the result schema come back as None, for the caller to retry
+        on their own.
+        """
+        import openai
+        try:
+            client = self.client.with_options(max_retries=0) if raise_on_rate_limit else self.client
+            messages, usages = self.build_packed_messages(resume_text, job_descriptions)
+            with stage("llm_call"):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.2,
+                    max_tokens=self._packed_completion_tokens(len(job_descriptions))
+                )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                count_tokens(usage.prompt_tokens, usage.completion_tokens)
+            with stage("parse"):
+                payload = json.loads(strip_code_fence(response.choices[0].message.content.strip()))
+        except openai.RateLimitError:
+            if raise_on_rate_limit:
+                raise
+            count_fallback("packed_rate_limit")
+            return [None] * len(job_descriptions)
+        except Exception as e:
+            print(f"Packed analysis failed, falling back to single analyses: {str(e)}")
+            count_fallback("packed_error")
+            return [None] * len(job_descriptions)
+        
+        entries = payload.get("results") if isinstance(payload, dict) else payload
+        by_id = {
+            str(entry.get("job_id")): entry
+            for entry in (entries if isinstance(entries, list) else [])
+            if isinstance(entry, dict)
+        }
+        
+        results: List[Optional[Dict[str, Any]]] = []
+        for index, job_description in enumerate(job_descriptions):
+            entry = by_id.get(f"J{index + 1}")
+            if not validate_result(entry):
+                count_fallback("packed_invalid_entry")
+                results.append(None)
+                continue
+            analysis_result = {field: value for field, value in entry.items() if field != "job_id"}
+            token_usage = usages[index]
+            if usage is not None:
+                token_usage.update(
+                    prompt_tokens=round(usage.prompt_tokens / len(job_descriptions)),
+                    completion_tokens=round(usage.completion_tokens / len(job_descriptions))
+                )
+            analysis_result.update({
+                "analysis_timestamp": datetime.now().isoformat(),
+                "ai_model": self.model,
+                "processing_status": "success",
+                "token_usage": token_usage
+            })
+            if self.result_cache is not None:
+                self.result_cache.put(resume_text, job_description, self.model, self.PACKED_PROMPT_VERSION, analysis_result)
+            analysis_result["cache_hit"] = False
+            results.append(analysis_result)
+        return results
+    
+    def fallback_result(self, resume_text: str, job_description: str, error: Exception) -> Dict[str, Any]:
+        """Local skill-overlap analysis returned when the OpenAI analysis could not be produced"""
+        import openai
+        count_fallback("rate_limit" if isinstance(error, openai.RateLimitError) else "llm_error")
+        result = self.skill_scorer.score(resume_text, job_description)
+        result.update({
+            "processing_status": "fallback",
+            "error_message": str(error),
+            "detailed_reasoning": f"AI analysis failed ({str(error)}); scored locally. {result['detailed_reasoning']}"
+        })
+        return result
     
-    def _fallback_parse(self, raw_response: str, parse_error: str) -> Dict[str, Any]:
+    def _fallback_parse(self, raw_response: str, parse_error: str,
+                        resume_text: str, job_description: str) -> Dict[str, Any]:
         """Fallback parsing when JSON parsing fails"""
+        count_fallback("parse_error")
+        with stage("fallback_parse"):
+            return self._salvage_analysis(raw_response, parse_error, resume_text, job_description)
+    
+    def _salvage_analysis(self, raw_response: str, parse_error: str,
+                          resume_text: str, job_description: str) -> Dict[str, Any]:
+        # Whatever the regexes can't recover comes from the local skill scorer
+        local = self.skill_scorer.score(resume_text, job_description)
         
         # Extract recommendation using regex
-        recommendation = "DECENT_CHANCE"  # default
+        recommendation = local["recommendation"]
         rec_match = re.search(r'"recommendation":\s*"(APPLY|AVOID|DECENT_CHANCE)"', raw_response, re.IGNORECASE)
         if rec_match:
             recommendation = rec_match.group(1).upper()
         
         # Extract match score
-        match_score = 50  # default
+        match_score = local["match_score"]
         score_match = re.search(r'"match_score":\s*(\d+)', raw_response)
         if score_match:
             match_score = int(score_match.group(1))
@@ -136,46 +506,13 @@ ANALYSIS:
             "recommendation": recommendation,
             "match_score": match_score,
             "confidence_score": 70,
-            "strengths": ["Analysis completed with fallback parsing"],
-            "weaknesses": ["Structured parsing failed"],
-            "missing_skills": ["Could not extract detailed skills"],
-            "experience_match": "Could not fully analyze experience match",
-            "education_match": "Could not fully analyze education match", 
+            "strengths": local["strengths"],
+            "weaknesses": local["weaknesses"],
+            "missing_skills": local["missing_skills"],
+            "experience_match": local["experience_match"],
+            "education_match": local["education_match"],
             "detailed_reasoning": raw_response,
             "processing_status": "partial_success",
             "parse_error": parse_error,
             "analysis_timestamp": datetime.now().isoformat()
         }
-    
-    def batch_analyze(self, resume_text: str, job_descriptions: List[Dict[str, str]]) -> List[Dict[str, Any]]:
-        """
-        Analyze one resume against multiple job descriptions
-        
-        Args:
-            resume_text: The candidate's resume text
-            job_descriptions: List of job descriptions with metadata
-            
-        Returns:
-            List of analysis results, sorted by match score
-        """
-        results = []
-        
-        for job_data in job_descriptions:
-            job_text = job_data.get("text", "")
-            job_title = job_data.get("title", "Unknown Position")
-            
-            analysis = self.analyze_job_match(resume_text, job_text)
-            
-            # Add job metadata to result
-            analysis.update({
-                "job_title": job_title,
-                "job_filename": job_data.get("filename", ""),
-                "company": job_data.get("company", "Not specified")
-            })
-            
-            results.append(analysis)
-        
-        # Sort by match score (highest first)
-        results.sort(key=lambda x: x.get("match_score", 0), reverse=True)
-        
-        return results
\ No newline at end of file
@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import fcntl
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from concurrency import run_io
+
+DEFAULT_VECTOR_INDEX_PATH = "uploads/job_vectors.npz"
+# Job descriptions downloaded and parsed at once by a sync
+SYNC_CONCURRENCY = int(os.environ.get("JOB_VECTOR_SYNC_CONCURRENCY", "8"))
+JOB_PREFIX = "job_descriptions/"
+# Keeps tokens such as c++, c# and node.js intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word unigrams and bigrams"""
+    words = [word.rstrip(".") for word in TOKEN_PATTERN.findall(text.lower())]
+    words = [word for word in words if word]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+@lru_cache(maxsize=200000)
+def _bucket(token: str, dim: int) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little") % dim
+
+
+def sparse_vector(text: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed term-frequency vector with sublinear (1 + log tf) weighting, as (buckets, weights)"""
+    tokens = tokenize(text)
+    if not tokens:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+    buckets = np.fromiter((_bucket(token, dim) for token in tokens), dtype=np.int32, count=len(tokens))
+    indices, counts = np.unique(buckets, return_counts=True)
+    return indices.astype(np.int32), (1 + np.log(counts)).astype(np.float32)
+
+
+def hash_vector(text: str, dim: int) -> np.ndarray:
+    """The same vector, dense"""
+    vector = np.zeros(dim, dtype=np.float32)
+    indices, weights = sparse_vector(text, dim)
+    vector[indices] = weights
+    return vector
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _file_version(path: str) -> Optional[Tuple[int, int, int]]:
+    # A replaced file has a new inode, so equal versions mean nobody else saved since
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class JobVectorIndex:
+    """On-disk sparse matrix of hashed TF vectors for job descriptions, searched with TF-IDF cosine
+
+    Vectors are deterministic (no model, no network), so the index can be
+    rebuilt from extracted text at any time. IDF weights come from the indexed
+    jobs and are recomputed whenever the index changes. Rows are kept in CSR
+    form (a job has a few hundred distinct buckets), so memory grows with the
+    text indexed rather than N x JOB_VECTOR_DIM. Every worker holds its own
+    copy; writes re-read the file under an exclusive lock before merging, so
+    workers adding jobs at the same time don't drop each other's rows.
+    """
+
+    def __init__(self, path: Optional[str] = None, dim: Optional[int] = None):
+        self.path = path or os.environ.get("JOB_VECTOR_INDEX_PATH", DEFAULT_VECTOR_INDEX_PATH)
+        self.dim = dim or int(os.environ.get("JOB_VECTOR_DIM", "4096"))
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._digests: List[str] = []
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._data = np.zeros(0, dtype=np.float32)
+        self._weighted: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._loaded_version: Optional[Tuple[int, int, int]] = None
+        # Jobs whose text couldn't be extracted; sync skips them instead of parsing them again
+        self.failed: Set[str] = set()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        version = _file_version(self.path)
+        self._keys, self._digests = [], []
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._data = np.zeros(0, dtype=np.float32)
+        if version is not None:
+            with np.load(self.path, allow_pickle=False) as data:
+                # A changed JOB_VECTOR_DIM invalidates every stored vector
+                compatible = True
+                if "indptr" in data and int(data["dim"]) == self.dim:
+                    self._indptr = data["indptr"].astype(np.int64)
+                    self._indices = data["indices"].astype(np.int32)
+                    self._data = data["data"].astype(np.float32)
+                elif "matrix" in data and data["matrix"].ndim == 2 and data["matrix"].shape[1] == self.dim:
+                    # Dense files written before rows were stored sparse
+                    matrix = data["matrix"]
+                    rows, self._indices = np.nonzero(matrix)
+                    self._indices = self._indices.astype(np.int32)
+                    self._data = matrix[rows, self._indices].astype(np.float32)
+                    lengths = np.bincount(rows, minlength=len(matrix))
+                    self._indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+                else:
+                    compatible = False
+                if compatible:
+                    self._keys = [str(key) for key in data["keys"]]
+                    self._digests = [str(digest) for digest in data["digests"]]
+        self._loaded_version = version
+        self._weighted = None
+
+    def _reload_if_changed(self):
+        # Another worker may have written the file since we last read it
+        if _file_version(self.path) != self._loaded_version:
+            self._load()
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive across workers: re-read the file, then let the caller change and save it"""
+        with self._lock, open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reload_if_changed()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rows(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        return [
+            (self._indices[start:end], self._data[start:end])
+            for start, end in zip(self._indptr[:-1], self._indptr[1:])
+        ]
+
+    def _set_rows(self, rows: List[Tuple[np.ndarray, np.ndarray]]):
+        lengths = [len(indices) for indices, _ in rows]
+        self._indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64)
+        self._indices = np.concatenate([indices for indices, _ in rows]) if rows else np.zeros(0, dtype=np.int32)
+        self._data = np.concatenate([weights for _, weights in rows]) if rows else np.zeros(0, dtype=np.float32)
+
+    def _save(self):
+        # A temp file of our own, so workers saving at the same time don't write into one file
+        directory = Path(self.path).parent
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+            try:
+                np.savez(f, keys=np.array(self._keys, dtype=str), digests=np.array(self._digests, dtype=str),
+                         indptr=self._indptr, indices=self._indices, data=self._data, dim=np.array(self.dim))
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, self.path)
+        # Safe to take as our own: the write lock kept other workers out since the re-read
+        self._loaded_version = _file_version(self.path)
+        self._weighted = None
+
+    def digests(self) -> Dict[str, str]:
+        """Text digest of every indexed job, by S3 key"""
+        with self._lock:
+            self._reload_if_changed()
+            return dict(zip(self._keys, self._digests))
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]) -> int:
+        """Index (s3_key, text) pairs, skipping ones whose text is unchanged"""
+        documents = list(documents)
+        with self._writing():
+            positions = {key: i for i, key in enumerate(self._keys)}
+            rows = None
+            changed = 0
+            for s3_key, text in documents:
+                digest = text_digest(text)
+                position = positions.get(s3_key)
+                if position is not None and self._digests[position] == digest:
+                    continue
+                if rows is None:
+                    rows = self._rows()
+                row = sparse_vector(text, self.dim)
+                if position is None:
+                    positions[s3_key] = len(self._keys)
+                    self._keys.append(s3_key)
+                    self._digests.append(digest)
+                    rows.append(row)
+                else:
+                    self._digests[position] = digest
+                    rows[position] = row
+                changed += 1
+            if changed:
+                self._set_rows(rows)
+                self._save()
+            return changed
+
+    def add(self, s3_key: str, text: str) -> bool:
+        """Index one job description"""
+        return self.add_many([(s3_key, text)]) > 0
+
+    def remove(self, s3_keys: Iterable[str]) -> int:
+        """Drop jobs from the index"""
+        drop = set(s3_keys)
+        with self._writing():
+            keep = [i for i, key in enumerate(self._keys) if key not in drop]
+            removed = len(self._keys) - len(keep)
+            if removed:
+                rows = self._rows()
+                self._keys = [self._keys[i] for i in keep]
+                self._digests = [self._digests[i] for i in keep]
+                self._set_rows([rows[i] for i in keep])
+                self._save()
+            return removed
+
+    def _weighted_rows(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """IDF weights, the row of every stored value, and the IDF-weighted, L2-normalized values"""
+        if self._weighted is None:
+            count = len(self._keys)
+            document_frequency = np.bincount(self._indices, minlength=self.dim)
+            idf = (np.log((1 + count) / (1 + document_frequency)) + 1).astype(np.float32)
+            row_of = np.repeat(np.arange(count), np.diff(self._indptr))
+            weighted = self._data * idf[self._indices]
+            norms = np.sqrt(np.bincount(row_of, weights=weighted * weighted, minlength=count))
+            self._weighted = (idf, row_of, (weighted / np.maximum(norms, 1e-12)[row_of]).astype(np.float32))
+        return self._weighted
+
+    def search(self, text: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """The top_k indexed jobs most similar to `text`, as (s3_key, cosine similarity)"""
+        with self._lock:
+            self._reload_if_changed()
+            if not self._keys or top_k <= 0:
+                return []
+            idf, row_of, weighted = self._weighted_rows()
+            indices = self._indices
+            keys = list(self._keys)
+
+        query = hash_vector(text, self.dim) * idf
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = np.bincount(row_of, weights=weighted * query[indices], minlength=len(keys))
+
+        top_k = min(top_k, len(keys))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(keys[i], round(float(scores[i]), 4)) for i in top]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+
+async def sync(vector_index: JobVectorIndex, store, prefix: str = JOB_PREFIX) -> Dict[str, int]:
+    """Index job descriptions missing from the vector index and drop ones that are gone
+
+    Runs from the reconcile loop and the CLI, not per request: it lists every
+    job and downloads the unindexed ones. Jobs that fail to extract are not
+    retried by this process.
+    """
+    listed = [entry["filename"] for entry in await run_io(store.s3_service.metadata_index.list_prefix, prefix)]
+    indexed = await run_io(vector_index.digests)
+
+    counts = {"indexed": 0, "removed": 0, "failed": 0}
+    missing = [s3_key for s3_key in listed if s3_key not in indexed and s3_key not in vector_index.failed]
+    semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+    async def read(s3_key: str) -> str:
+        async with semaphore:
+            return await store.get_text(s3_key)
+
+    texts = await asyncio.gather(*(read(s3_key) for s3_key in missing), return_exceptions=True)
+    documents = []
+    for s3_key, text in zip(missing, texts):
+        if isinstance(text, Exception):
+            print(f"Vector index: failed to read {s3_key}: {str(text)}")
+            vector_index.failed.add(s3_key)
+            counts["failed"] += 1
+        else:
+            documents.append((s3_key, text))
+    counts["indexed"] = await run_io(vector_index.add_many, documents)
+
+    vector_index.failed.intersection_update(listed)
+    stale = set(indexed) - set(listed)
+    if stale:
+        counts["removed"] = await run_io(vector_index.remove, stale)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the job description vector index")
+    parser.add_argument("command", choices=["sync", "rebuild"])
+    args = parser.parse_args()
+
+    from concurrency import shutdown_executors
+    from document_processor import DocumentProcessor
+    from document_store import DocumentTextStore
+    from s3_service import create_s3_service
+    from text_cache import TextCache
+
+    async def run_sync():
+        service = create_s3_service()
+        store = DocumentTextStore(service, DocumentProcessor(), TextCache())
+        vector_index = JobVectorIndex()
+        if args.command == "rebuild":
+            await run_io(vector_index.remove, list(vector_index.digests()))
+        try:
+            return await sync(vector_index, store)
+        finally:
+            if hasattr(service, "close"):
+                await service.close()
+
+    counts = asyncio.run(run_sync())
+    shutdown_executors()
+    print(f"✅ {counts['indexed']} indexed, {counts['removed']} removed, {counts['failed']} failed")
@@ -0,0 +1,126 @@
+"""
+Load test: show that slow analyses no longer stall other requests.
+
+Fires a batch of concurrent /analyze-job-match/ requests and, while they are
+in flight, measures GET / latency. Before the handlers moved blocking work off
+the event loop, GET / waited for every analysis ahead of it.
+
+Usage:
+    python load_test.py                      # in-process, simulated S3/LLM latency
+    python load_test.py --base-url http://localhost:8000 \\
+        --resume resumes/<uuid>.pdf --job job_descriptions/<uuid>.pdf
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def timed_get(client: httpx.AsyncClient, path: str) -> float:
+    start = time.perf_counter()
+    response = await client.get(path)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def timed_analyze(client: httpx.AsyncClient, resume: str, job: str) -> float:
+    start = time.perf_counter()
+    await client.post("/analyze-job-match/", data={"resume_filename": resume, "job_filename": job})
+    return time.perf_counter() - start
+
+
+async def run_load(client: httpx.AsyncClient, resume: str, job: str, analyses: int, probes: int):
+    # Baseline latency of the cheap endpoint with nothing else running
+    baseline = [await timed_get(client, "/") for _ in range(probes)]
+
+    analysis_tasks = [asyncio.create_task(timed_analyze(client, resume, job)) for _ in range(analyses)]
+    await asyncio.sleep(0.05)  # let the analyses get going
+
+    under_load = []
+    for _ in range(probes):
+        under_load.append(await timed_get(client, "/"))
+        await asyncio.sleep(0.01)
+
+    analysis_times = await asyncio.gather(*analysis_tasks)
+
+    print(f"\n📊 GET / latency, {analyses} concurrent analyses in flight")
+    print(f"   idle:       p50={percentile(baseline, 50) * 1000:.1f}ms  p99={percentile(baseline, 99) * 1000:.1f}ms")
+    print(f"   under load: p50={percentile(under_load, 50) * 1000:.1f}ms  p99={percentile(under_load, 99) * 1000:.1f}ms")
+    print(f"   analysis:   mean={statistics.mean(analysis_times) * 1000:.0f}ms  max={max(analysis_times) * 1000:.0f}ms")
+    return baseline, under_load, analysis_times
+
+
+def install_simulated_backends(main, s3_latency: float, llm_latency: float):
+    """Replace S3 and OpenAI with blocking fakes so the test runs offline"""
+    sample_text = b"Python developer with 5 years of FastAPI and AWS experience"
+
+    class NoIndex:
+        def get(self, s3_key):
+            return None
+
+    class SlowS3:
+        metadata_index = NoIndex()
+
+        def download_file(self, s3_key):
+            time.sleep(s3_latency)
+            return sample_text
+
+        def get_artifact(self, s3_key):
+            return None
+
+    class SlowMatcher:
+        model = "simulated"
+        PROMPT_VERSION = "1"
+
+        def analyze_job_match(self, resume_text, job_description):
+            time.sleep(llm_latency)
+            return {"recommendation": "APPLY", "match_score": 80, "processing_status": "success"}
+
+    main.s3_service = SlowS3()
+    main.document_store.s3_service = main.s3_service
+    main.job_matcher = SlowMatcher()
+
+
+async def main_async(args):
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+            await run_load(client, args.resume, args.job, args.analyses, args.probes)
+        return
+
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    os.environ.setdefault("S3_BUCKET_NAME", "load-test")
+    import main
+
+    install_simulated_backends(main, args.s3_latency, args.llm_latency)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+        baseline, under_load, analysis_times = await run_load(
+            client, "resumes/sample.txt", "job_descriptions/sample.txt", args.analyses, args.probes
+        )
+
+    # With blocking handlers GET / would wait for a whole LLM call
+    if percentile(under_load, 99) < args.llm_latency:
+        print("✅ Cheap requests are not waiting on in-flight analyses")
+    else:
+        print("❌ GET / is still waiting on in-flight analyses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Run against a live server instead of in-process")
+    parser.add_argument("--resume", default="resumes/sample.pdf", help="Resume S3 key (live mode)")
+    parser.add_argument("--job", default="job_descriptions/sample.pdf", help="Job description S3 key (live mode)")
+    parser.add_argument("--analyses", type=int, default=20, help="Concurrent analyses to fire")
+    parser.add_argument("--probes", type=int, default=20, help="GET / probes per phase")
+    parser.add_argument("--s3-latency", type=float, default=0.2, help="Simulated S3 latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Simulated LLM latency (s)")
+    asyncio.run(main_async(parser.parse_args()))
@@ -1,17 +1,42 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import JSONResponse, FileResponse, Response
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Form, Query, Request
+from starlette.requests import ClientDisconnect
+from fastapi.responses import (
+    JSONResponse, FileResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
+)
 from fastapi.middleware.cors import CORSMiddleware
+import hmac
 import os
+import re
+import json
+import asyncio
 import aiofiles
 from pathlib import Path
 import uuid
 from document_processor import DocumentProcessor
 from job_matcher import JobMatcher
-from s3_service import S3Service
-from typing import Optional
+from s3_service import create_s3_service
+from text_cache import TextCache
+from document_store import DocumentTextStore
+from analysis_cache import AnalysisCache, text_hash
+from singleflight import SingleFlight
+from batch_analyzer import BatchAnalyzer, RateLimiter
+from task_queue import TaskQueue, create_task_store, public_task
+from job_vectors import JobVectorIndex, sync as sync_job_vectors
+from upload_stream import SNIFF_BYTES, UploadRejected, check_filename, size_limit_error, sniff_matches, stream_upload
+from metadata_index import DOCUMENT_PREFIXES, listing_etag, public_entry
+import metrics
+from admission import AdmissionController, AdmissionMiddleware
+from profiler import ProfileStore, ProfilingMiddleware, render_collapsed
+from concurrency import IO_THREAD_POOL_SIZE, iterate_io, run_io, run_io_or_await, run_cpu, shutdown_executors
+from typing import Dict, List, Literal, Optional
 
 app = FastAPI(title="JobMatch AI API", version="1.0.0")
 
+# Concurrency limits and bounded queues for the expensive routes. Added first so it
+# runs inside CORS: rejections still carry CORS headers and preflights never queue
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 # Add CORS middleware for React frontend.
 app.add_middleware(
     CORSMiddleware,
@@ -21,193 +46,631 @@ app.add_middleware(
     allow_headers=["*"],        
 )
 
+# Opt-in profiles of analyze and process-document requests (X-Profile header, or slow requests)
+profile_store = ProfileStore()
+app.add_middleware(ProfilingMiddleware, store=profile_store)
+
+# Requests in flight and latency per route, served with the stage metrics at /metrics
+app.add_middleware(metrics.MetricsMiddleware, routes=app.routes)
+
 # Initialize processors
 doc_processor = DocumentProcessor()
 
-# Initialize S3 service
-s3_service = S3Service()
+# Initialize S3 service (boto3 or aiobotocore, selected by S3_BACKEND)
+s3_service = create_s3_service()
+
+# Extracted text is stored as an artifact at upload and cached by content hash,
+# so repeated matches skip the S3 GET and the parse
+text_cache = TextCache()
+document_store = DocumentTextStore(s3_service, doc_processor, text_cache)
+
+# Initialize job matcher. Without OPENAI_API_KEY the worker still starts; analyses
+# fall back to the local skill-overlap score and /readyz reports OpenAI as unconfigured
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+
+# Results are cached by (resume text, job text, model, prompt version)
+analysis_cache = AnalysisCache()
+job_matcher = JobMatcher(OPENAI_API_KEY, result_cache=analysis_cache)
+
+# One rate limiter per worker keeps every batch within the OpenAI RPM/TPM limits
+openai_rate_limiter = RateLimiter()
+batch_analyzer = BatchAnalyzer(job_matcher, openai_rate_limiter)
+BATCH_MAX_JOBS = int(os.environ.get("BATCH_MAX_JOBS", "100"))
+
+# Cheap first stage: TF-IDF vectors of every job description, so only the
+# closest jobs for a resume are sent to the LLM
+job_vectors = JobVectorIndex()
+SHORTLIST_TOP_K = int(os.environ.get("SHORTLIST_TOP_K", "10"))
+
+async def shortlist_jobs(resume_text: str, top_k: int) -> List[dict]:
+    """The top_k job descriptions closest to a resume, most similar first
+
+    Jobs are indexed at upload and by the reconcile loop, so the index is searched as it is.
+    """
+    matches = await run_io(job_vectors.search, resume_text, top_k)
+    indexed = await run_io(s3_service.metadata_index.get_many, [s3_key for s3_key, _ in matches])
+    return [
+        {
+            "job_filename": s3_key,
+            "original_filename": indexed.get(s3_key, {}).get("original_filename", Path(s3_key).name),
+            "similarity": similarity
+        }
+        for s3_key, similarity in matches
+    ]
+
+async def ingest_job_description(s3_key: str, content: Optional[bytes]):
+    """Background task for job uploads: store the text artifact, then index the job's vector"""
+    await document_store.ingest_quietly(s3_key, content)
+    try:
+        text = await document_store.get_text(s3_key)
+        await run_io(job_vectors.add, s3_key, text)
+    except Exception as e:
+        print(f"Vector indexing failed for {s3_key}: {str(e)}")
+
+# Identical analyses in flight at the same time share one OpenAI call
+analysis_flight = SingleFlight("analysis")
+
+async def run_analysis(resume_text: str, job_text: str) -> dict:
+    """Run JobMatcher.analyze_job_match off the event loop, coalescing identical calls"""
+    key = (text_hash(resume_text), text_hash(job_text), job_matcher.model, job_matcher.PROMPT_VERSION)
+    result = await analysis_flight.do(
+        key, lambda: run_io(job_matcher.analyze_job_match, resume_text, job_text)
+    )
+    # Every waiter gets its own copy to annotate
+    return dict(result)
+
+# Listings are served from the metadata index; a periodic reconcile picks up
+# objects written by other workers or outside the API (0 disables it)
+METADATA_RECONCILE_INTERVAL = int(os.environ.get("METADATA_RECONCILE_INTERVAL", "300"))
+reconcile_task: Optional[asyncio.Task] = None
+
+# The S3 and OpenAI clients and the tokenizer are created on first use, so a new worker
+# takes traffic as soon as it has imported; warm-up builds them in the background meanwhile
+WARM_UP_ON_STARTUP = os.environ.get("WARM_UP_ON_STARTUP", "true").lower() == "true"
+warm_up_task: Optional[asyncio.Task] = None
+warm_up_errors: Dict[str, str] = {}
+accepting_traffic = False
+
+async def warm_up():
+    try:
+        await run_io_or_await(s3_service.warm_up)
+    except Exception as e:
+        warm_up_errors["s3"] = str(e)
+        print(f"S3 client warm-up failed: {str(e)}")
+    if job_matcher.configured:
+        try:
+            await run_io(job_matcher.warm_up)
+        except Exception as e:
+            warm_up_errors["openai"] = str(e)
+            print(f"OpenAI client warm-up failed: {str(e)}")
+
+async def reconcile_metadata_periodically():
+    while True:
+        for prefix in DOCUMENT_PREFIXES:
+            try:
+                await run_io_or_await(s3_service.reconcile_index, prefix)
+            except Exception as e:
+                print(f"Metadata reconcile failed for {prefix}: {str(e)}")
+        try:
+            await sync_job_vectors(job_vectors, document_store)
+        except Exception as e:
+            print(f"Vector index sync failed: {str(e)}")
+        await asyncio.sleep(METADATA_RECONCILE_INTERVAL)
 
-# Initialize job matcher (you'll need to set your OpenAI API key)
-OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
-if not OPENAI_API_KEY:
-    # You can either set this as environment variable or hardcode it temporarily
-    # For production, always use environment variables!
-    OPENAI_API_KEY = "your-openai-api-key-here"  # REPLACE WITH YOUR ACTUAL KEY
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start the metadata index reconcile loop and task workers, and drop expired cached analyses"""
+    global reconcile_task, warm_up_task, accepting_traffic
+    await run_io(analysis_cache.purge_expired)
+    await task_queue.start()
+    if WARM_UP_ON_STARTUP:
+        warm_up_task = asyncio.create_task(warm_up())
+    if METADATA_RECONCILE_INTERVAL > 0:
+        reconcile_task = asyncio.create_task(reconcile_metadata_periodically())
+    accepting_traffic = True
 
-job_matcher = JobMatcher(OPENAI_API_KEY)
+@app.on_event("shutdown")
+async def shutdown_pools():
+    """Close the S3 connection pool and drain the worker pools"""
+    global accepting_traffic
+    accepting_traffic = False
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    await task_queue.stop()
+    if hasattr(s3_service, "close"):
+        await s3_service.close()
+    profile_store.stop()
+    shutdown_executors()
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {".pdf", ".doc", ".docx", ".txt"}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+# Re-uploading a document with the same SHA-256 returns the existing one instead of storing a copy
+DEDUPLICATE_UPLOADS = os.environ.get("DEDUPLICATE_UPLOADS", "true").lower() == "true"
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# Uploads are read from the request body as it arrives, so the whole file is never held in memory
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
 
-@app.post("/upload-resume/")
-async def upload_resume(file: UploadFile = File(...)):
+async def receive_upload(request: Request, prefix: str, file_type: str) -> dict:
+    """Stream the uploaded file to S3, turning rejections into HTTP errors"""
+    try:
+        result = await stream_upload(
+            request, s3_service, prefix, file_type, ALLOWED_EXTENSIONS, MAX_FILE_SIZE,
+            deduplicate=DEDUPLICATE_UPLOADS
+        )
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ClientDisconnect:
+        raise HTTPException(status_code=400, detail="Upload interrupted")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=f"Failed to upload to S3: {result['error']}")
+    return result
+
+def upload_response(label: str, result: dict, file_type: str) -> JSONResponse:
+    """Upload result; `duplicate` marks an upload answered with an existing identical document"""
+    duplicate = result.get("duplicate", False)
+    return JSONResponse(
+        status_code=200,
+        content={
+            "message": f"{label} already uploaded" if duplicate else f"{label} uploaded successfully",
+            "filename": result["filename"],
+            "original_filename": result["original_filename"],
+            "file_size": result["file_size"],
+            "s3_key": result["s3_key"],
+            "file_type": file_type,
+            "duplicate": duplicate,
+            "content_hash": result.get("content_hash")
+        }
+    )
+
+def duplicate_result(entry: dict) -> dict:
+    """Upload result pointing at an existing indexed document"""
+    return {
+        "duplicate": True,
+        "filename": Path(entry["filename"]).name,
+        "original_filename": entry["original_filename"],
+        "file_size": entry["size"],
+        "s3_key": entry["filename"],
+        "content_hash": entry["content_hash"]
+    }
+
+@app.post("/upload-resume/", openapi_extra=UPLOAD_OPENAPI)
+async def upload_resume(request: Request, background_tasks: BackgroundTasks):
     """Upload a resume file to S3"""
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file uploaded")
-    
-    file_extension = Path(file.filename).suffix.lower()
-    if file_extension not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+    result = await receive_upload(request, "resumes/", "resume")
+    # Extract text once, after the response is sent, so analyses can skip the parse.
+    # Multipart uploads aren't kept in memory, so ingest downloads those.
+    if not result["duplicate"]:
+        background_tasks.add_task(document_store.ingest_quietly, result["s3_key"], result["content"])
+    return upload_response("Resume", result, "resume")
+
+@app.post("/upload-job-description/", openapi_extra=UPLOAD_OPENAPI)
+async def upload_job_description(request: Request, background_tasks: BackgroundTasks):
+    """Upload a job description file to S3"""
+    result = await receive_upload(request, "job_descriptions/", "job_description")
+    # Extract text and index the job once, after the response is sent
+    if not result["duplicate"]:
+        background_tasks.add_task(ingest_job_description, result["s3_key"], result["content"])
+    return upload_response("Job description", result, "job_description")
+
+# Direct-to-S3 transfers: the browser PUTs to and GETs from presigned URLs, and
+# the API only signs them and registers finished uploads
+PRESIGNED_URL_TTL = int(os.environ.get("PRESIGNED_URL_TTL", "900"))
+
+async def presign_upload(prefix: str, file_type: str, label: str, filename: str, file_size: int,
+                         content_sha256: Optional[str]):
+    """Presigned PUT for a new document, after the same name and size checks as a proxied upload
+
+    With the file's SHA-256, an identical existing document is returned
+    instead (no upload needed), and S3 verifies the uploaded body against it.
+    """
+    try:
+        extension = check_filename(Path(filename).name, ALLOWED_EXTENSIONS)
+        if file_size > MAX_FILE_SIZE:
+            raise size_limit_error(MAX_FILE_SIZE)
+        if file_size <= 0:
+            raise UploadRejected(400, "File is empty")
+        if content_sha256 is not None:
+            content_sha256 = content_sha256.lower()
+            if not SHA256_PATTERN.fullmatch(content_sha256):
+                raise UploadRejected(400, "content_sha256 must be a hex SHA-256 digest")
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    s3_key = f"{prefix}{uuid.uuid4()}{extension}"
+    try:
+        if content_sha256 and DEDUPLICATE_UPLOADS:
+            existing = await run_io_or_await(s3_service.find_duplicate, prefix, content_sha256)
+            if existing is not None:
+                return upload_response(label, duplicate_result(existing), file_type)
+        signed = await run_io_or_await(
+            s3_service.create_upload_url, s3_key, Path(filename).name, file_type, file_size, PRESIGNED_URL_TTL,
+            content_sha256
         )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "duplicate": False,
+        "upload_url": signed["url"],
+        "method": "PUT",
+        "headers": signed["headers"],
+        "s3_key": s3_key,
+        "expires_in": PRESIGNED_URL_TTL
+    }
+
+def is_upload_key(s3_key: str, prefix: str) -> bool:
+    """Whether s3_key has the shape presign_upload gives out under prefix"""
+    name = s3_key[len(prefix):] if s3_key.startswith(prefix) else ""
+    try:
+        uuid.UUID(Path(name).stem)
+    except ValueError:
+        return False
+    return "/" not in name and Path(name).suffix in ALLOWED_EXTENSIONS
+
+async def complete_upload(prefix: str, file_type: str, s3_key: str) -> dict:
+    """Check and index a document the browser uploaded straight to S3"""
+    if not is_upload_key(s3_key, prefix):
+        raise HTTPException(status_code=400, detail="Not an upload key for this document type")
+    try:
+        entry = await run_io_or_await(s3_service.register_upload, s3_key, file_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Upload not found; PUT the file to upload_url first")
+
+    # The presigned PUT pinned the size, but the content still needs the same sniffing as a proxied upload
+    rejection = None
+    if entry["size"] > MAX_FILE_SIZE:
+        rejection = size_limit_error(MAX_FILE_SIZE)
+    else:
+        head = await run_io_or_await(s3_service.read_range, s3_key, SNIFF_BYTES)
+        if not sniff_matches(head, Path(s3_key).suffix):
+            rejection = UploadRejected(400, f"File content does not match its {Path(s3_key).suffix} extension")
+    if rejection is not None:
+        await run_io_or_await(s3_service.delete_file, s3_key)
+        raise HTTPException(status_code=rejection.status_code, detail=rejection.detail)
+
+    # Two presigned uploads of the same file can race; the later one is dropped
+    if entry["content_hash"] and DEDUPLICATE_UPLOADS:
+        existing = await run_io_or_await(s3_service.find_duplicate, prefix, entry["content_hash"])
+        if existing is not None and existing["filename"] != s3_key:
+            await run_io_or_await(s3_service.delete_file, s3_key)
+            return duplicate_result(existing)
+
+    return {
+        "duplicate": False,
+        "filename": Path(s3_key).name,
+        "original_filename": entry["original_filename"],
+        "file_size": entry["size"],
+        "s3_key": s3_key,
+        "content_hash": entry["content_hash"]
+    }
+
+@app.post("/upload-resume/presign")
+async def presign_resume_upload(filename: str = Form(...), file_size: int = Form(...),
+                                content_sha256: Optional[str] = Form(None)):
+    """Presigned URL for uploading a resume straight to S3; call /upload-resume/complete afterwards"""
+    return await presign_upload("resumes/", "resume", "Resume", filename, file_size, content_sha256)
+
+@app.post("/upload-resume/complete")
+async def complete_resume_upload(background_tasks: BackgroundTasks, s3_key: str = Form(...)):
+    """Register a resume uploaded with a presigned URL and extract its text"""
+    result = await complete_upload("resumes/", "resume", s3_key)
+    if not result["duplicate"]:
+        background_tasks.add_task(document_store.ingest_quietly, s3_key)
+    return upload_response("Resume", result, "resume")
+
+@app.post("/upload-job-description/presign")
+async def presign_job_description_upload(filename: str = Form(...), file_size: int = Form(...),
+                                         content_sha256: Optional[str] = Form(None)):
+    """Presigned URL for uploading a job description straight to S3; call /upload-job-description/complete afterwards"""
+    return await presign_upload(
+        "job_descriptions/", "job_description", "Job description", filename, file_size, content_sha256
+    )
+
+@app.post("/upload-job-description/complete")
+async def complete_job_description_upload(background_tasks: BackgroundTasks, s3_key: str = Form(...)):
+    """Register a job description uploaded with a presigned URL, extract its text and index it"""
+    result = await complete_upload("job_descriptions/", "job_description", s3_key)
+    if not result["duplicate"]:
+        background_tasks.add_task(ingest_job_description, s3_key, None)
+    return upload_response("Job description", result, "job_description")
+
+async def analyze_documents(resume_filename: str, job_filename: str, mode: str = "full") -> dict:
+    """Analysis result for two uploaded documents, with their file metadata"""
+    # Fetch extracted text for both documents (cached, or downloaded and parsed)
+    resume_data, job_data = await asyncio.gather(
+        document_store.process(resume_filename, "resume"),
+        document_store.process(job_filename, "job_description")
+    )
     
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=413, 
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
-        )
+    resume_text = resume_data["raw_text"]
+    job_text = job_data["raw_text"]
     
-    # Generate S3 key with UUID but store original filename in metadata
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    s3_key = f"resumes/{unique_filename}"
+    # Perform AI analysis, or the local skill-overlap score in fast mode
+    if mode == "fast":
+        analysis_result = job_matcher.quick_score(resume_text, job_text)
+    else:
+        analysis_result = await run_analysis(resume_text, job_text)
     
-    try:
-        result = s3_service.upload_file(
-            file_content=content,
-            s3_key=s3_key,
-            original_filename=file.filename,
-            file_type="resume"
-        )
+    # Add file metadata to response
+    analysis_result.update({
+        "resume_filename": resume_filename,
+        "job_filename": job_filename,
+        "resume_metadata": resume_data["metadata"],
+        "job_metadata": job_data["metadata"]
+    })
+    return analysis_result
+
+async def run_analysis_task(payload: dict, last_attempt: bool) -> dict:
+    """Task queue handler for queued analyses"""
+    analysis_result = await analyze_documents(payload["resume_filename"], payload["job_filename"], payload["mode"])
+    # An OpenAI failure still gives the local fallback score; retry for the real thing while we can
+    if analysis_result.get("processing_status") == "fallback" and not last_attempt:
+        raise Exception(f"AI analysis failed: {analysis_result.get('error_message')}")
+    return analysis_result
 
-        if not result["success"]:
-            raise HTTPException(status_code=500, detail=f"Failed to upload to S3: {result['error']}")
+# Queued analyses outlive the request that submitted them, so they aren't cut
+# off by proxy timeouts; clients poll for the result
+task_queue = TaskQueue(create_task_store(), {"analysis": run_analysis_task})
+
+# Admission lanes share the I/O thread pool with the batch analyzer and the task
+# workers, so they are sized once both exist
+admission.configure(IO_THREAD_POOL_SIZE, batch_analyzer.max_concurrency, task_queue.workers)
+
+@app.post("/analyze-job-match/")
+async def analyze_job_match(
+    resume_filename: str = Form(...),
+    job_filename: str = Form(...),
+    mode: Literal["full", "fast"] = Form("full")
+):
+    """
+    Analyze how well a resume matches a job description using AI
+    
+    Args:
+        resume_filename: Filename of uploaded resume
+        job_filename: Filename of uploaded job description
+        mode: "full" for the OpenAI analysis, "fast" for the instant local skill-overlap score
+    """
+
+    try:
+        analysis_result = await analyze_documents(resume_filename, job_filename, mode)
         
         return JSONResponse(
             status_code=200,
             content={
-                "message": "Resume uploaded successfully",
-                "filename": unique_filename,
-                "original_filename": file.filename,
-                "file_size": len(content),
-                "s3_key": s3_key,
-                "file_type": "resume"
+                "message": "Job match analysis completed successfully",
+                "analysis": analysis_result
             }
         )
-    
+        
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
-
-@app.post("/upload-job-description/")
-async def upload_job_description(file: UploadFile = File(...)):
-    """Upload a job description file to S3"""
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file uploaded")
-    
-    file_extension = Path(file.filename).suffix.lower()
-    if file_extension not in ALLOWED_EXTENSIONS:
         raise HTTPException(
-            status_code=400, 
-            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+            status_code=500, 
+            detail=f"Analysis failed: {str(e)}"
         )
+
+@app.post("/analysis-tasks/", status_code=202)
+async def submit_analysis_task(
+    resume_filename: str = Form(...),
+    job_filename: str = Form(...),
+    mode: Literal["full", "fast"] = Form("full")
+):
+    """
+    Queue a job match analysis and return its task id straight away
     
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=413, 
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
+    Args:
+        resume_filename: Filename of uploaded resume
+        job_filename: Filename of uploaded job description
+        mode: "full" for the OpenAI analysis, "fast" for the local skill-overlap score
+    """
+    try:
+        task = await task_queue.submit(
+            "analysis", {"resume_filename": resume_filename, "job_filename": job_filename, "mode": mode}
         )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue analysis: {str(e)}")
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Analysis queued",
+            "task_id": task["task_id"],
+            "status": task["status"],
+            "status_url": f"/analysis-tasks/{task['task_id']}"
+        }
+    )
+
+@app.get("/analysis-tasks/{task_id}")
+async def get_analysis_task(task_id: str):
+    """Status of a queued analysis, with the result once it has succeeded"""
+    task = await task_queue.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found or expired")
+    return public_task(task)
+
+def sse_event(event: str, data) -> str:
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/analyze-job-match/stream")
+async def analyze_job_match_stream(
+    resume_filename: str = Form(...),
+    job_filename: str = Form(...)
+):
+    """
+    Analyze a resume against a job description, streaming progress as Server-Sent Events
+    
+    Events, in order: `document` once per document as its text is ready, `preview`
+    with the instant local skill-overlap score, `token` for each piece of the
+    model's answer, then `result` with the parsed analysis (or `error`).
+    
+    Args:
+        resume_filename: Filename of uploaded resume
+        job_filename: Filename of uploaded job description
+    """
+    async def events():
+        pending = {
+            asyncio.ensure_future(document_store.process(resume_filename, "resume")): "resume",
+            asyncio.ensure_future(document_store.process(job_filename, "job_description")): "job_description"
+        }
+        documents = {}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    doc_type = pending.pop(task)
+                    documents[doc_type] = task.result()
+                    yield sse_event("document", {"document": doc_type, "metadata": documents[doc_type]["metadata"]})
+        except Exception as e:
+            for task in pending:
+                task.cancel()
+            yield sse_event("error", {"detail": f"Analysis failed: {str(e)}"})
+            return
+        
+        resume_text = documents["resume"]["raw_text"]
+        job_text = documents["job_description"]["raw_text"]
+        file_metadata = {
+            "resume_filename": resume_filename,
+            "job_filename": job_filename,
+            "resume_metadata": documents["resume"]["metadata"],
+            "job_metadata": documents["job_description"]["metadata"]
+        }
+        
+        analysis_result = await run_io(job_matcher.get_cached, resume_text, job_text)
+        if analysis_result is None:
+            yield sse_event("preview", job_matcher.quick_score(resume_text, job_text))
+            pieces = []
+            try:
+                async for piece in iterate_io(job_matcher.stream_analysis(resume_text, job_text)):
+                    pieces.append(piece)
+                    yield sse_event("token", {"text": piece})
+                analysis_result = await run_io(
+                    job_matcher.complete_streamed_analysis, resume_text, job_text, "".join(pieces)
+                )
+            except Exception as e:
+                analysis_result = job_matcher.fallback_result(resume_text, job_text, e)
+                analysis_result["cache_hit"] = False
+        
+        analysis_result.update(file_metadata)
+        yield sse_event("result", analysis_result)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/batch-analyze/")
+async def batch_analyze(
+    resume_filename: str = Form(...),
+    job_filenames: Optional[List[str]] = Form(None),
+    top_k: int = Form(SHORTLIST_TOP_K, ge=1),
+    mode: Literal["full", "fast", "packed"] = Form("full")
+):
+    """
+    Rank one resume against several job descriptions, analyzed concurrently
     
-    # Generate S3 key with UUID but store original filename in metadata
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    s3_key = f"job_descriptions/{unique_filename}"
+    Args:
+        resume_filename: S3 key of an uploaded resume
+        job_filenames: S3 keys of uploaded job descriptions (repeat the field per job);
+            omit to analyze the top_k jobs from the similarity shortlist
+        top_k: Shortlist size when job_filenames is omitted
+        mode: "full" for one OpenAI analysis per job, "packed" for several jobs per
+            OpenAI call, "fast" for local skill-overlap scores
+    """
+    if len(job_filenames or []) > BATCH_MAX_JOBS or top_k > BATCH_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_JOBS} jobs per batch")
     
     try:
-        result = s3_service.upload_file(
-            file_content=content,
-            s3_key=s3_key,
-            original_filename=file.filename,
-            file_type="job_description"
+        similarities = {}
+        if not job_filenames:
+            resume_text = await document_store.get_text(resume_filename)
+            shortlist = await shortlist_jobs(resume_text, top_k)
+            job_filenames = [job["job_filename"] for job in shortlist]
+            similarities = {job["job_filename"]: job["similarity"] for job in shortlist}
+        
+        texts = await asyncio.gather(
+            document_store.get_text(resume_filename),
+            *(document_store.get_text(job_filename) for job_filename in job_filenames)
         )
+        indexed = await run_io(s3_service.metadata_index.get_many, job_filenames)
+        jobs = [
+            {
+                "text": job_text,
+                "filename": job_filename,
+                "title": indexed.get(job_filename, {}).get("original_filename", Path(job_filename).name)
+            }
+            for job_filename, job_text in zip(job_filenames, texts[1:])
+        ]
         
-        if not result["success"]:
-            raise HTTPException(status_code=500, detail=f"Failed to upload to S3: {result['error']}")
+        results = await batch_analyzer.analyze(texts[0], jobs, fast=mode == "fast", packed=mode == "packed")
+        for result in results:
+            if result["job_filename"] in similarities:
+                result["similarity"] = similarities[result["job_filename"]]
         
         return JSONResponse(
             status_code=200,
             content={
-                "message": "Job description uploaded successfully",
-                "filename": unique_filename,
-                "original_filename": file.filename,
-                "file_size": len(content),
-                "s3_key": s3_key,
-                "file_type": "job_description"
+                "message": "Batch analysis completed successfully",
+                "resume_filename": resume_filename,
+                "results": results
             }
         )
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch analysis failed: {str(e)}"
+        )
 
-@app.post("/analyze-job-match/")
-async def analyze_job_match(
+@app.post("/shortlist-jobs/")
+async def shortlist(
     resume_filename: str = Form(...),
-    job_filename: str = Form(...)
+    top_k: int = Form(SHORTLIST_TOP_K, ge=1, le=1000)
 ):
     """
-    Analyze how well a resume matches a job description using AI
+    Rank job descriptions by text similarity to a resume, without calling the LLM
     
     Args:
-        resume_filename: Filename of uploaded resume
-        job_filename: Filename of uploaded job description
+        resume_filename: S3 key of an uploaded resume
+        top_k: Number of jobs to return
     """
-
     try:
-        # Download files from S3
-        resume_s3_key = resume_filename
-        job_s3_key = job_filename
-        
-        resume_content = s3_service.download_file(resume_s3_key)
-        job_content = s3_service.download_file(job_s3_key)
-        
-        # Save temporarily to process with document processor
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(resume_filename).suffix) as temp_resume:
-            temp_resume.write(resume_content)
-            temp_resume_path = temp_resume.name
-            
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(job_filename).suffix) as temp_job:
-            temp_job.write(job_content)
-            temp_job_path = temp_job.name
-        
-        try:
-            # Extract text from both documents
-            resume_data = doc_processor.process_resume(temp_resume_path)
-            job_data = doc_processor.process_job_description(temp_job_path)
-            
-            resume_text = resume_data["raw_text"]
-            job_text = job_data["raw_text"]
-            
-            # Perform AI analysis
-            analysis_result = job_matcher.analyze_job_match(resume_text, job_text)
-            
-            # Add file metadata to response
-            analysis_result.update({
-                "resume_filename": resume_filename,
-                "job_filename": job_filename,
-                "resume_metadata": resume_data["metadata"],
-                "job_metadata": job_data["metadata"]
-            })
-            
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "message": "Job match analysis completed successfully",
-                    "analysis": analysis_result
-                }
-            )
-            
-        finally:
-            # Clean up temporary files
-            os.unlink(temp_resume_path)
-            os.unlink(temp_job_path)
-        
+        resume_text = await document_store.get_text(resume_filename)
     except Exception as e:
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Analysis failed: {str(e)}"
-        )
+        raise HTTPException(status_code=404, detail=f"Resume file not found: {str(e)}")
+    
+    try:
+        jobs = await shortlist_jobs(resume_text, top_k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Shortlisting failed: {str(e)}")
+    
+    return JSONResponse(content={
+        "message": "Job shortlist computed successfully",
+        "resume_filename": resume_filename,
+        "jobs": jobs
+    })
 
 @app.post("/process-document/{filename}")
 async def process_document(filename: str, doc_type: str):
@@ -215,24 +678,12 @@ async def process_document(filename: str, doc_type: str):
     if doc_type == "resume":
         s3_key = f"resumes/{filename}"
         try:
-            file_content = s3_service.download_file(s3_key)
-            
-            # Save temporarily to process with document processor
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as temp_file:
-                temp_file.write(file_content)
-                temp_file_path = temp_file.name
-            
-            try:
-                result = doc_processor.process_resume(temp_file_path)
-                return JSONResponse(content={
-                    "message": "Resume processed successfully",
-                    "filename": filename,
-                    "processing_result": result
-                })
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
+            result = await document_store.process(s3_key, "resume")
+            return JSONResponse(content={
+                "message": "Resume processed successfully",
+                "filename": filename,
+                "processing_result": result
+            })
                 
         except Exception as e:
             raise HTTPException(status_code=404, detail=f"Resume file not found: {str(e)}")
@@ -240,24 +691,12 @@ async def process_document(filename: str, doc_type: str):
     elif doc_type == "job_description":
         s3_key = f"job_descriptions/{filename}"
         try:
-            file_content = s3_service.download_file(s3_key)
-            
-            # Save temporarily to process with document processor
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as temp_file:
-                temp_file.write(file_content)
-                temp_file_path = temp_file.name
-            
-            try:
-                result = doc_processor.process_job_description(temp_file_path)
-                return JSONResponse(content={
-                    "message": "Job description processed successfully",
-                    "filename": filename,
-                    "processing_result": result
-                })
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
+            result = await document_store.process(s3_key, "job_description")
+            return JSONResponse(content={
+                "message": "Job description processed successfully",
+                "filename": filename,
+                "processing_result": result
+            })
                 
         except Exception as e:
             raise HTTPException(status_code=404, detail=f"Job description file not found: {str(e)}")
@@ -273,56 +712,243 @@ async def root():
         "endpoints": {
             "upload_resume": "/upload-resume/",
             "upload_job": "/upload-job-description/",
+            "presign_resume_upload": "/upload-resume/presign",
+            "presign_job_upload": "/upload-job-description/presign",
             "analyze_match": "/analyze-job-match/",
+            "analyze_match_stream": "/analyze-job-match/stream",
+            "batch_analyze": "/batch-analyze/",
+            "analysis_tasks": "/analysis-tasks/",
+            "shortlist_jobs": "/shortlist-jobs/",
             "docs": "/docs"
         }
     }
 
-@app.get("/resumes/")
-async def list_resumes():
-    """List all uploaded resume files from S3"""
+async def list_documents(request: Request, prefix: str, response_key: str, limit: int,
+                         cursor: Optional[str], sort: str, order: str, q: Optional[str],
+                         min_size: Optional[int], max_size: Optional[int],
+                         created_after: Optional[float], created_before: Optional[float]):
+    """Serve one page of a listing from the metadata index, honouring If-None-Match"""
+    index = s3_service.metadata_index
     try:
-        files = s3_service.list_files("resumes/")
-        return {"resumes": files}
+        entries, next_cursor = await run_io(
+            index.query, prefix, limit=limit, cursor=cursor, sort=sort, order=order, search=q,
+            min_size=min_size, max_size=max_size,
+            created_after=created_after, created_before=created_before
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
 
-@app.get("/job-descriptions/")
-async def list_job_descriptions():
-    """List all uploaded job description files from S3"""
-    try:
-        files = s3_service.list_files("job_descriptions/")
-        return {"job_descriptions": files}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
+    etag = listing_etag(entries, next_cursor)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
 
-@app.get("/download-resume/{filename}")
-async def download_resume(filename: str):
-    """Download a specific resume file from S3"""
-    s3_key = f"resumes/{filename}"
+    return JSONResponse(
+        content={
+            response_key: [public_entry(entry) for entry in entries],
+            "next_cursor": next_cursor
+        },
+        headers=headers
+    )
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the worker's event loop is answering"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 503 while shutting down or if the S3 client can't be built
+
+    Clients that haven't been created yet don't make the worker unready; they
+    are built in the background or on first use. A missing or broken OpenAI
+    client only degrades analyses to the local score.
+    """
+    s3_error = warm_up_errors.get("s3")
+    ready = accepting_traffic and s3_error is None
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else ("unavailable" if s3_error else "stopping"),
+            "backends": {
+                "s3": {
+                    "backend": type(s3_service).__name__,
+                    "client": "ready" if s3_service.client_ready else "lazy",
+                    "error": s3_error
+                },
+                "openai": {
+                    "configured": job_matcher.configured,
+                    "client": "ready" if job_matcher.client_ready else "lazy",
+                    "tokenizer": "ready" if job_matcher.prompt_builder.tokenizer_loaded else "lazy",
+                    "error": warm_up_errors.get("openai")
+                },
+                "task_queue": {"running": task_queue.running}
+            },
+            "admission": admission.stats(),
+            "warming_up": warm_up_task is not None and not warm_up_task.done()
+        }
+    )
+
+@app.get("/cache-stats/")
+async def cache_stats():
+    """Hit/miss counters for the caches and coalescing counters for single-flight calls"""
+    return {
+        "text_cache": text_cache.stats(),
+        "analysis_cache": await run_io(analysis_cache.stats),
+        "single_flight": {
+            "s3_download": document_store.download_flight.stats(),
+            "analysis": analysis_flight.stats()
+        },
+        "openai_rate_limited": openai_rate_limiter.rate_limited,
+        "packed_analysis_retries": batch_analyzer.packed_retries
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency histograms, cache/fallback/token/byte counters and in-flight gauges for Prometheus"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+# Operations that are expensive to undo (clearing the analysis cache) need X-Admin-Key;
+# without ADMIN_API_KEY they are disabled
+ADMIN_API_KEY = os.environ.get("ADMIN_API_KEY", "")
+
+def require_admin(request: Request):
+    key = request.headers.get("x-admin-key", "")
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin operations are disabled (ADMIN_API_KEY)")
+    if not hmac.compare_digest(key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Key")
+
+def require_profiling():
+    if not profile_store.active:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (PROFILING_ENABLED, PROFILE_SLOW_MS)")
+
+@app.get("/admin/profiles")
+async def list_profiles():
+    """Profiles kept in the ring buffer, newest first"""
+    require_profiling()
+    return {"profiles": profile_store.summaries(), "slow_threshold_ms": profile_store.slow_threshold * 1000}
+
+@app.post("/admin/profiles/arm")
+async def arm_profiles(count: int = Query(1, ge=0, le=100)):
+    """Profile the next `count` analyze/process-document requests, as if they sent X-Profile"""
+    require_profiling()
+    if not profile_store.enabled:
+        raise HTTPException(status_code=404, detail="On-demand profiling is disabled (PROFILING_ENABLED)")
+    profile_store.arm(count)
+    return {"armed": count}
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: Literal["collapsed", "json"] = "collapsed"):
+    """A profile as collapsed stacks (flamegraph.pl, speedscope), or as JSON with the memory snapshot"""
+    require_profiling()
+    record = profile_store.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found (it may have left the ring buffer)")
+    if format == "json":
+        return {**record, "stacks": render_collapsed(record["stacks"])}
+    return PlainTextResponse(
+        render_collapsed(record["stacks"]),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"'}
+    )
+
+@app.delete("/analysis-cache/")
+async def invalidate_analysis_cache(
+    request: Request,
+    resume_filename: Optional[str] = None,
+    job_filename: Optional[str] = None,
+    model: Optional[str] = None,
+    prompt_version: Optional[str] = None,
+    all: bool = False
+):
+    """Drop cached analyses for a resume, a job, a model or prompt version, or everything"""
+    if not (resume_filename or job_filename or model or prompt_version or all):
+        raise HTTPException(status_code=400, detail="Give at least one filter, or all=true to clear the cache")
+    if all or ((model or prompt_version) and not (resume_filename or job_filename)):
+        # Clearing whole models, prompt versions or everything sends every later analysis back to OpenAI
+        require_admin(request)
     try:
-        file_content = s3_service.download_file(s3_key)
-        return Response(
-            content=file_content,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        resume_hash = text_hash(await document_store.get_text(resume_filename)) if resume_filename else None
+        job_hash = text_hash(await document_store.get_text(job_filename)) if job_filename else None
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"File not found: {str(e)}")
+    
+    removed = await run_io(
+        analysis_cache.invalidate, resume_hash=resume_hash, job_hash=job_hash,
+        model=model, prompt_version=prompt_version
+    )
+    return {"message": "Analysis cache invalidated", "removed": removed}
 
-@app.get("/download-job-description/{filename}")
-async def download_job_description(filename: str):
-    """Download a specific job description file from S3"""
-    s3_key = f"job_descriptions/{filename}"
+@app.get("/resumes/")
+async def list_resumes(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: Literal["created", "size", "original_filename"] = "created",
+    order: Literal["asc", "desc"] = "desc",
+    q: Optional[str] = Query(None, description="Substring match on original_filename"),
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+    created_after: Optional[float] = None,
+    created_before: Optional[float] = None
+):
+    """List uploaded resume files, one page at a time"""
+    return await list_documents(
+        request, "resumes/", "resumes", limit, cursor, sort, order, q,
+        min_size, max_size, created_after, created_before
+    )
+
+@app.get("/job-descriptions/")
+async def list_job_descriptions(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: Literal["created", "size", "original_filename"] = "created",
+    order: Literal["asc", "desc"] = "desc",
+    q: Optional[str] = Query(None, description="Substring match on original_filename"),
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+    created_after: Optional[float] = None,
+    created_before: Optional[float] = None
+):
+    """List uploaded job description files, one page at a time"""
+    return await list_documents(
+        request, "job_descriptions/", "job_descriptions", limit, cursor, sort, order, q,
+        min_size, max_size, created_after, created_before
+    )
+
+async def download_document(prefix: str, file_type: str, filename: str, redirect: bool):
+    """Send the client to a presigned S3 URL for a document instead of proxying its bytes"""
+    s3_key = f"{prefix}{filename}"
     try:
-        file_content = s3_service.download_file(s3_key)
-        return Response(
-            content=file_content,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        entry = await run_io(s3_service.metadata_index.get, s3_key)
+        if entry is None and is_upload_key(s3_key, prefix):
+            # Uploaded straight to S3 and not completed or reconciled yet; other names under
+            # the prefix (text artifacts, arbitrary guesses) are never looked up or indexed
+            entry = await run_io_or_await(s3_service.register_upload, s3_key, file_type)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"File not found: {filename}")
+        download_name = entry["original_filename"] if entry["original_filename"] != s3_key else filename
+        url = await run_io_or_await(s3_service.create_download_url, s3_key, download_name, PRESIGNED_URL_TTL)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"File not found: {str(e)}")
+    if redirect:
+        return RedirectResponse(url, status_code=307)
+    return {"url": url, "expires_in": PRESIGNED_URL_TTL}
+
+@app.get("/download-resume/{filename}")
+async def download_resume(filename: str, redirect: bool = True):
+    """Download a specific resume file (redirects to a presigned S3 URL, or returns it with redirect=false)"""
+    return await download_document("resumes/", "resume", filename, redirect)
+
+@app.get("/download-job-description/{filename}")
+async def download_job_description(filename: str, redirect: bool = True):
+    """Download a specific job description file (redirects to a presigned S3 URL, or returns it with redirect=false)"""
+    return await download_document("job_descriptions/", "job_description", filename, redirect)
 
 if __name__ == "__main__":
     import uvicorn
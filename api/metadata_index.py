@@ -0,0 +1,335 @@
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_INDEX_PATH = "uploads/metadata_index.db"
+DOCUMENT_PREFIXES = ("resumes/", "job_descriptions/")
+# Derived objects stored next to documents (e.g. extracted text); never listed or indexed
+ARTIFACT_SUFFIX = ".txt.json"
+SORT_FIELDS = {"created": "created", "size": "size", "original_filename": "original_filename"}
+
+
+class MetadataIndex:
+    """Local SQLite index of object metadata, written at upload time
+
+    Listing joins one paginated list_objects_v2 call against this index instead
+    of issuing a head_object round trip per key.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.environ.get("METADATA_INDEX_PATH", DEFAULT_INDEX_PATH)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    s3_key TEXT PRIMARY KEY,
+                    prefix TEXT NOT NULL,
+                    original_filename TEXT NOT NULL,
+                    file_type TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    etag TEXT,
+                    content_hash TEXT
+                )
+            """)
+            # Indexes created before deduplication lack the hash column
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(documents)")}
+            if "content_hash" not in columns:
+                conn.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_prefix ON documents (prefix)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (prefix, content_hash)"
+            )
+            for field in SORT_FIELDS.values():
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_documents_{field} ON documents (prefix, {field}, s3_key)"
+                )
+            # Listing ETags used to come from a per-file change counter, which collides
+            # across hosts; they are now hashed from the page itself
+            for event in ("insert", "update", "delete"):
+                conn.execute(f"DROP TRIGGER IF EXISTS documents_version_{event}")
+            conn.execute("DROP TABLE IF EXISTS prefix_versions")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across threads and workers
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _prefix_of(s3_key: str) -> str:
+        return s3_key.split("/", 1)[0] + "/" if "/" in s3_key else ""
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict:
+        return {
+            "filename": row["s3_key"],
+            "original_filename": row["original_filename"],
+            "size": row["size"],
+            "created": row["created"],
+            "type": row["file_type"],
+            "etag": row["etag"],
+            "content_hash": row["content_hash"]
+        }
+
+    def upsert(self, s3_key: str, original_filename: str, file_type: str,
+               size: int, created: Optional[float] = None, etag: Optional[str] = None,
+               content_hash: Optional[str] = None):
+        """Record or replace the metadata for one object"""
+        self.upsert_many([{
+            "filename": s3_key,
+            "original_filename": original_filename,
+            "type": file_type,
+            "size": size,
+            "created": created if created is not None else time.time(),
+            "etag": etag,
+            "content_hash": content_hash
+        }])
+
+    def upsert_many(self, entries: Iterable[Dict]):
+        """Record or replace metadata for several objects in one transaction"""
+        rows = [
+            (e["filename"], self._prefix_of(e["filename"]), e["original_filename"],
+             e["type"], e["size"], e["created"], e.get("etag"), e.get("content_hash"))
+            for e in entries
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO documents "
+                "(s3_key, prefix, original_filename, file_type, size, created, etag, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def get(self, s3_key: str) -> Optional[Dict]:
+        """Return the indexed metadata for one object, if any"""
+        return self.get_many([s3_key]).get(s3_key)
+
+    def get_many(self, s3_keys: List[str]) -> Dict[str, Dict]:
+        """Return indexed metadata for the given keys, keyed by S3 key"""
+        found = {}
+        with self._connect() as conn:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(s3_keys), 500):
+                chunk = s3_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(
+                    f"SELECT * FROM documents WHERE s3_key IN ({placeholders})", chunk
+                ):
+                    found[row["s3_key"]] = self._row_to_entry(row)
+        return found
+
+    def find_by_hash(self, prefix: str, content_hash: str) -> Optional[Dict]:
+        """The earliest indexed object under a prefix with this SHA-256, if any"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM documents WHERE prefix = ? AND content_hash = ? ORDER BY created, s3_key LIMIT 1",
+                (prefix, content_hash)
+            ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def list_prefix(self, prefix: str) -> List[Dict]:
+        """Return every indexed object under a top-level prefix"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM documents WHERE prefix = ? ORDER BY s3_key", (prefix,)
+            ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def query(self, prefix: str, limit: int = 100, cursor: Optional[str] = None,
+              sort: str = "created", order: str = "desc", search: Optional[str] = None,
+              min_size: Optional[int] = None, max_size: Optional[int] = None,
+              created_after: Optional[float] = None,
+              created_before: Optional[float] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Return one page of entries under a prefix and the cursor for the next page
+
+        Pagination is keyset-based on (sort field, s3_key), so each page costs
+        the same however deep into the listing it is.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of: {', '.join(SORT_FIELDS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be 'asc' or 'desc'")
+        column = SORT_FIELDS[sort]
+
+        clauses = ["prefix = ?"]
+        params: List = [prefix]
+        if search:
+            clauses.append("original_filename LIKE ? ESCAPE '\\'")
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        for condition, value in (("size >= ?", min_size), ("size <= ?", max_size),
+                                 ("created >= ?", created_after), ("created <= ?", created_before)):
+            if value is not None:
+                clauses.append(condition)
+                params.append(value)
+        if cursor:
+            last_value, last_key = decode_cursor(cursor, sort)
+            comparison = "<" if order == "desc" else ">"
+            clauses.append(f"({column}, s3_key) {comparison} (?, ?)")
+            params.extend([last_value, last_key])
+
+        direction = order.upper()
+        sql = (
+            f"SELECT * FROM documents WHERE {' AND '.join(clauses)} "
+            f"ORDER BY {column} {direction}, s3_key {direction} LIMIT ?"
+        )
+        with self._connect() as conn:
+            # Fetch one extra row to know whether there is a next page
+            rows = conn.execute(sql, params + [limit + 1]).fetchall()
+
+        entries = [self._row_to_entry(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = entries[-1]
+            next_cursor = encode_cursor(sort, last[sort], last["filename"])
+        return entries, next_cursor
+
+    def remove(self, s3_keys: Iterable[str]):
+        """Drop objects from the index"""
+        keys = [(key,) for key in s3_keys]
+        if keys:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM documents WHERE s3_key = ?", keys)
+
+
+def encode_cursor(sort: str, value, s3_key: str) -> str:
+    """Opaque cursor pointing just past (value, s3_key) in the given sort order"""
+    payload = json.dumps([sort, value, s3_key]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple:
+    """Inverse of encode_cursor; rejects cursors issued for a different sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, s3_key = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if cursor_sort != sort:
+        raise ValueError("Cursor was issued for a different sort order")
+    return value, s3_key
+
+
+def listing_etag(entries: List[Dict], next_cursor: Optional[str]) -> str:
+    """ETag for a listing page, from what it contains, so any host serving the same page agrees"""
+    page = [
+        [entry["filename"], entry["etag"], entry["size"], entry["created"], entry["original_filename"]]
+        for entry in entries
+    ]
+    digest = hashlib.sha1(json.dumps([page, next_cursor]).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def document_objects(objects: Iterable[Dict]) -> List[Dict]:
+    """Drop derived artifacts from a list_objects_v2 result"""
+    return [obj for obj in objects if not obj["Key"].endswith(ARTIFACT_SUFFIX)]
+
+
+def needs_describe(obj: Dict, entry: Optional[Dict]) -> bool:
+    """True when a listed object is missing from the index or has changed since"""
+    return entry is None or bool(obj.get("ETag") and entry.get("etag") != obj["ETag"])
+
+
+def merge_listing(objects: List[Dict], indexed: Dict[str, Dict],
+                  describe: Callable[[Dict], Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Combine list_objects_v2 results with indexed metadata
+
+    Objects missing from the index, or whose ETag changed, are passed to
+    `describe` (a head_object lookup). Returns the listing and the entries
+    that should be written back to the index.
+    """
+    files = []
+    stale = []
+    for obj in objects:
+        entry = indexed.get(obj["Key"])
+        if needs_describe(obj, entry):
+            entry = describe(obj)
+            stale.append(entry)
+        files.append(entry)
+    return files, stale
+
+
+def entry_from_object(obj: Dict, metadata: Optional[Dict]) -> Dict:
+    """Build an index entry from a list_objects_v2 item and head_object metadata"""
+    metadata = metadata or {}
+    return {
+        "filename": obj["Key"],
+        "original_filename": metadata.get("original_filename", obj["Key"]),
+        "size": obj["Size"],
+        "created": obj["LastModified"].timestamp(),
+        "type": metadata.get("file_type", "unknown"),
+        "etag": obj.get("ETag"),
+        "content_hash": metadata.get("content_sha256")
+    }
+
+
+def object_from_head(s3_key: str, response: Dict) -> Dict:
+    """Shape a head_object response like a list_objects_v2 item"""
+    return {
+        "Key": s3_key,
+        "Size": response["ContentLength"],
+        "LastModified": response["LastModified"],
+        "ETag": response.get("ETag")
+    }
+
+
+def public_entry(entry: Dict) -> Dict:
+    """Strip index-only fields from a listing entry"""
+    return {key: value for key, value in entry.items() if key not in ("etag", "content_hash")}
+
+
+def apply_reconcile(index: MetadataIndex, prefix: str, objects: List[Dict],
+                    described: Dict[str, Dict], rebuild: bool = False) -> Dict[str, int]:
+    """Write a full listing of a prefix back to the index
+
+    `described` maps keys to head_object-backed entries for every object that
+    objects_to_describe() returned.
+    """
+    indexed = {} if rebuild else {entry["filename"]: entry for entry in index.list_prefix(prefix)}
+    _, stale = merge_listing(objects, indexed, lambda obj: described[obj["Key"]])
+    index.upsert_many(stale)
+
+    live_keys = {obj["Key"] for obj in objects}
+    removed = [entry["filename"] for entry in index.list_prefix(prefix) if entry["filename"] not in live_keys]
+    index.remove(removed)
+
+    return {"objects": len(objects), "updated": len(stale), "removed": len(removed)}
+
+
+def objects_to_describe(index: MetadataIndex, objects: List[Dict], rebuild: bool = False) -> List[Dict]:
+    """Objects a reconcile pass needs head_object metadata for"""
+    if rebuild:
+        return list(objects)
+    indexed = index.get_many([obj["Key"] for obj in objects])
+    return [obj for obj in objects if needs_describe(obj, indexed.get(obj["Key"]))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or reconcile the S3 metadata index")
+    parser.add_argument("command", choices=["reconcile", "rebuild"],
+                        help="reconcile: fix missing/changed/deleted entries; rebuild: re-read every object")
+    parser.add_argument("--prefix", action="append", help="Prefix to process (default: resumes/ and job_descriptions/)")
+    args = parser.parse_args()
+
+    from s3_service import S3Service
+
+    service = S3Service()
+    for prefix in args.prefix or DOCUMENT_PREFIXES:
+        counts = service.reconcile_index(prefix, rebuild=args.command == "rebuild")
+        print(f"✅ {prefix}: {counts['objects']} objects, {counts['updated']} updated, {counts['removed']} removed")
@@ -0,0 +1,347 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.routing import Match
+
+# Prometheus text exposition format served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Stage latencies span sub-millisecond cache reads to multi-second OpenAI calls
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """A named metric with one child per combination of label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values: str, **labels: str):
+        """The child for these (string) label values; keep a reference to it on hot paths"""
+        key = values or tuple(labels[name] for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(value) for value in key), self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _unlabelled(self):
+        # Metrics without labels act as their own single child
+        return self.labels()
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def track_inprogress(self) -> "_InProgress":
+        return _InProgress(self)
+
+
+class _InProgress:
+    __slots__ = ("gauge",)
+
+    def __init__(self, gauge: _Value):
+        self.gauge = gauge
+
+    def __enter__(self):
+        self.gauge.inc()
+
+    def __exit__(self, *exc):
+        self.gauge.dec()
+
+
+class Counter(_Metric):
+    """Monotonic total, e.g. cache hits or tokens sent"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def samples(self):
+        return [(self.name, _label_text(self.labelnames, key), child.value)
+                for key, child in sorted(self._children.items())]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. requests in flight"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._unlabelled().dec(amount)
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def track_inprogress(self) -> _InProgress:
+        return self._unlabelled().track_inprogress()
+
+    def samples(self):
+        return [(self.name, _label_text(self.labelnames, key), child.value)
+                for key, child in sorted(self._children.items())]
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # One slot per bucket plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.upper_bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: _HistogramChild):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets, e.g. stage latencies in seconds"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = STAGE_BUCKETS, registry: Optional["Registry"] = None):
+        self.upper_bounds = tuple(sorted(float(bucket) for bucket in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self) -> _Timer:
+        return self._unlabelled().time()
+
+    def samples(self):
+        samples = []
+        for key, child in sorted(self._children.items()):
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for upper_bound, count in zip(self.upper_bounds + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{"+Inf" if upper_bound == float("inf") else repr(upper_bound)}"'
+                samples.append((f"{self.name}_bucket", _label_text(self.labelnames, key, le), cumulative))
+            labels = _label_text(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    """The set of metrics rendered by /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Every metric in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Each process (uvicorn worker) keeps its own values; Prometheus sums them across scrape targets
+STAGE_SECONDS = Histogram(
+    "jobmatch_stage_duration_seconds",
+    "Time spent in one stage of a request (s3_get, s3_put, s3_list, extract_*, llm_call, parse, fallback_parse)",
+    ["stage"]
+)
+STAGE_IN_FLIGHT = Gauge("jobmatch_stage_in_flight", "Stage calls currently running", ["stage"])
+HTTP_IN_FLIGHT = Gauge("jobmatch_http_requests_in_flight", "HTTP requests currently being handled", ["route"])
+HTTP_SECONDS = Histogram(
+    "jobmatch_http_request_duration_seconds", "End-to-end HTTP request latency", ["route", "method", "status"]
+)
+CACHE_LOOKUPS = Counter(
+    "jobmatch_cache_lookups_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"]
+)
+FALLBACKS = Counter(
+    "jobmatch_analysis_fallbacks_total", "Analyses not produced by a clean OpenAI answer, by reason", ["reason"]
+)
+LLM_TOKENS = Counter("jobmatch_llm_tokens_total", "OpenAI tokens used, by direction (input or output)", ["direction"])
+BYTES_PROCESSED = Counter("jobmatch_bytes_processed_total", "Document bytes moved or parsed, by stage", ["stage"])
+
+
+class _Stage:
+    __slots__ = ("histogram", "in_flight", "start")
+
+    def __init__(self, histogram: _HistogramChild, in_flight: _Value):
+        self.histogram = histogram
+        self.in_flight = in_flight
+
+    def __enter__(self):
+        self.in_flight.inc()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        self.in_flight.dec()
+
+
+_stage_children: Dict[str, Tuple[_HistogramChild, _Value]] = {}
+
+
+def stage(name: str) -> _Stage:
+    """Time a block as one stage and count it as in flight while it runs; works across awaits"""
+    children = _stage_children.get(name)
+    if children is None:
+        children = _stage_children.setdefault(name, (STAGE_SECONDS.labels(name), STAGE_IN_FLIGHT.labels(name)))
+    return _Stage(*children)
+
+
+def count_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def count_fallback(reason: str):
+    FALLBACKS.labels(reason).inc()
+
+
+def count_tokens(input_tokens: Optional[int], output_tokens: Optional[int]):
+    if input_tokens:
+        LLM_TOKENS.labels("input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels("output").inc(output_tokens)
+
+
+def count_bytes(stage_name: str, size: int):
+    BYTES_PROCESSED.labels(stage_name).inc(size)
+
+
+def route_label(routes, scope) -> str:
+    """The matched route's path template, so /files/{filename} is one label rather than one per file"""
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "other")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording requests in flight and end-to-end latency per route
+
+    Streaming responses (SSE) count as in flight until their last byte is sent.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_label(self.routes, scope)
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_SECONDS.labels(route, scope["method"], status).observe(time.perf_counter() - start)
+            in_flight.dec()
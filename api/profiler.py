@@ -0,0 +1,342 @@
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from concurrency import run_cpu, run_io
+
+# Only the document-heavy routes are profiled
+PROFILED_PATH = re.compile(r"^/(?:analyze-job-match/|process-document/[^/]+)$")
+# Leaf frames of threads parked waiting for work (event loop select, idle pool threads)
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+TOP_ALLOCATIONS = 25
+
+# The profile of the request being handled, seen by code that runs work elsewhere (the process pool)
+current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+_labels: Dict[Any, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+    return label
+
+
+def collapse_stack(frame) -> Optional[str]:
+    """A frame's stack as "root;...;leaf", or None if the thread is idle"""
+    leaf = frame.f_code
+    if (Path(leaf.co_filename).name, leaf.co_name) in IDLE_FRAMES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def render_collapsed(stacks: Counter) -> str:
+    """Collapsed-stack text ("frame;frame;frame count" per line) for flamegraph.pl or speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class StackSampler:
+    """Background thread recording the stacks of busy threads every `interval` seconds
+
+    With `thread_id` only that thread is sampled. Samples are kept with their
+    time in a deque of at most `max_samples`, so a long-running sampler uses
+    a fixed amount of memory.
+    """
+
+    def __init__(self, interval: float, thread_id: Optional[int] = None, max_samples: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples: deque = deque(maxlen=max_samples)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        thread_names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_id is not None and thread_id != self.thread_id):
+                    continue
+                stack = collapse_stack(frame)
+                if stack is None:
+                    continue
+                name = thread_names.get(thread_id)
+                if name is None:
+                    thread_names = {
+                        thread.ident: re.sub(r"_\d+$", "", thread.name) for thread in threading.enumerate()
+                    }
+                    name = thread_names.get(thread_id, "thread")
+                # Interned so repeated samples of one stack share a string
+                self.samples.append((now, sys.intern(f"{name};{stack}")))
+
+    def stacks(self, start: float = 0, end: float = float("inf")) -> Counter:
+        """Sample counts per stack for samples taken between start and end (time.monotonic)"""
+        return Counter(stack for taken, stack in list(self.samples) if start <= taken <= end)
+
+
+def sample_call(interval: float, trace_memory: bool, func: Callable[..., Any], *args) -> Tuple[Any, Counter, int]:
+    """Run func while sampling this thread; runs on a worker process. Returns (result, stacks, peak bytes)"""
+    if trace_memory:
+        tracemalloc.start()
+    sampler = StackSampler(interval, thread_id=threading.get_ident()).start()
+    try:
+        result = func(*args)
+    finally:
+        stacks = sampler.stop()
+        peak = 0
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, stacks, peak
+
+
+class RequestProfile:
+    """What is collected for one request while it runs"""
+
+    def __init__(self, interval: float, trace_memory: bool, cold: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.interval = interval
+        self.trace_memory = trace_memory
+        # Skip the text cache and artifact so the documents are parsed again
+        self.cold = cold
+        self.worker_stacks: Counter = Counter()
+        self.worker_peak_bytes = 0
+        self._lock = threading.Lock()
+
+    def add_worker(self, stacks: Counter, peak_bytes: int):
+        with self._lock:
+            for stack, count in stacks.items():
+                self.worker_stacks[f"cpu-worker;{stack}"] += count
+            self.worker_peak_bytes = max(self.worker_peak_bytes, peak_bytes)
+
+
+async def run_cpu_profiled(func: Callable[..., Any], *args) -> Any:
+    """run_cpu, sampling the worker process into the current request's profile if there is one"""
+    profile = current_profile.get()
+    if profile is None:
+        return await run_cpu(func, *args)
+    result, stacks, peak = await run_cpu(sample_call, profile.interval, profile.trace_memory, func, *args)
+    profile.add_worker(stacks, peak)
+    return result
+
+
+def profile_cold() -> bool:
+    """Whether the current request asked to bypass cached text"""
+    profile = current_profile.get()
+    return profile is not None and profile.cold
+
+
+class _MemoryTracer:
+    """tracemalloc shared by overlapping profiled requests; traced only while one is running"""
+
+    def __init__(self):
+        self._users = 0
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self) -> tracemalloc.Snapshot:
+        with self._lock:
+            if self._users == 0:
+                # Leave tracing alone if it was already on (PYTHONTRACEMALLOC)
+                self._started = not tracemalloc.is_tracing()
+                if self._started:
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+            self._users += 1
+        return tracemalloc.take_snapshot()
+
+    def stop(self, before: tracemalloc.Snapshot) -> Dict[str, Any]:
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._started:
+                tracemalloc.stop()
+        top = after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]
+        return {
+            "peak_traced_bytes": peak,
+            "top_allocations": [
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_bytes": stat.size_diff,
+                    "count": stat.count_diff
+                }
+                for stat in top if stat.size_diff
+            ]
+        }
+
+
+class ProfileStore:
+    """Finished profiles in a ring buffer, plus the always-on sampler for slow-request mode"""
+
+    def __init__(self):
+        self.enabled = os.environ.get("PROFILING_ENABLED", "false").lower() == "true"
+        # 0 turns slow-request mode off
+        self.slow_threshold = float(os.environ.get("PROFILE_SLOW_MS", "0")) / 1000
+        self.interval = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+        self.slow_interval = float(os.environ.get("PROFILE_SLOW_SAMPLE_INTERVAL_MS", "10")) / 1000
+        # The slow-mode sampler keeps this many seconds of samples to cut profiles from
+        self.slow_window = float(os.environ.get("PROFILE_SLOW_WINDOW_SECONDS", "120"))
+        self._profiles: deque = deque(maxlen=int(os.environ.get("PROFILE_RING_SIZE", "20")))
+        self._armed = 0
+        self._lock = threading.Lock()
+        self._background: Optional[StackSampler] = None
+        self.memory = _MemoryTracer()
+
+    @property
+    def active(self) -> bool:
+        return self.enabled or self.slow_threshold > 0
+
+    def arm(self, count: int):
+        """Profile the next `count` requests to the profiled routes"""
+        with self._lock:
+            self._armed = count
+
+    def take_armed(self) -> bool:
+        with self._lock:
+            if self._armed <= 0:
+                return False
+            self._armed -= 1
+            return True
+
+    def background(self) -> StackSampler:
+        """The slow-mode sampler, started on first use"""
+        with self._lock:
+            if self._background is None:
+                # Room for about four busy threads per tick over the window
+                max_samples = int(self.slow_window / self.slow_interval) * 4
+                self._background = StackSampler(self.slow_interval, max_samples=max_samples).start()
+            return self._background
+
+    def stop(self):
+        if self._background is not None:
+            self._background.stop()
+            self._background = None
+
+    def add(self, record: Dict[str, Any]):
+        with self._lock:
+            self._profiles.append(record)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((record for record in self._profiles if record["id"] == profile_id), None)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Newest first, without the stacks"""
+        with self._lock:
+            records = list(self._profiles)
+        return [
+            {key: value for key, value in record.items() if key not in ("stacks", "memory")}
+            for record in reversed(records)
+        ]
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling /analyze-job-match/ and /process-document/ requests
+
+    A request is profiled when it has an `X-Profile` header (`1`, or `cold`
+    to parse the documents again instead of using cached text) or an admin
+    armed the next requests; its id comes back in `X-Profile-Id`. In
+    slow-request mode every request slower than the threshold is kept too,
+    cut from an always-on sampler, without memory tracing. Samples cover
+    every thread of the worker, so requests running alongside show up too.
+    """
+
+    def __init__(self, app, store: ProfileStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        store = self.store
+        if scope["type"] != "http" or not store.active or not PROFILED_PATH.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        header = dict(scope["headers"]).get(b"x-profile", b"").decode("latin-1").lower()
+        requested = store.enabled and (header in ("1", "true", "cold") or store.take_armed())
+        if not requested and store.slow_threshold <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            store.interval if requested else store.slow_interval,
+            trace_memory=requested,
+            cold=requested and header == "cold"
+        )
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if requested:
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-profile-id", profile.id.encode("ascii"))]}
+            await send(message)
+
+        if requested:
+            sampler = StackSampler(store.interval).start()
+            # Snapshots walk every traced allocation; take them off the event loop
+            snapshot = await run_io(store.memory.start)
+        else:
+            sampler = store.background()
+        token = current_profile.set(profile)
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            end = time.monotonic()
+            current_profile.reset(token)
+            if requested:
+                stacks = sampler.stop()
+                memory = await run_io(store.memory.stop, snapshot)
+                memory["worker_peak_traced_bytes"] = profile.worker_peak_bytes
+            else:
+                stacks = sampler.stacks(start, end) if end - start >= store.slow_threshold else None
+                memory = None
+            if stacks is not None:
+                stacks.update(profile.worker_stacks)
+                store.add({
+                    "id": profile.id,
+                    "trigger": "request" if requested else "slow",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round((end - start) * 1000, 1),
+                    "started_at": time.time() - (end - start),
+                    "samples": sum(stacks.values()),
+                    "stacks": stacks,
+                    "memory": memory
+                })
@@ -0,0 +1,231 @@
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Section headings by document type, with a priority (lower is kept first when
+# the budget is tight). "boilerplate" sections are dropped outright.
+RESUME_SECTIONS = {
+    "skills": (1, r"(?:technical |core |key )?skills|technologies|tech stack|competencies"),
+    "experience": (2, r"(?:work |professional |employment )?(?:experience|history)|employment"),
+    "summary": (3, r"summary|profile|objective|about me"),
+    "education": (4, r"education|academic background|qualifications"),
+    "projects": (5, r"(?:personal |selected )?projects"),
+    "certifications": (6, r"certifications?|licen[cs]es|awards|achievements"),
+    "boilerplate": (None, r"references|hobbies|interests|personal details"),
+}
+JOB_SECTIONS = {
+    "requirements": (1, r"requirements|(?:minimum |basic |required )?qualifications|what you(?:'ll)? (?:need|bring)"
+                        r"|must[- ]haves?|you have|who you are"),
+    "skills": (1, r"(?:required |technical )?skills|tech stack|technologies"),
+    "responsibilities": (2, r"responsibilities|what you(?:'ll)? do|the role|duties|your impact"),
+    "preferred": (4, r"(?:preferred|desired|bonus) (?:qualifications|skills)|nice[- ]to[- ]haves?|bonus points"),
+    "boilerplate": (None, r"about (?:us|the company)|benefits|perks|what we offer|compensation|salary"
+                          r"|equal (?:employment )?opportunity|eeo|how to apply|diversity"),
+}
+# Text before the first heading (name and contact, or job title and intro)
+PREAMBLE_PRIORITY = 3
+
+BOILERPLATE_LINES = re.compile(
+    r"references available (?:up)?on request|equal opportunity employer|page \d+(?: of \d+)?$"
+    r"|all qualified applicants will receive",
+    re.IGNORECASE
+)
+TRUNCATION_MARKER = "[...]"
+
+
+def _heading_pattern(sections: Dict[str, Tuple[Optional[int], str]]) -> re.Pattern:
+    # A heading is a short line that is just the section name, optionally followed by ":"
+    names = "|".join(f"(?P<{name}>{pattern})" for name, (_, pattern) in sections.items())
+    return re.compile(rf"^\s*(?:#+\s*)?(?:{names})\s*:?\s*$", re.IGNORECASE)
+
+
+HEADINGS = {
+    "resume": (RESUME_SECTIONS, _heading_pattern(RESUME_SECTIONS)),
+    "job_description": (JOB_SECTIONS, _heading_pattern(JOB_SECTIONS)),
+}
+
+_encoders: Dict[str, Optional[Callable[[str], int]]] = {}
+_encoders_lock = threading.Lock()
+
+
+def _approximate_tokens(text: str) -> int:
+    # Roughly one token per word or punctuation mark, and never fewer than chars / 4
+    return max(len(text) // 4, len(re.findall(r"\w+|[^\w\s]", text)))
+
+
+def token_counter(model: str) -> Callable[[str], int]:
+    """Token counting function for a model: tiktoken when available, an estimate otherwise"""
+    with _encoders_lock:
+        if model not in _encoders:
+            counter = None
+            if os.environ.get("PROMPT_TOKENIZER", "tiktoken") == "tiktoken":
+                try:
+                    import tiktoken
+                    try:
+                        encoding = tiktoken.encoding_for_model(model)
+                    except KeyError:
+                        encoding = tiktoken.get_encoding("cl100k_base")
+                    counter = lambda text: len(encoding.encode(text, disallowed_special=()))
+                except Exception as e:
+                    # tiktoken downloads its vocabulary on first use; offline we estimate
+                    print(f"tiktoken unavailable ({str(e)}), estimating token counts")
+            _encoders[model] = counter
+        return _encoders[model] or _approximate_tokens
+
+
+def clean_text(text: str) -> str:
+    """Drop boilerplate and repeated lines (page headers/footers) and collapse whitespace"""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"[ \t]+", " ", line).strip()
+        if not line:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        if BOILERPLATE_LINES.search(line):
+            continue
+        # Short lines seen before are repeated headers or footers
+        key = line.lower()
+        if len(line) < 80 and key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def split_sections(text: str, doc_type: str) -> List[Dict[str, Any]]:
+    """Split a document into sections at recognized headings, in document order"""
+    sections_spec, heading = HEADINGS[doc_type]
+    sections = [{"name": "preamble", "title": "preamble", "priority": PREAMBLE_PRIORITY, "lines": []}]
+    for line in text.splitlines():
+        match = heading.match(line) if len(line) < 60 else None
+        if match:
+            name = match.lastgroup
+            sections.append({
+                "name": name,
+                "title": line.strip().lstrip("#").strip().rstrip(":"),
+                "priority": sections_spec[name][0],
+                "lines": [line]
+            })
+        else:
+            sections[-1]["lines"].append(line)
+    return [section for section in sections if any(line.strip() for line in section["lines"])]
+
+
+class PromptBuilder:
+    """Fit a resume and a job description into a token budget, keeping the sections that matter
+
+    Boilerplate is removed first. If the documents still don't fit, whole
+    sections are kept in priority order (skills and requirements, then
+    experience and responsibilities, ...) and the first one that doesn't fit
+    is cut at a line boundary.
+    """
+
+    def __init__(self, model: str, max_input_tokens: Optional[int] = None):
+        self.model = model
+        self.max_input_tokens = max_input_tokens or int(os.environ.get("PROMPT_MAX_INPUT_TOKENS", "6000"))
+        # Resolved on first use: loading tiktoken (and its vocabulary) would slow down startup
+        self._count_tokens: Optional[Callable[[str], int]] = None
+    
+    @property
+    def tokenizer_loaded(self) -> bool:
+        return self._count_tokens is not None
+    
+    def count_tokens(self, text: str) -> int:
+        if self._count_tokens is None:
+            self._count_tokens = token_counter(self.model)
+        return self._count_tokens(text)
+
+    def fit_document(self, text: str, doc_type: str, budget: int) -> Tuple[str, Dict[str, Any]]:
+        """Return the document cut down to `budget` tokens, and what was done to it"""
+        cleaned = clean_text(text)
+        original_tokens = self.count_tokens(text)
+        tokens = self.count_tokens(cleaned)
+        report = {"original_tokens": original_tokens, "tokens": tokens, "truncated": False, "dropped_sections": []}
+
+        sections = split_sections(cleaned, doc_type)
+        boilerplate = [section for section in sections if section["priority"] is None]
+        if tokens <= budget and not boilerplate:
+            return cleaned, report
+
+        for section in sections:
+            section["text"] = "\n".join(section["lines"]).strip()
+            section["tokens"] = self.count_tokens(section["text"])
+            section["keep"] = None
+        remaining = budget
+        ranked = sorted(
+            (section for section in sections if section["priority"] is not None),
+            key=lambda section: section["priority"]
+        )
+        # Whole sections first, so a long experience section doesn't crowd out a short education one
+        for section in ranked:
+            if section["tokens"] <= remaining:
+                section["keep"] = section["text"]
+                remaining -= section["tokens"]
+        # Then the most important sections that didn't fit, cut down to what's left
+        for section in ranked:
+            if section["keep"] is None:
+                report["truncated"] = True
+                if remaining > 20:
+                    section["keep"] = self._truncate_lines(section["lines"], remaining)
+                    remaining -= self.count_tokens(section["keep"])
+                else:
+                    report["dropped_sections"].append(section["title"])
+        report["dropped_sections"] += [section["title"] for section in boilerplate]
+
+        fitted = "\n\n".join(section["keep"] for section in sections if section["keep"])
+        report["tokens"] = self.count_tokens(fitted)
+        return fitted, report
+
+    def _truncate_lines(self, lines: List[str], budget: int) -> str:
+        kept = []
+        used = self.count_tokens(TRUNCATION_MARKER)
+        for line in lines:
+            line_tokens = self.count_tokens(line) + 1
+            if used + line_tokens > budget:
+                # The line that doesn't fit is cut to what's left, so a section extracted
+                # as one long line (single-line TXT, a PDF paragraph) isn't lost entirely
+                head = self._truncate_line(line, budget - used - 1)
+                if head:
+                    kept.append(head)
+                break
+            kept.append(line)
+            used += line_tokens
+        return "\n".join(kept + [TRUNCATION_MARKER]).strip()
+
+    def _truncate_line(self, line: str, budget: int) -> str:
+        """The longest prefix of line, cut at a word boundary, within budget tokens"""
+        if budget <= 0:
+            return ""
+        # Binary search on the length; token counts grow with the prefix for either counter
+        low, high = 0, len(line)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(line[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        head = line[:low]
+        if low < len(line) and " " in head:
+            head = head.rsplit(" ", 1)[0]
+        return head.rstrip()
+
+    def fit(self, resume_text: str, job_description: str) -> Tuple[str, str, Dict[str, Any]]:
+        """Fit both documents into the input budget, sharing space left over by the shorter one"""
+        # The resume gets at least half, more if the job description is short;
+        # the job description gets whatever the fitted resume left
+        half = self.max_input_tokens // 2
+        job_tokens = self.count_tokens(job_description)
+        resume_budget = max(half, self.max_input_tokens - job_tokens)
+
+        resume_fitted, resume_report = self.fit_document(resume_text, "resume", resume_budget)
+        job_fitted, job_report = self.fit_document(
+            job_description, "job_description", self.max_input_tokens - resume_report["tokens"]
+        )
+        return resume_fitted, job_fitted, {
+            "max_input_tokens": self.max_input_tokens,
+            "resume": resume_report,
+            "job_description": job_report
+        }
@@ -0,0 +1,375 @@
+"""S3 operations written once for both backends
+
+Each operation is a generator that yields the raw steps it needs (an
+S3Request) and is sent back their results. S3Service serves the steps with
+blocking boto3 calls, AsyncS3Service awaits them with aiobotocore, so key
+and metadata building, duplicate matching, listing merges, reconciling,
+presigning and error handling live here and the backends only talk to S3.
+A ClientError from a step is raised inside the operation at its yield.
+"""
+import base64
+import time
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional
+from urllib.parse import quote
+
+from botocore.exceptions import ClientError
+
+from metadata_index import (
+    MetadataIndex, apply_reconcile, document_objects, entry_from_object, merge_listing, needs_describe,
+    object_from_head, objects_to_describe, public_entry
+)
+from metrics import count_bytes, stage
+
+# Kinds of raw step an operation can ask its backend for
+CALL = "call"    # a client method; the response dict
+READ = "read"    # get_object; the body's bytes
+LIST = "list"    # every object of a list_objects_v2 listing
+EACH = "each"    # several CALLs, concurrently where the backend can; a response or ClientError each
+INDEX = "index"  # a blocking metadata index call (off the event loop for the async backend)
+
+
+class S3Request(NamedTuple):
+    kind: str
+    target: Any = None
+    args: tuple = ()
+    kwargs: Dict[str, Any] = {}
+
+
+Operation = Generator[S3Request, Any, Any]
+
+
+def client_call(method: str, **params) -> S3Request:
+    return S3Request(CALL, method, kwargs=params)
+
+
+def read_body(**params) -> S3Request:
+    return S3Request(READ, kwargs=params)
+
+
+def list_objects(**params) -> S3Request:
+    return S3Request(LIST, kwargs=params)
+
+
+def each(calls: List[S3Request]) -> S3Request:
+    return S3Request(EACH, calls)
+
+
+def index_call(func: Callable[..., Any], *args, **kwargs) -> S3Request:
+    return S3Request(INDEX, func, args, kwargs)
+
+
+def content_disposition(filename: str) -> str:
+    """Attachment header for a download, with a UTF-8 fallback for non-ASCII names"""
+    ascii_name = filename.encode('ascii', 'replace').decode('ascii').replace('"', "'")
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def object_metadata(original_filename: str, file_type: str, upload_time: int,
+                    content_hash: Optional[str] = None) -> Dict[str, str]:
+    """User metadata stored on every document object"""
+    metadata = {
+        'original_filename': original_filename,
+        'file_type': file_type,
+        'upload_time': str(upload_time)
+    }
+    if content_hash:
+        metadata['content_sha256'] = content_hash
+    return metadata
+
+
+def sha256_checksum(content_hash: str) -> str:
+    """S3's x-amz-checksum-sha256 form (base64) of a hex SHA-256"""
+    return base64.b64encode(bytes.fromhex(content_hash)).decode('ascii')
+
+
+def hex_checksum(checksum: Optional[str]) -> Optional[str]:
+    """Hex SHA-256 from S3's base64 ChecksumSHA256; None for composite (multipart) checksums"""
+    if not checksum or '-' in checksum:
+        return None
+    return base64.b64decode(checksum).hex()
+
+
+def is_missing(error: ClientError) -> bool:
+    return error.response.get('Error', {}).get('Code') in ('NoSuchKey', '404')
+
+
+def _uploaded(s3_key: str, original_filename: str, file_type: str) -> Dict:
+    return {
+        "success": True,
+        "s3_key": s3_key,
+        "original_filename": original_filename,
+        "file_type": file_type
+    }
+
+
+def upload_file(bucket: str, index: MetadataIndex, file_content: bytes, s3_key: str,
+                original_filename: str, file_type: str, content_hash: Optional[str] = None) -> Operation:
+    """Upload file to S3 with metadata"""
+    try:
+        upload_time = int(time.time())
+        with stage("s3_put"):
+            response = yield client_call(
+                'put_object',
+                Bucket=bucket,
+                Key=s3_key,
+                Body=file_content,
+                Metadata=object_metadata(original_filename, file_type, upload_time, content_hash)
+            )
+        count_bytes("s3_put", len(file_content))
+        yield index_call(
+            index.upsert, s3_key, original_filename, file_type,
+            size=len(file_content), created=upload_time, etag=response.get('ETag'),
+            content_hash=content_hash
+        )
+        return _uploaded(s3_key, original_filename, file_type)
+    except ClientError as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def start_multipart_upload(bucket: str, s3_key: str, original_filename: str, file_type: str) -> Operation:
+    """Begin a multipart upload with the same metadata as upload_file; returns the upload id"""
+    try:
+        response = yield client_call(
+            'create_multipart_upload',
+            Bucket=bucket,
+            Key=s3_key,
+            Metadata=object_metadata(original_filename, file_type, int(time.time()))
+        )
+        return response['UploadId']
+    except ClientError as e:
+        raise Exception(f"Failed to start upload: {str(e)}")
+
+
+def upload_part(bucket: str, s3_key: str, upload_id: str, part_number: int, body: bytes) -> Operation:
+    """Upload one part (at least 5MB, except the last) of a multipart upload"""
+    try:
+        with stage("s3_put"):
+            response = yield client_call(
+                'upload_part',
+                Bucket=bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body
+            )
+        count_bytes("s3_put", len(body))
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+    except ClientError as e:
+        raise Exception(f"Failed to upload part {part_number}: {str(e)}")
+
+
+def complete_multipart_upload(bucket: str, index: MetadataIndex, s3_key: str, upload_id: str, parts: List[Dict],
+                              original_filename: str, file_type: str, size: int,
+                              content_hash: Optional[str] = None) -> Operation:
+    """Finish a multipart upload and index it; returns the same shape as upload_file"""
+    try:
+        with stage("s3_put"):
+            response = yield client_call(
+                'complete_multipart_upload',
+                Bucket=bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        upload_time = int(time.time())
+        etag = response.get('ETag')
+        if content_hash:
+            # The hash is only known once the last part is streamed; copying the object
+            # onto itself puts it in the metadata, as single-shot uploads have it
+            try:
+                with stage("s3_put"):
+                    copied = yield client_call(
+                        'copy_object',
+                        Bucket=bucket,
+                        Key=s3_key,
+                        CopySource={'Bucket': bucket, 'Key': s3_key},
+                        Metadata=object_metadata(original_filename, file_type, upload_time, content_hash),
+                        MetadataDirective='REPLACE'
+                    )
+                etag = copied.get('CopyObjectResult', {}).get('ETag', etag)
+            except ClientError as e:
+                print(f"Failed to store content hash on {s3_key}: {str(e)}")
+        yield index_call(
+            index.upsert, s3_key, original_filename, file_type,
+            size=size, created=upload_time, etag=etag, content_hash=content_hash
+        )
+        return _uploaded(s3_key, original_filename, file_type)
+    except ClientError as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def abort_multipart_upload(bucket: str, s3_key: str, upload_id: str) -> Operation:
+    """Discard an unfinished multipart upload and its parts"""
+    try:
+        yield client_call('abort_multipart_upload', Bucket=bucket, Key=s3_key, UploadId=upload_id)
+    except ClientError as e:
+        print(f"Failed to abort upload {upload_id} for {s3_key}: {str(e)}")
+
+
+def find_duplicate(bucket: str, index: MetadataIndex, prefix: str, content_hash: str) -> Operation:
+    """An existing document under prefix with this SHA-256, confirmed to still be in S3"""
+    entry = yield index_call(index.find_by_hash, prefix, content_hash)
+    if entry is None:
+        return None
+    try:
+        yield client_call('head_object', Bucket=bucket, Key=entry['filename'])
+    except ClientError as e:
+        if is_missing(e):
+            # Deleted outside the API; forget it so the next upload is stored
+            yield index_call(index.remove, [entry['filename']])
+            return None
+        raise Exception(f"Failed to check existing upload: {str(e)}")
+    return entry
+
+
+def create_upload_url(bucket: str, s3_key: str, original_filename: str, file_type: str,
+                      size: int, expires_in: int, content_hash: Optional[str] = None) -> Operation:
+    """Presigned PUT for a browser upload straight to S3
+
+    The size, metadata and (if given) SHA-256 are part of the signature, so
+    the client must send exactly the returned headers and a body of the
+    declared size; S3 rejects a body whose checksum doesn't match.
+    """
+    metadata = object_metadata(original_filename, file_type, int(time.time()), content_hash)
+    params = {'Bucket': bucket, 'Key': s3_key, 'ContentLength': size, 'Metadata': metadata}
+    headers = {f"x-amz-meta-{key}": value for key, value in metadata.items()}
+    if content_hash:
+        params['ChecksumSHA256'] = headers['x-amz-checksum-sha256'] = sha256_checksum(content_hash)
+    try:
+        url = yield client_call('generate_presigned_url', ClientMethod='put_object', Params=params,
+                                ExpiresIn=expires_in)
+    except ClientError as e:
+        raise Exception(f"Failed to sign upload: {str(e)}")
+    return {"url": url, "headers": headers}
+
+
+def create_download_url(bucket: str, s3_key: str, download_name: str, expires_in: int) -> Operation:
+    """Presigned GET that downloads the object as an attachment named download_name"""
+    try:
+        return (yield client_call(
+            'generate_presigned_url',
+            ClientMethod='get_object',
+            Params={
+                'Bucket': bucket,
+                'Key': s3_key,
+                'ResponseContentDisposition': content_disposition(download_name)
+            },
+            ExpiresIn=expires_in
+        ))
+    except ClientError as e:
+        raise Exception(f"Failed to sign download: {str(e)}")
+
+
+def register_upload(bucket: str, index: MetadataIndex, s3_key: str, file_type: str) -> Operation:
+    """Index an object uploaded directly to S3; None if it isn't there"""
+    try:
+        response = yield client_call('head_object', Bucket=bucket, Key=s3_key, ChecksumMode='ENABLED')
+    except ClientError as e:
+        if is_missing(e):
+            return None
+        raise Exception(f"Failed to read upload: {str(e)}")
+    # The key prefix decides the type even if the client dropped the metadata headers,
+    # and the checksum S3 verified beats the one the client declared
+    metadata = {'file_type': file_type, **response.get('Metadata', {})}
+    content_hash = hex_checksum(response.get('ChecksumSHA256'))
+    if content_hash:
+        metadata['content_sha256'] = content_hash
+    entry = entry_from_object(object_from_head(s3_key, response), metadata)
+    yield index_call(index.upsert_many, [entry])
+    return entry
+
+
+def read_range(bucket: str, s3_key: str, length: int) -> Operation:
+    """The first `length` bytes of an object"""
+    try:
+        with stage("s3_get"):
+            return (yield read_body(Bucket=bucket, Key=s3_key, Range=f"bytes=0-{length - 1}"))
+    except ClientError as e:
+        raise Exception(f"Failed to download file: {str(e)}")
+
+
+def _list_documents(bucket: str, prefix: str) -> Operation:
+    with stage("s3_list"):
+        objects = yield list_objects(Bucket=bucket, Prefix=prefix)
+    return document_objects(objects)
+
+
+def _describe_objects(bucket: str, objects: List[Dict]) -> Operation:
+    """Index entries for listed objects, with metadata read by head_object"""
+    responses = yield each([client_call('head_object', Bucket=bucket, Key=obj['Key']) for obj in objects])
+    return {
+        # Fallback if metadata can't be retrieved
+        obj['Key']: entry_from_object(obj, None if isinstance(response, ClientError) else response.get('Metadata', {}))
+        for obj, response in zip(objects, responses)
+    }
+
+
+def list_files(bucket: str, index: MetadataIndex, prefix: str) -> Operation:
+    """List files in S3 with metadata from the local index"""
+    try:
+        objects = yield from _list_documents(bucket, prefix)
+        indexed = yield index_call(index.get_many, [obj['Key'] for obj in objects])
+        # Only objects the index hasn't seen yet cost a head_object call
+        missing = [obj for obj in objects if needs_describe(obj, indexed.get(obj['Key']))]
+        described = yield from _describe_objects(bucket, missing)
+        files, stale = merge_listing(objects, indexed, lambda obj: described[obj['Key']])
+        yield index_call(index.upsert_many, stale)
+
+        return [public_entry(entry) for entry in files]
+    except ClientError as e:
+        raise Exception(f"Failed to list files: {str(e)}")
+
+
+def reconcile_index(bucket: str, index: MetadataIndex, prefix: str, rebuild: bool = False) -> Operation:
+    """Bring the metadata index for a prefix in line with the bucket"""
+    objects = yield from _list_documents(bucket, prefix)
+    to_describe = yield index_call(objects_to_describe, index, objects, rebuild)
+    described = yield from _describe_objects(bucket, to_describe)
+    return (yield index_call(apply_reconcile, index, prefix, objects, described, rebuild))
+
+
+def download_file(bucket: str, s3_key: str) -> Operation:
+    """Download file from S3"""
+    try:
+        with stage("s3_get"):
+            content = yield read_body(Bucket=bucket, Key=s3_key)
+        count_bytes("s3_get", len(content))
+        return content
+    except ClientError as e:
+        raise Exception(f"Failed to download file: {str(e)}")
+
+
+def put_artifact(bucket: str, s3_key: str, body: bytes, content_type: str = 'application/json') -> Operation:
+    """Store a derived object; artifacts are not indexed or listed"""
+    try:
+        with stage("s3_put"):
+            yield client_call('put_object', Bucket=bucket, Key=s3_key, Body=body, ContentType=content_type)
+    except ClientError as e:
+        raise Exception(f"Failed to store artifact: {str(e)}")
+
+
+def get_artifact(bucket: str, s3_key: str) -> Operation:
+    """Return a derived object's bytes, or None if it doesn't exist"""
+    try:
+        with stage("s3_get"):
+            return (yield read_body(Bucket=bucket, Key=s3_key))
+    except ClientError as e:
+        if is_missing(e):
+            return None
+        raise Exception(f"Failed to read artifact: {str(e)}")
+
+
+def delete_file(bucket: str, index: MetadataIndex, s3_key: str) -> Operation:
+    """Delete file from S3"""
+    try:
+        yield client_call('delete_object', Bucket=bucket, Key=s3_key)
+        yield index_call(index.remove, [s3_key])
+        return True
+    except ClientError as e:
+        raise Exception(f"Failed to delete file: {str(e)}")
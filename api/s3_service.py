@@ -1,111 +1,193 @@
-import boto3
 import os
-from typing import Dict, List
+import threading
+from typing import Any, Dict, List, Optional
 from botocore.exceptions import ClientError
-import time
+import s3_operations as operations
+from metadata_index import MetadataIndex
+from s3_operations import CALL, EACH, INDEX, LIST, READ, Operation, S3Request
+
+
+def get_bucket_name() -> str:
+    """Read the bucket name from the environment, stripping any whitespace"""
+    bucket_name_raw = os.environ.get('S3_BUCKET_NAME')
+    if not bucket_name_raw:
+        raise ValueError("S3_BUCKET_NAME environment variable is required")
+
+    bucket_name = bucket_name_raw.strip()
+    if not bucket_name:
+        raise ValueError("S3_BUCKET_NAME environment variable is empty or contains only whitespace")
+    return bucket_name
+
+
+def get_client_kwargs() -> Dict[str, Any]:
+    """Client settings shared by the boto3 and aiobotocore backends"""
+    from botocore.config import Config
+    config = Config(
+        max_pool_connections=int(os.environ.get('S3_MAX_POOL_CONNECTIONS', '64')),
+        tcp_keepalive=os.environ.get('S3_TCP_KEEPALIVE', 'true').lower() == 'true',
+        connect_timeout=float(os.environ.get('S3_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(os.environ.get('S3_READ_TIMEOUT', '60')),
+        # SigV4 presigned URLs sign the declared Content-Length and metadata headers
+        signature_version='s3v4',
+        retries={
+            'max_attempts': int(os.environ.get('S3_MAX_ATTEMPTS', '5')),
+            # "standard" uses exponential backoff with jitter, "adaptive" adds client-side rate limiting
+            'mode': os.environ.get('S3_RETRY_MODE', 'standard')
+        }
+    )
+    kwargs = {
+        'region_name': os.environ.get('AWS_REGION', 'us-west-2'),
+        'config': config
+    }
+    # Point at a local stand-in such as moto server
+    endpoint_url = os.environ.get('S3_ENDPOINT_URL')
+    if endpoint_url:
+        kwargs['endpoint_url'] = endpoint_url
+    return kwargs
+
+
+def create_s3_service():
+    """Build the S3 backend selected by S3_BACKEND ("boto3" or "aiobotocore")"""
+    backend = os.environ.get('S3_BACKEND', 'boto3').lower()
+    if backend == 'boto3':
+        return S3Service()
+    if backend == 'aiobotocore':
+        from async_s3_service import AsyncS3Service
+        return AsyncS3Service()
+    raise ValueError(f"Unknown S3_BACKEND: {backend}")
+
 
 class S3Service:
     def __init__(self):
-        # Get bucket name and strip any whitespace
-        bucket_name_raw = os.environ.get('S3_BUCKET_NAME')
-        if not bucket_name_raw:
-            raise ValueError("S3_BUCKET_NAME environment variable is required")
+        self.bucket_name = get_bucket_name()
         
-        self.bucket_name = bucket_name_raw.strip()
-        if not self.bucket_name:
-            raise ValueError("S3_BUCKET_NAME environment variable is empty or contains only whitespace")
-        
-        # Create S3 client - uses instance profile credentials automatically
-        self.s3_client = boto3.client(
-            's3',
-            region_name=os.environ.get('AWS_REGION', 'us-west-2')
-        )
+        # The S3 client is created on first use: importing boto3 and building it takes ~0.5s
+        self._s3_client = None
+        self._client_lock = threading.Lock()
+        self.metadata_index = MetadataIndex()
 
-    def upload_file(self, file_content: bytes, s3_key: str, 
-                   original_filename: str, file_type: str) -> Dict:
-        """Upload file to S3 with metadata"""
+    @property
+    def s3_client(self):
+        """boto3 S3 client - uses instance profile credentials automatically"""
+        if self._s3_client is None:
+            with self._client_lock:
+                if self._s3_client is None:
+                    import boto3
+                    self._s3_client = boto3.client('s3', **get_client_kwargs())
+        return self._s3_client
+
+    @property
+    def client_ready(self) -> bool:
+        return self._s3_client is not None
+
+    def warm_up(self):
+        """Create the client ahead of the first request"""
+        self.s3_client
+
+    def _run(self, operation: Operation) -> Any:
+        """Drive a shared operation, serving each step with a blocking call"""
+        result, error = None, None
+        while True:
+            try:
+                request = operation.throw(error) if error else operation.send(result)
+            except StopIteration as done:
+                return done.value
+            try:
+                result, error = self._serve(request), None
+            except ClientError as e:
+                result, error = None, e
+
+    def _serve(self, request: S3Request) -> Any:
+        if request.kind == INDEX:
+            return request.target(*request.args, **request.kwargs)
+        if request.kind == CALL:
+            return getattr(self.s3_client, request.target)(**request.kwargs)
+        if request.kind == READ:
+            return self.s3_client.get_object(**request.kwargs)['Body'].read()
+        if request.kind == LIST:
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            return [obj for page in paginator.paginate(**request.kwargs) for obj in page.get('Contents', [])]
+        if request.kind == EACH:
+            return [self._serve_or_error(call) for call in request.target]
+        raise ValueError(f"Unknown S3 request: {request.kind}")
+
+    def _serve_or_error(self, request: S3Request) -> Any:
         try:
-            # Upload file with metadata
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                Metadata={
-                    'original_filename': original_filename,
-                    'file_type': file_type,
-                    'upload_time': str(int(time.time()))
-                }
-            )
-            
-            return {
-                "success": True,
-                "s3_key": s3_key,
-                "original_filename": original_filename,
-                "file_type": file_type
-            }
+            return self._serve(request)
         except ClientError as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            return e
+
+    def upload_file(self, file_content: bytes, s3_key: str, 
+                   original_filename: str, file_type: str, content_hash: Optional[str] = None) -> Dict:
+        """Upload file to S3 with metadata"""
+        return self._run(operations.upload_file(
+            self.bucket_name, self.metadata_index, file_content, s3_key, original_filename, file_type, content_hash
+        ))
+
+    def start_multipart_upload(self, s3_key: str, original_filename: str, file_type: str) -> str:
+        """Begin a multipart upload with the same metadata as upload_file; returns the upload id"""
+        return self._run(operations.start_multipart_upload(self.bucket_name, s3_key, original_filename, file_type))
+
+    def upload_part(self, s3_key: str, upload_id: str, part_number: int, body: bytes) -> Dict:
+        """Upload one part (at least 5MB, except the last) of a multipart upload"""
+        return self._run(operations.upload_part(self.bucket_name, s3_key, upload_id, part_number, body))
+
+    def complete_multipart_upload(self, s3_key: str, upload_id: str, parts: List[Dict],
+                                  original_filename: str, file_type: str, size: int,
+                                  content_hash: Optional[str] = None) -> Dict:
+        """Finish a multipart upload and index it; returns the same shape as upload_file"""
+        return self._run(operations.complete_multipart_upload(
+            self.bucket_name, self.metadata_index, s3_key, upload_id, parts,
+            original_filename, file_type, size, content_hash
+        ))
+
+    def abort_multipart_upload(self, s3_key: str, upload_id: str):
+        """Discard an unfinished multipart upload and its parts"""
+        self._run(operations.abort_multipart_upload(self.bucket_name, s3_key, upload_id))
+
+    def find_duplicate(self, prefix: str, content_hash: str) -> Optional[Dict]:
+        """An existing document under prefix with this SHA-256, confirmed to still be in S3"""
+        return self._run(operations.find_duplicate(self.bucket_name, self.metadata_index, prefix, content_hash))
+
+    def create_upload_url(self, s3_key: str, original_filename: str, file_type: str,
+                          size: int, expires_in: int, content_hash: Optional[str] = None) -> Dict:
+        """Presigned PUT for a browser upload straight to S3 (see s3_operations.create_upload_url)"""
+        return self._run(operations.create_upload_url(
+            self.bucket_name, s3_key, original_filename, file_type, size, expires_in, content_hash
+        ))
+
+    def create_download_url(self, s3_key: str, download_name: str, expires_in: int) -> str:
+        """Presigned GET that downloads the object as an attachment named download_name"""
+        return self._run(operations.create_download_url(self.bucket_name, s3_key, download_name, expires_in))
+
+    def register_upload(self, s3_key: str, file_type: str) -> Optional[Dict]:
+        """Index an object uploaded directly to S3; None if it isn't there"""
+        return self._run(operations.register_upload(self.bucket_name, self.metadata_index, s3_key, file_type))
+
+    def read_range(self, s3_key: str, length: int) -> bytes:
+        """The first `length` bytes of an object"""
+        return self._run(operations.read_range(self.bucket_name, s3_key, length))
 
     def list_files(self, prefix: str) -> List[Dict]:
-        """List files in S3 with metadata"""
-        try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=prefix
-            )
-            
-            files = []
-            for obj in response.get('Contents', []):
-                # Get object metadata
-                try:
-                    metadata_response = self.s3_client.head_object(
-                        Bucket=self.bucket_name,
-                        Key=obj['Key']
-                    )
-                    metadata = metadata_response.get('Metadata', {})
-                    
-                    files.append({
-                        "filename": obj['Key'],
-                        "original_filename": metadata.get('original_filename', obj['Key']),
-                        "size": obj['Size'],
-                        "created": obj['LastModified'].timestamp(),
-                        "type": metadata.get('file_type', 'unknown')
-                    })
-                except ClientError:
-                    # Fallback if metadata can't be retrieved
-                    files.append({
-                        "filename": obj['Key'],
-                        "original_filename": obj['Key'],
-                        "size": obj['Size'],
-                        "created": obj['LastModified'].timestamp(),
-                        "type": 'unknown'
-                    })
-            
-            return files
-        except ClientError as e:
-            raise Exception(f"Failed to list files: {str(e)}")
+        """List files in S3 with metadata from the local index"""
+        return self._run(operations.list_files(self.bucket_name, self.metadata_index, prefix))
+
+    def reconcile_index(self, prefix: str, rebuild: bool = False) -> Dict[str, int]:
+        """Bring the metadata index for a prefix in line with the bucket"""
+        return self._run(operations.reconcile_index(self.bucket_name, self.metadata_index, prefix, rebuild))
 
     def download_file(self, s3_key: str) -> bytes:
         """Download file from S3"""
-        try:
-            response = self.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=s3_key
-            )
-            return response['Body'].read()
-        except ClientError as e:
-            raise Exception(f"Failed to download file: {str(e)}")
+        return self._run(operations.download_file(self.bucket_name, s3_key))
+
+    def put_artifact(self, s3_key: str, body: bytes, content_type: str = 'application/json'):
+        """Store a derived object; artifacts are not indexed or listed"""
+        self._run(operations.put_artifact(self.bucket_name, s3_key, body, content_type))
+
+    def get_artifact(self, s3_key: str) -> Optional[bytes]:
+        """Return a derived object's bytes, or None if it doesn't exist"""
+        return self._run(operations.get_artifact(self.bucket_name, s3_key))
 
     def delete_file(self, s3_key: str) -> bool:
         """Delete file from S3"""
-        try:
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=s3_key
-            )
-            return True
-        except ClientError as e:
-            raise Exception(f"Failed to delete file: {str(e)}")
+        return self._run(operations.delete_file(self.bucket_name, self.metadata_index, s3_key))
@@ -0,0 +1,193 @@
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Canonical skill name -> extra spellings. The canonical name is matched too.
+# Ambiguous short words ("go", "r", "c") are left out on purpose.
+SKILLS: Dict[str, List[str]] = {
+    # Languages
+    "Python": [], "Java": [], "JavaScript": ["js", "ecmascript"], "TypeScript": ["ts"],
+    "C++": ["cpp"], "C#": ["csharp"], "Golang": [], "Rust": [], "Ruby": [], "PHP": [],
+    "Kotlin": [], "Swift": [], "Scala": [], "Perl": [], "MATLAB": [], "SQL": [], "Bash": ["shell scripting"],
+    "HTML": ["html5"], "CSS": ["css3"], "Objective-C": [], "Elixir": [], "Haskell": [], "Dart": [],
+    # Frameworks and libraries
+    "React": ["react.js", "reactjs"], "React Native": [], "Angular": ["angularjs"], "Vue": ["vue.js", "vuejs"],
+    "Next.js": ["nextjs"], "Node.js": ["node", "nodejs"], "Express": ["express.js"], "Django": [], "Flask": [],
+    "FastAPI": [], "Spring": ["spring boot"], "Rails": ["ruby on rails"], "Laravel": [], ".NET": ["dotnet", "asp.net"],
+    "GraphQL": [], "REST": ["restful", "rest api", "rest apis"], "gRPC": [], "Redux": [], "Tailwind": ["tailwindcss"],
+    "jQuery": [], "Pandas": [], "NumPy": [], "SciPy": [], "scikit-learn": ["sklearn"], "TensorFlow": [],
+    "PyTorch": [], "Keras": [], "Spark": ["pyspark", "apache spark"], "Hadoop": [], "Airflow": [],
+    "LangChain": [], "Celery": [], "Kafka": ["apache kafka"], "RabbitMQ": [],
+    # Data stores
+    "PostgreSQL": ["postgres"], "MySQL": [], "SQLite": [], "MongoDB": ["mongo"], "Redis": [],
+    "Elasticsearch": ["elastic search", "opensearch"], "DynamoDB": [], "Cassandra": [], "Snowflake": [],
+    "BigQuery": [], "Oracle": [], "SQL Server": ["mssql"],
+    # Cloud and infrastructure
+    "AWS": ["amazon web services"], "Azure": [], "GCP": ["google cloud"], "Docker": [], "Kubernetes": ["k8s"],
+    "Terraform": [], "Ansible": [], "Jenkins": [], "GitHub Actions": [], "CI/CD": ["continuous integration"],
+    "Linux": [], "Git": [], "Nginx": [], "Serverless": ["lambda"], "S3": [], "EC2": [], "Microservices": [],
+    "Prometheus": [], "Grafana": [], "Datadog": [],
+    # Data and ML
+    "Machine Learning": ["ml"], "Deep Learning": [], "NLP": ["natural language processing"],
+    "Computer Vision": [], "LLM": ["llms", "large language models"], "Data Analysis": ["data analytics"],
+    "Statistics": [], "ETL": [], "Data Engineering": [], "Data Visualization": [], "Tableau": [], "Power BI": [],
+    "Excel": [],
+    # Practices and roles
+    "Agile": [], "Scrum": [], "TDD": ["test-driven development"], "Unit Testing": ["unit tests"],
+    "System Design": [], "Distributed Systems": [], "Security": ["cybersecurity"], "DevOps": [],
+    "Product Management": [], "Project Management": [], "UX": ["user experience"], "UI Design": [],
+    "Figma": [], "Jira": [], "SEO": [], "Communication": ["communication skills"], "Leadership": [],
+    "Mentoring": [],
+}
+
+# Degrees by level, for a rough education comparison
+DEGREE_LEVELS = {
+    "phd": 4, "ph.d": 4, "doctorate": 4,
+    "master": 3, "masters": 3, "msc": 3, "m.sc": 3, "mba": 3, "m.s.": 3,
+    "bachelor": 2, "bachelors": 2, "bsc": 2, "b.sc": 2, "b.s.": 2, "ba": 2, "undergraduate degree": 2,
+    "associate degree": 1,
+}
+DEGREE_NAMES = {4: "a doctorate", 3: "a master's degree", 2: "a bachelor's degree", 1: "an associate degree"}
+
+# Characters that continue a token, so "java" does not match inside "javascript"
+_BOUNDARY_BEFORE = r"(?<![\w+#.])"
+_BOUNDARY_AFTER = r"(?![\w+#]|\.\w)"
+YEARS_PATTERN = re.compile(r"(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?years?", re.IGNORECASE)
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """One regex alternation shaped like a trie, so matching never backtracks over shared prefixes"""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if terminal else body
+
+    return build(trie)
+
+
+def compile_dictionary(skills: Dict[str, List[str]]):
+    """Compile a skill dictionary into (pattern, spelling -> canonical name)"""
+    canonical = {}
+    for name, aliases in skills.items():
+        for spelling in [name, *aliases]:
+            canonical[spelling.lower()] = name
+    pattern = re.compile(_BOUNDARY_BEFORE + "(" + _trie_pattern(canonical) + ")" + _BOUNDARY_AFTER, re.IGNORECASE)
+    return pattern, canonical
+
+
+SKILL_PATTERN, CANONICAL_SKILLS = compile_dictionary(SKILLS)
+DEGREE_PATTERN, _ = compile_dictionary({degree: [] for degree in DEGREE_LEVELS})
+
+
+def extract_skills(text: str) -> Counter:
+    """Canonical skills mentioned in a text, with mention counts"""
+    return Counter(CANONICAL_SKILLS[match.lower()] for match in SKILL_PATTERN.findall(text))
+
+
+def years_of_experience(text: str) -> Optional[int]:
+    """Largest "N years" figure in a text, if any"""
+    years = [int(value) for value in YEARS_PATTERN.findall(text)]
+    return max(years) if years else None
+
+
+def degree_level(text: str) -> int:
+    """Highest degree level mentioned in a text (0 if none)"""
+    return max((DEGREE_LEVELS[match.lower()] for match in DEGREE_PATTERN.findall(text)), default=0)
+
+
+class SkillScorer:
+    """Deterministic resume/job scoring from skill-dictionary overlap
+
+    Produces the same fields as an LLM analysis in a few milliseconds, for
+    instant previews, `mode=fast` requests and as a fallback when the LLM call
+    fails.
+    """
+
+    MODEL_NAME = "local-skill-overlap"
+
+    def score(self, resume_text: str, job_description: str) -> Dict[str, Any]:
+        """Score a resume against a job description by the job's skills the resume mentions"""
+        resume_skills = extract_skills(resume_text)
+        job_skills = extract_skills(job_description)
+
+        # Skills the job mentions more often count for more
+        required = job_skills.most_common()
+        total_weight = sum(count for _, count in required)
+        matched = [skill for skill, _ in required if skill in resume_skills]
+        missing = [skill for skill, _ in required if skill not in resume_skills]
+        matched_weight = sum(count for skill, count in required if skill in resume_skills)
+        match_score = round(100 * matched_weight / total_weight) if total_weight else 0
+
+        experience_match, experience_gap = self._compare_experience(resume_text, job_description)
+        education_match, education_gap = self._compare_education(resume_text, job_description)
+        if experience_gap:
+            match_score = max(0, match_score - 10)
+        if education_gap:
+            match_score = max(0, match_score - 5)
+
+        if match_score >= 70:
+            recommendation = "APPLY"
+        elif match_score >= 40:
+            recommendation = "DECENT_CHANCE"
+        else:
+            recommendation = "AVOID"
+
+        weaknesses = [f"No mention of {skill}" for skill in missing[:5]]
+        weaknesses += [gap for gap in (experience_gap, education_gap) if gap]
+
+        return {
+            "recommendation": recommendation,
+            "match_score": match_score,
+            # Few recognizable skills in the job means little to go on
+            "confidence_score": min(80, 20 + 5 * len(required)),
+            "strengths": matched,
+            "weaknesses": weaknesses,
+            "missing_skills": missing,
+            "experience_match": experience_match,
+            "education_match": education_match,
+            "detailed_reasoning": (
+                f"Resume covers {len(matched)} of {len(required)} skills found in the job description"
+                + (f" ({', '.join(matched[:10])})" if matched else "")
+                + (f"; missing {', '.join(missing[:10])}." if missing else ".")
+            ),
+            "analysis_timestamp": datetime.now().isoformat(),
+            "ai_model": self.MODEL_NAME,
+            "processing_status": "success"
+        }
+
+    @staticmethod
+    def _compare_experience(resume_text: str, job_description: str):
+        required = years_of_experience(job_description)
+        stated = years_of_experience(resume_text)
+        if required is None:
+            return "No experience requirement found", None
+        if stated is None:
+            return f"Job asks for {required}+ years; resume does not state years of experience", None
+        if stated >= required:
+            return f"Resume states {stated} years against {required}+ required", None
+        return (f"Resume states {stated} years against {required}+ required",
+                f"{required - stated} years short of the experience requirement")
+
+    @staticmethod
+    def _compare_education(resume_text: str, job_description: str):
+        required = degree_level(job_description)
+        held = degree_level(resume_text)
+        if not required:
+            return "No degree requirement found", None
+        if held >= required:
+            return f"Job asks for {DEGREE_NAMES[required]}; resume meets it", None
+        if not held:
+            return f"Job asks for {DEGREE_NAMES[required]}; no degree found in resume", None
+        return (f"Job asks for {DEGREE_NAMES[required]}; resume shows {DEGREE_NAMES[held]}",
+                f"Job asks for {DEGREE_NAMES[required]}")
@@ -0,0 +1,337 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from concurrency import run_io
+
+DEFAULT_QUEUE_PATH = "uploads/task_queue.db"
+TASK_STATUSES = ("queued", "running", "succeeded", "failed")
+
+
+def new_task(kind: str, payload: Dict[str, Any], max_attempts: int) -> Dict[str, Any]:
+    now = time.time()
+    return {
+        "task_id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "queued",
+        "payload": payload,
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "created": now,
+        "updated": now,
+        "available_at": now,
+        "lease_until": None,
+        "expires": None
+    }
+
+
+class MemoryTaskStore:
+    """Task storage in a dict; tasks live and die with the worker process"""
+
+    def __init__(self):
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, task: Dict[str, Any]):
+        with self._lock:
+            self._tasks[task["task_id"]] = dict(task)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Mark the oldest runnable task running and return it"""
+        now = time.time()
+        with self._lock:
+            runnable = [
+                task for task in self._tasks.values()
+                if (task["status"] == "queued" and task["available_at"] <= now)
+                # A running task whose lease ran out belonged to a worker that died
+                or (task["status"] == "running" and task["lease_until"] <= now)
+            ]
+            if not runnable:
+                return None
+            task = min(runnable, key=lambda t: t["available_at"])
+            task.update(status="running", attempts=task["attempts"] + 1, updated=now,
+                        lease_until=now + lease_seconds)
+            return dict(task)
+
+    def update(self, task_id: str, **fields):
+        with self._lock:
+            if task_id in self._tasks:
+                self._tasks[task_id].update(fields, updated=time.time())
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [task_id for task_id, task in self._tasks.items()
+                       if task["expires"] is not None and task["expires"] <= now]
+            for task_id in expired:
+                del self._tasks[task_id]
+            return len(expired)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {status: sum(1 for task in self._tasks.values() if task["status"] == status)
+                    for status in TASK_STATUSES}
+
+
+class SQLiteTaskStore:
+    """Task storage in SQLite, shared by every worker process on the host"""
+
+    JSON_FIELDS = ("payload", "result")
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.environ.get("TASK_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL,
+                    max_attempts INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_until REAL,
+                    expires REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_runnable ON tasks (status, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_expires ON tasks (expires)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _row_to_task(self, row: sqlite3.Row) -> Dict[str, Any]:
+        task = dict(row)
+        for field in self.JSON_FIELDS:
+            if task[field] is not None:
+                task[field] = json.loads(task[field])
+        return task
+
+    def create(self, task: Dict[str, Any]):
+        row = dict(task)
+        for field in self.JSON_FIELDS:
+            row[field] = json.dumps(row[field]) if row[field] is not None else None
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        with self._connect() as conn:
+            conn.execute(f"INSERT INTO tasks ({columns}) VALUES ({placeholders})", list(row.values()))
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Mark the oldest runnable task running and return it"""
+        now = time.time()
+        runnable = (
+            "SELECT * FROM tasks "
+            "WHERE (status = 'queued' AND available_at <= ?) "
+            "OR (status = 'running' AND lease_until <= ?) "
+            "ORDER BY available_at LIMIT 1"
+        )
+        with self._connect() as conn:
+            # Idle polls stay read-only
+            if conn.execute(runnable, (now, now)).fetchone() is None:
+                return None
+            # Take the write lock before re-reading so two workers can't claim the same task
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(runnable, (now, now)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE tasks SET status = 'running', attempts = attempts + 1, updated = ?, lease_until = ? "
+                    "WHERE task_id = ?",
+                    (now, now + lease_seconds, row["task_id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        task = self._row_to_task(row)
+        task.update(status="running", attempts=task["attempts"] + 1, updated=now, lease_until=now + lease_seconds)
+        return task
+
+    def update(self, task_id: str, **fields):
+        for field in self.JSON_FIELDS:
+            if field in fields and fields[field] is not None:
+                fields[field] = json.dumps(fields[field])
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE tasks SET {assignments} WHERE task_id = ?", [*fields.values(), task_id])
+
+    def purge_expired(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM tasks WHERE expires IS NOT NULL AND expires <= ?", (time.time(),)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {status: 0 for status in TASK_STATUSES}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+
+def create_task_store():
+    """Task store selected by TASK_QUEUE_BACKEND ("sqlite" or "memory")"""
+    backend = os.environ.get("TASK_QUEUE_BACKEND", "sqlite").lower()
+    if backend == "memory":
+        return MemoryTaskStore()
+    if backend == "sqlite":
+        return SQLiteTaskStore()
+    raise ValueError(f"Unknown TASK_QUEUE_BACKEND: {backend}")
+
+
+# handler(payload, last_attempt) -> JSON-serializable result; raising retries the task
+TaskHandler = Callable[[Dict[str, Any], bool], Awaitable[Any]]
+
+
+class TaskQueue:
+    """Background task queue drained by a fixed number of worker coroutines
+
+    Each attempt runs under a timeout; failures are retried with exponential
+    backoff until max_attempts, and finished tasks expire after result_ttl.
+    """
+
+    def __init__(self, store, handlers: Dict[str, TaskHandler], workers: Optional[int] = None,
+                 timeout: Optional[float] = None, max_attempts: Optional[int] = None,
+                 result_ttl: Optional[int] = None, poll_interval: float = 1.0):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers or int(os.environ.get("TASK_WORKERS", "4"))
+        self.timeout = timeout or float(os.environ.get("TASK_TIMEOUT", "300"))
+        self.max_attempts = max_attempts or int(os.environ.get("TASK_MAX_ATTEMPTS", "3"))
+        self.result_ttl = result_ttl or int(os.environ.get("TASK_RESULT_TTL", str(24 * 3600)))
+        # Tasks submitted by other processes, or due for retry, are picked up on the next poll
+        self.poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+        self._worker_tasks: List[asyncio.Task] = []
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a task and return it"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown task kind: {kind}")
+        task = new_task(kind, payload, self.max_attempts)
+        await run_io(self.store.create, task)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return task
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return await run_io(self.store.get, task_id)
+
+    async def start(self):
+        """Start the worker coroutines"""
+        self._wakeup = asyncio.Event()
+        await run_io(self.store.purge_expired)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    @property
+    def running(self) -> bool:
+        return any(not worker.done() for worker in self._worker_tasks)
+
+    async def stop(self):
+        """Cancel the workers; tasks they were running are retried once their lease lapses"""
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def _worker(self):
+        while True:
+            try:
+                task = await run_io(self.store.claim, self.timeout + 30)
+            except Exception as e:
+                print(f"Task queue claim failed: {str(e)}")
+                task = None
+            if task is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    await self._purge_occasionally()
+                continue
+            try:
+                await self._run(task)
+            except Exception as e:
+                # The task keeps its lease and is retried once it lapses; the worker carries on
+                print(f"Task queue failed to record task {task['task_id']}: {str(e)}")
+
+    async def _purge_occasionally(self):
+        if time.time() - self._last_purge < 60:
+            return
+        self._last_purge = time.time()
+        try:
+            await run_io(self.store.purge_expired)
+        except Exception as e:
+            print(f"Task queue purge failed: {str(e)}")
+
+    async def _run(self, task: Dict[str, Any]):
+        handler = self.handlers.get(task["kind"])
+        if handler is None:
+            await run_io(self.store.update, task["task_id"], status="failed",
+                         error=f"Unknown task kind: {task['kind']}",
+                         lease_until=None, expires=time.time() + self.result_ttl)
+            return
+        last_attempt = task["attempts"] >= task["max_attempts"]
+        try:
+            result = await asyncio.wait_for(handler(task["payload"], last_attempt), self.timeout)
+        except Exception as e:
+            error = f"Timed out after {self.timeout:.0f}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+            if last_attempt:
+                await run_io(self.store.update, task["task_id"], status="failed", error=error,
+                             lease_until=None, expires=time.time() + self.result_ttl)
+            else:
+                backoff = min(60, 2 ** task["attempts"])
+                await run_io(self.store.update, task["task_id"], status="queued", error=error,
+                             lease_until=None, available_at=time.time() + backoff)
+            return
+        await run_io(self.store.update, task["task_id"], status="succeeded", result=result, error=None,
+                     lease_until=None, expires=time.time() + self.result_ttl)
+
+
+def public_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Task fields returned by the API"""
+    return {
+        "task_id": task["task_id"],
+        "kind": task["kind"],
+        "status": task["status"],
+        "attempts": task["attempts"],
+        "max_attempts": task["max_attempts"],
+        "created": task["created"],
+        "updated": task["updated"],
+        "error": task["error"],
+        "result": task["result"]
+    }
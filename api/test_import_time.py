@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# `import main` must stay under this many milliseconds (python -X importtime, cumulative)
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "2000"))
+# Heavy dependencies that are only loaded on first use, never at import
+LAZY_MODULES = ("langchain", "openai", "boto3", "aiobotocore", "tiktoken", "PyPDF2", "docx")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+API_DIR = Path(__file__).resolve().parent
+
+
+def measure_import(module: str = "main") -> Dict:
+    """Import a module in a fresh interpreter with -X importtime; returns totals and per-package times"""
+    with tempfile.TemporaryDirectory() as scratch:
+        # Throwaway settings: importing main opens its local indexes and caches
+        env = {
+            **os.environ,
+            "S3_BUCKET_NAME": os.environ.get("S3_BUCKET_NAME", "import-time-check"),
+            "METADATA_INDEX_PATH": f"{scratch}/metadata.db",
+            "ANALYSIS_CACHE_PATH": f"{scratch}/analysis_cache.db",
+            "TASK_QUEUE_PATH": f"{scratch}/tasks.db",
+            "JOB_VECTOR_INDEX_PATH": f"{scratch}/job_vectors.npz",
+            "TEXT_CACHE_DIR": f"{scratch}/text_cache",
+        }
+        env.pop("OPENAI_API_KEY", None)
+        code = f"import sys, json; import {module}; print(json.dumps(sorted(sys.modules)))"
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=API_DIR, env=env, capture_output=True, text=True
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise Exception(f"import {module} failed: {result.stderr[-2000:]}")
+
+    total_us = 0
+    packages: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        if depth == 0:
+            total_us += cumulative
+        # First-level imports of the module, and what they cost including their own imports
+        if depth == 1:
+            packages[name] = packages.get(name, 0) + cumulative
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "wall_ms": round(wall_ms, 1),
+        "imports_ms": {
+            name: round(us / 1000, 1) for name, us in sorted(packages.items(), key=lambda item: -item[1])
+        },
+        "lazy_modules_loaded": [name for name in LAZY_MODULES if name in loaded]
+    }
+
+
+def print_report(report: Dict, top: int = 15):
+    print(f"⏱️  import {report['module']}: {report['total_ms']}ms "
+          f"(budget {IMPORT_BUDGET_MS:.0f}ms, {report['wall_ms']}ms wall incl. interpreter start)")
+    for name, ms in list(report["imports_ms"].items())[:top]:
+        print(f"   {ms:8.1f}ms  {name}")
+
+
+def test_import_time():
+    """main imports within budget and leaves heavy dependencies for first use"""
+    report = measure_import()
+    print_report(report)
+    assert not report["lazy_modules_loaded"], (
+        f"Imported at startup, should load on first use: {', '.join(report['lazy_modules_loaded'])}"
+    )
+    assert report["total_ms"] <= IMPORT_BUDGET_MS, (
+        f"import main took {report['total_ms']}ms, over the {IMPORT_BUDGET_MS:.0f}ms budget"
+    )
+
+
+def compare(report: Dict, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())
+    delta = report["total_ms"] - baseline["total_ms"]
+    print(f"\nvs {baseline_path}: {baseline['total_ms']}ms -> {report['total_ms']}ms ({delta:+.1f}ms)")
+    names: List[str] = list(dict.fromkeys([*report["imports_ms"], *baseline["imports_ms"]]))
+    for name in names:
+        before, after = baseline["imports_ms"].get(name, 0), report["imports_ms"].get(name, 0)
+        if abs(after - before) >= 5:
+            print(f"   {after - before:+8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure and track the import time of the API")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15, help="Slowest first-level imports to show")
+    parser.add_argument("--save", action="store_true", help="Write the report to benchmark-results/")
+    parser.add_argument("--compare", help="An earlier saved report to diff against")
+    args = parser.parse_args()
+
+    result = measure_import(args.module)
+    print_report(result, args.top)
+    if result["lazy_modules_loaded"]:
+        print(f"❌ Imported at startup: {', '.join(result['lazy_modules_loaded'])}")
+    if args.compare:
+        compare(result, args.compare)
+    if args.save:
+        output = Path(f"benchmark-results/importtime-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2))
+        print(f"\n💾 Saved {output}")
+    ok = not result["lazy_modules_loaded"] and result["total_ms"] <= IMPORT_BUDGET_MS
+    print("\n🎉 Within the import budget." if ok else f"\n❌ Over the {IMPORT_BUDGET_MS:.0f}ms import budget.")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,48 @@
+from prompt_builder import TRUNCATION_MARKER, PromptBuilder, _approximate_tokens
+
+
+def approx_builder() -> PromptBuilder:
+    """A builder counting with the offline estimate, so the test needs no tiktoken download"""
+    builder = PromptBuilder("gpt-3.5-turbo")
+    builder._count_tokens = _approximate_tokens
+    return builder
+
+
+def test_single_line_document_is_cut_not_dropped():
+    """A document extracted as one long line keeps as much text as the budget allows"""
+    print("🧪 Testing truncation of a single-line resume...")
+    builder = approx_builder()
+    text = " ".join(["python developer with experience"] * 2000)
+
+    fitted, report = builder.fit_document(text, "resume", 300)
+
+    print(f"   {report['original_tokens']} tokens -> {report['tokens']}")
+    assert report["truncated"]
+    assert report["tokens"] <= 300
+    assert report["tokens"] > 250, f"Only {report['tokens']} of 300 tokens used"
+    assert fitted.startswith("python developer with experience")
+    assert fitted.endswith(TRUNCATION_MARKER)
+    # Cut at a word boundary
+    assert fitted[:-len(TRUNCATION_MARKER)].rstrip().endswith(("python", "developer", "with", "experience"))
+    print("✅ Single-line resume cut to the budget")
+
+
+def test_multi_line_section_is_cut_at_the_line_that_overflows():
+    """Whole lines are kept first; only the overflowing line is cut"""
+    builder = approx_builder()
+    lines = [f"Built service number {i} in python and go for the payments team" for i in range(200)]
+
+    fitted, report = builder.fit_document("\n".join(lines), "resume", 200)
+
+    kept = fitted.split("\n")
+    assert report["tokens"] <= 200
+    assert kept[:-2] == lines[:len(kept) - 2]
+    # The overflowing line is kept in part
+    assert lines[len(kept) - 2].startswith(kept[-2])
+    assert kept[-1] == TRUNCATION_MARKER
+    print("✅ Multi-line section cut at the overflowing line")
+
+
+if __name__ == "__main__":
+    test_single_line_document_is_cut_not_dropped()
+    test_multi_line_section_is_cut_at_the_line_that_overflows()
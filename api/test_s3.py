@@ -1,3 +1,4 @@
+import asyncio
 import os
 from s3_service import S3Service
 
@@ -64,5 +65,50 @@ def test_s3_connection():
         print("   - S3_BUCKET_NAME")
         return False
 
+def test_async_s3_connection():
+    """Run the same round trip through the aiobotocore backend"""
+    print("🧪 Testing async S3 backend...")
+
+    async def round_trip():
+        from async_s3_service import AsyncS3Service
+        s3_service = AsyncS3Service()
+        try:
+            test_content = b"This is a test file for async S3 integration"
+            result = await s3_service.upload_file(
+                file_content=test_content,
+                s3_key="test/async_test_file.txt",
+                original_filename="async_test_file.txt",
+                file_type="test"
+            )
+            if not result["success"]:
+                raise Exception(result["error"])
+
+            # Overlap several in-flight requests on the shared connection pool
+            downloads = await asyncio.gather(
+                *(s3_service.download_file("test/async_test_file.txt") for _ in range(20))
+            )
+            if any(content != test_content for content in downloads):
+                raise Exception("Downloaded content doesn't match original")
+            print("✅ 20 concurrent downloads matched the upload")
+
+            files = await s3_service.list_files("test/")
+            print(f"✅ Found {len(files)} files in test/")
+
+            await s3_service.delete_file("test/async_test_file.txt")
+            print("✅ Test file deleted successfully")
+        finally:
+            await s3_service.close()
+
+    try:
+        asyncio.run(round_trip())
+        print("\n🎉 Async S3 backend is working correctly.")
+        return True
+    except Exception as e:
+        print(f"❌ Async S3 backend failed: {e}")
+        print("\n💡 To test against a local stand-in, run `moto_server -p 5000`, create the bucket and set")
+        print("   S3_ENDPOINT_URL=http://localhost:5000")
+        return False
+
 if __name__ == "__main__":
     test_s3_connection()
+    test_async_s3_connection()
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from metrics import count_cache
+
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 of a document's raw bytes"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class TextCache:
+    """Extracted-text cache keyed by content hash
+
+    A size-bounded in-process LRU sits in front of an optional on-disk tier.
+    A second map from (S3 key, ETag) to content hash lets callers skip the S3
+    GET entirely when the object hasn't changed.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, disk_dir: Optional[str] = None,
+                 disk_max_bytes: Optional[int] = None, max_aliases: int = 100_000):
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.environ.get("TEXT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+        )
+        disk_dir = disk_dir if disk_dir is not None else os.environ.get("TEXT_CACHE_DIR")
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes if disk_max_bytes is not None else int(
+            os.environ.get("TEXT_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024))
+        )
+        self.max_aliases = max_aliases
+
+        # content hash -> (text, size in bytes)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._aliases: "OrderedDict[tuple, str]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "alias_hits": 0,
+            "alias_misses": 0,
+            "evictions": 0,
+            "disk_evictions": 0
+        }
+
+        self._disk_bytes = 0
+        if self.disk_dir:
+            (self.disk_dir / "text").mkdir(parents=True, exist_ok=True)
+            (self.disk_dir / "aliases").mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    @staticmethod
+    def _entry_size(text: str) -> int:
+        # Close enough to the in-memory footprint without calling sys.getsizeof
+        return len(text.encode("utf-8"))
+
+    def get(self, digest: str) -> Optional[str]:
+        """Return cached text for a content hash, checking memory then disk"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self._stats["memory_hits"] += 1
+                count_cache("text", True)
+                return entry[0]
+
+        text = self._read_disk(digest)
+        with self._lock:
+            if text is None:
+                self._stats["misses"] += 1
+                count_cache("text", False)
+                return None
+            self._stats["disk_hits"] += 1
+            count_cache("text", True)
+            self._store_memory(digest, text)
+        return text
+
+    def put(self, digest: str, text: str):
+        """Cache the extracted text for a content hash in both tiers"""
+        with self._lock:
+            self._store_memory(digest, text)
+        self._write_disk(digest, text)
+
+    def _store_memory(self, digest: str, text: str):
+        size = self._entry_size(text)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(digest, None)
+        if previous is not None:
+            self._current_bytes -= previous[1]
+        self._entries[digest] = (text, size)
+        self._current_bytes += size
+        while self._current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._current_bytes -= evicted_size
+            self._stats["evictions"] += 1
+
+    def lookup_alias(self, s3_key: str, etag: Optional[str]) -> Optional[str]:
+        """Return the content hash last seen for this S3 key and ETag"""
+        if not etag:
+            return None
+        alias = (s3_key, etag)
+        with self._lock:
+            digest = self._aliases.get(alias)
+            if digest is not None:
+                self._aliases.move_to_end(alias)
+                self._stats["alias_hits"] += 1
+                return digest
+
+        digest = self._read_disk_alias(s3_key, etag)
+        with self._lock:
+            if digest is None:
+                self._stats["alias_misses"] += 1
+                return None
+            self._stats["alias_hits"] += 1
+            self._store_alias(alias, digest)
+        return digest
+
+    def add_alias(self, s3_key: str, etag: Optional[str], digest: str):
+        """Remember which content hash an S3 key and ETag refer to"""
+        if not etag:
+            return
+        with self._lock:
+            self._store_alias((s3_key, etag), digest)
+        if self.disk_dir:
+            self._alias_path(s3_key, etag).write_text(digest)
+
+    def _store_alias(self, alias: tuple, digest: str):
+        self._aliases[alias] = digest
+        self._aliases.move_to_end(alias)
+        while len(self._aliases) > self.max_aliases:
+            self._aliases.popitem(last=False)
+
+    def _text_path(self, digest: str) -> Path:
+        return self.disk_dir / "text" / f"{digest}.json"
+
+    def _alias_path(self, s3_key: str, etag: str) -> Path:
+        name = hashlib.sha1(f"{s3_key}\0{etag}".encode()).hexdigest()
+        return self.disk_dir / "aliases" / name
+
+    def _read_disk(self, digest: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        path = self._text_path(digest)
+        try:
+            text = json.loads(path.read_text(encoding="utf-8"))["text"]
+            # Refresh mtime so disk eviction approximates LRU
+            os.utime(path)
+            return text
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _read_disk_alias(self, s3_key: str, etag: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        try:
+            return self._alias_path(s3_key, etag).read_text().strip() or None
+        except OSError:
+            return None
+
+    def _write_disk(self, digest: str, text: str):
+        if not self.disk_dir:
+            return
+        path = self._text_path(digest)
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        payload = json.dumps({"text": text})
+        temp_path.write_text(payload, encoding="utf-8")
+        os.replace(temp_path, path)
+        with self._lock:
+            self._disk_bytes += len(payload)
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        # Only scan the directory once the running estimate crosses the budget
+        if over_budget:
+            self._evict_disk()
+
+    def _disk_files(self):
+        files = []
+        for path in (self.disk_dir / "text").glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict_disk(self):
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        # Evict down to 90% so the next few writes don't trigger another scan
+        target = self.disk_max_bytes * 0.9
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats["disk_evictions"] += 1
+        with self._lock:
+            self._disk_bytes = total
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current memory usage"""
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "aliases": len(self._aliases),
+                "disk_enabled": self.disk_dir is not None
+            }
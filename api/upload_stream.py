@@ -0,0 +1,266 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from python_multipart.multipart import MultipartParser, MultipartState, parse_options_header
+from starlette.requests import ClientDisconnect, Request
+
+from concurrency import run_io_or_await
+
+# S3 requires every part but the last to be at least 5MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+# Room for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+SNIFF_BYTES = 2048
+
+# Leading bytes each file type must start with; .txt is checked by decoding instead
+MAGIC_NUMBERS = {
+    ".pdf": (b"%PDF-",),
+    ".docx": (b"PK\x03\x04",),
+    ".doc": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),
+}
+
+
+class UploadRejected(Exception):
+    """An upload refused before or while it streamed; maps straight onto an HTTP error"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def check_filename(filename: str, allowed_extensions) -> str:
+    """Reject a missing or disallowed filename; returns its lowercased extension"""
+    if not filename:
+        raise UploadRejected(400, "No file uploaded")
+    extension = Path(filename).suffix.lower()
+    if extension not in allowed_extensions:
+        raise UploadRejected(400, f"File type not allowed. Allowed types: {', '.join(allowed_extensions)}")
+    return extension
+
+
+def size_limit_error(max_bytes: int) -> UploadRejected:
+    return UploadRejected(413, f"File too large. Maximum size: {max_bytes // (1024*1024)}MB")
+
+
+def sniff_matches(head: bytes, extension: str) -> bool:
+    """Whether a file's first bytes look like the type its extension claims"""
+    if extension == ".txt":
+        if b"\x00" in head:
+            return False
+        try:
+            head.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # The sample may end partway through a multi-byte character
+            return e.start >= len(head) - 3 and e.reason == "unexpected end of data"
+        return True
+    return head.startswith(MAGIC_NUMBERS.get(extension, (b"",)))
+
+
+class S3StreamWriter:
+    """Send a file to S3 as it arrives: one PUT if it fits in a part, a multipart upload otherwise
+
+    At most one part is buffered at a time. With `deduplicate`, a file whose
+    SHA-256 matches a document already under the same prefix is not stored
+    (a started multipart upload is aborted) and the existing document is
+    returned instead.
+    """
+
+    def __init__(self, s3_service, s3_key: str, original_filename: str, file_type: str, part_size: int,
+                 deduplicate: bool = False):
+        self.s3_service = s3_service
+        self.s3_key = s3_key
+        self.prefix = s3_key.split("/", 1)[0] + "/"
+        self.deduplicate = deduplicate
+        self.original_filename = original_filename
+        self.file_type = file_type
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.buffer = bytearray()
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.upload_id: Optional[str] = None
+        self.parts: List[Dict] = []
+
+    async def write(self, data: bytes):
+        self.buffer += data
+        self.size += len(data)
+        self.sha256.update(data)
+        # Keep the tail buffered: until the body ends we don't know if it is the last part
+        while len(self.buffer) > self.part_size:
+            await self._send_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+
+    async def _send_part(self, body: bytes):
+        if self.upload_id is None:
+            self.upload_id = await run_io_or_await(
+                self.s3_service.start_multipart_upload, self.s3_key, self.original_filename, self.file_type
+            )
+        part = await run_io_or_await(
+            self.s3_service.upload_part, self.s3_key, self.upload_id, len(self.parts) + 1, body
+        )
+        self.parts.append(part)
+
+    async def finish(self) -> Dict[str, Any]:
+        """Complete the upload; small files are returned as `content` so callers can reuse them"""
+        content_hash = self.sha256.hexdigest()
+        if self.deduplicate:
+            existing = await run_io_or_await(self.s3_service.find_duplicate, self.prefix, content_hash)
+            if existing is not None:
+                await self.abort()
+                return {
+                    "success": True,
+                    "duplicate": True,
+                    "s3_key": existing["filename"],
+                    "original_filename": existing["original_filename"],
+                    "file_size": existing["size"],
+                    "content": None,
+                    "content_hash": content_hash
+                }
+
+        if self.upload_id is None:
+            content = bytes(self.buffer)
+            result = await run_io_or_await(
+                self.s3_service.upload_file,
+                file_content=content,
+                s3_key=self.s3_key,
+                original_filename=self.original_filename,
+                file_type=self.file_type,
+                content_hash=content_hash
+            )
+            result["content"] = content
+        else:
+            if self.buffer:
+                await self._send_part(bytes(self.buffer))
+                self.buffer = bytearray()
+            result = await run_io_or_await(
+                self.s3_service.complete_multipart_upload, self.s3_key, self.upload_id, self.parts,
+                self.original_filename, self.file_type, self.size, content_hash
+            )
+            result["content"] = None
+        result.update(duplicate=False, original_filename=self.original_filename, file_size=self.size,
+                      content_hash=content_hash)
+        return result
+
+    async def abort(self):
+        if self.upload_id is not None:
+            await run_io_or_await(self.s3_service.abort_multipart_upload, self.s3_key, self.upload_id)
+
+
+class _PartCollector:
+    """python-multipart callbacks that queue parsed events for the async upload loop"""
+
+    def __init__(self):
+        self.events: List[tuple] = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": lambda data, start, end: self._append("_header_field", data[start:end]),
+            "on_header_value": lambda data, start, end: self._append("_header_value", data[start:end]),
+            "on_header_end": self._header_end,
+            "on_headers_finished": lambda: self.events.append(("headers", self._headers)),
+            "on_part_data": lambda data, start, end: self.events.append(("data", bytes(data[start:end]))),
+            "on_part_end": lambda: self.events.append(("end", None)),
+        }
+
+    def _append(self, attribute: str, data: bytes):
+        setattr(self, attribute, getattr(self, attribute) + data)
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+
+async def stream_upload(request: Request, s3_service, prefix: str, file_type: str,
+                        allowed_extensions, max_bytes: int, part_size: Optional[int] = None,
+                        deduplicate: bool = False) -> Dict[str, Any]:
+    """
+    Stream the `file` field of a multipart request straight to S3
+
+    The extension is checked as soon as the part headers arrive, the content
+    type from its first bytes, and the size on every chunk, so bad uploads are
+    refused without reading the rest of the body.
+
+    Returns:
+        upload_file's result plus s3_key, filename, original_filename,
+        file_size, content_hash, duplicate, and content (None for multipart
+        uploads and duplicates); a duplicate carries the existing document's
+        key, name and size
+    """
+    part_size = part_size or int(os.environ.get("S3_MULTIPART_PART_SIZE", str(8 * 1024 * 1024)))
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise size_limit_error(max_bytes)
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise UploadRejected(400, "Expected a multipart/form-data upload")
+
+    collector = _PartCollector()
+    parser = MultipartParser(options[b"boundary"], collector.callbacks())
+    writer: Optional[S3StreamWriter] = None
+    in_file_part = False
+    head = bytearray()
+    extension = ""
+    original_filename = ""
+    file_complete = False
+
+    async def start_writer():
+        nonlocal writer
+        if not sniff_matches(bytes(head), extension):
+            raise UploadRejected(400, f"File content does not match its {extension} extension")
+        s3_key = f"{prefix}{uuid.uuid4()}{extension}"
+        writer = S3StreamWriter(s3_service, s3_key, original_filename, file_type, part_size, deduplicate)
+        await writer.write(bytes(head))
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            events, collector.events = collector.events, []
+            for event, value in events:
+                if event == "headers":
+                    _, disposition = parse_options_header(value.get(b"content-disposition", b""))
+                    in_file_part = disposition.get(b"name") == b"file" and not file_complete
+                    if in_file_part:
+                        original_filename = Path(disposition.get(b"filename", b"").decode("utf-8", "replace")).name
+                        extension = check_filename(original_filename, allowed_extensions)
+                elif event == "data" and in_file_part:
+                    if (writer.size if writer else len(head)) + len(value) > max_bytes:
+                        raise size_limit_error(max_bytes)
+                    if writer is None:
+                        head.extend(value)
+                        if len(head) >= SNIFF_BYTES:
+                            await start_writer()
+                    else:
+                        await writer.write(value)
+                elif event == "end" and in_file_part:
+                    if writer is None:
+                        await start_writer()
+                    file_complete = True
+                    in_file_part = False
+        # The upload is only committed once the whole body has been parsed, so a
+        # request cut off after the file part doesn't leave a stored document
+        parser.finalize()
+        if parser.state != MultipartState.END:
+            raise UploadRejected(400, "Incomplete multipart body")
+        if not file_complete:
+            raise UploadRejected(400, "No file uploaded")
+        result = await writer.finish()
+    except (Exception, ClientDisconnect):
+        if writer is not None:
+            await writer.abort()
+        raise
+
+    if result["success"]:
+        result["filename"] = Path(result["s3_key"]).name
+    return result
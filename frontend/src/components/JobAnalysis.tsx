@@ -30,6 +30,9 @@ const JobAnalysis: React.FC = () => {
   const [selectedJob, setSelectedJob] = useState<string>("");
   const [loading, setLoading] = useState(false);
   const [analysis, setAnalysis] = useState<AnalysisResult | null>(null);
+  const [preview, setPreview] = useState<AnalysisResult | null>(null);
+  const [progress, setProgress] = useState<string>("");
+  const [streamedText, setStreamedText] = useState<string>("");
   const [error, setError] = useState<string>("");
 
   const API_URL = "/api";
@@ -41,13 +44,16 @@ const JobAnalysis: React.FC = () => {
 
   const fetchFiles = async () => {
     try {
-      // Fetch resumes
-      const resumeResponse = await fetch(`${API_URL}/resumes/`);
+      // Newest first; the API answers unchanged listings with 304 via ETag
+      const listingQuery = "?limit=200&sort=created&order=desc";
+      const [resumeResponse, jobResponse] = await Promise.all([
+        fetch(`${API_URL}/resumes/${listingQuery}`),
+        fetch(`${API_URL}/job-descriptions/${listingQuery}`),
+      ]);
+
       const resumeData = await resumeResponse.json();
       setResumes(resumeData.resumes || []);
 
-      // Fetch job descriptions
-      const jobResponse = await fetch(`${API_URL}/job-descriptions/`);
       const jobData = await jobResponse.json();
       setJobDescriptions(jobData.job_descriptions || []);
     } catch (err) {
@@ -64,28 +70,72 @@ const JobAnalysis: React.FC = () => {
     setLoading(true);
     setError("");
     setAnalysis(null);
+    setPreview(null);
+    setStreamedText("");
+    setProgress("Reading documents...");
 
     try {
       const formData = new FormData();
       formData.append("resume_filename", selectedResume);
       formData.append("job_filename", selectedJob);
 
-      const response = await fetch(`${API_URL}/analyze-job-match/`, {
+      // Server-Sent Events over a POST, so read the body stream directly
+      const response = await fetch(`${API_URL}/analyze-job-match/stream`, {
         method: "POST",
         body: formData,
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errorData = await response.json();
         throw new Error(errorData.detail || "Analysis failed");
       }
 
-      const data = await response.json();
-      setAnalysis(data.analysis);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let finished = false;
+
+      while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary = buffer.indexOf("\n\n");
+        while (boundary !== -1) {
+          const message = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          boundary = buffer.indexOf("\n\n");
+
+          let event = "message";
+          let data = "";
+          for (const line of message.split("\n")) {
+            if (line.startsWith("event: ")) event = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+          }
+          const payload = data ? JSON.parse(data) : {};
+
+          if (event === "document") {
+            setProgress(
+              payload.document === "resume" ? "Resume ready" : "Job description ready"
+            );
+          } else if (event === "preview") {
+            setPreview(payload);
+            setProgress("Generating AI analysis...");
+          } else if (event === "token") {
+            setStreamedText((text) => text + payload.text);
+          } else if (event === "result") {
+            setAnalysis(payload);
+            finished = true;
+          } else if (event === "error") {
+            throw new Error(payload.detail || "Analysis failed");
+          }
+        }
+      }
     } catch (err) {
       setError(err instanceof Error ? err.message : "Analysis failed");
     } finally {
       setLoading(false);
+      setProgress("");
     }
   };
 
@@ -193,6 +243,25 @@ const JobAnalysis: React.FC = () => {
             </div>
           )}
 
+          {/* Live progress while the analysis streams in */}
+          {loading && (
+            <div className="analysis-progress mb-4">
+              {progress && <p className="text-muted mb-2">{progress}</p>}
+              {preview && (
+                <div className="alert alert-light">
+                  <strong>Quick estimate:</strong> {preview.match_score}% skill
+                  match ({preview.recommendation.replace("_", " ")})
+                  {preview.missing_skills.length > 0 && (
+                    <> • Missing: {preview.missing_skills.slice(0, 5).join(", ")}</>
+                  )}
+                </div>
+              )}
+              {streamedText && (
+                <pre className="reasoning-box small text-muted">{streamedText}</pre>
+              )}
+            </div>
+          )}
+
           {/* Analysis Results */}
           {analysis && (
             <div className="analysis-results">
@@ -1,13 +1,5 @@
 import React, { useState } from "react";
-
-interface UploadResponse {
-  message: string;
-  filename: string;
-  original_filename: string;
-  file_size: number;
-  file_path: string;
-  file_type: string;
-}
+import { UploadResponse, uploadDocument } from "../uploadDocument";
 
 const JobDescriptionUpload: React.FC = () => {
   const [file, setFile] = useState<File | null>(null);
@@ -52,21 +44,9 @@ const JobDescriptionUpload: React.FC = () => {
     setLoading(true);
     setError("");
 
-    const formData = new FormData();
-    formData.append("file", file);
-
     try {
-      const response = await fetch(`${API_URL}/upload-job-description/`, {
-        method: "POST",
-        body: formData,
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.detail || "Upload failed");
-      }
-
-      const data: UploadResponse = await response.json();
+      // The file goes straight to S3; the API only signs the upload and registers it
+      const data = await uploadDocument(`${API_URL}/upload-job-description/`, file);
       setResponse(data);
       setFile(null);
 
@@ -114,6 +94,9 @@ const JobDescriptionUpload: React.FC = () => {
         {response && (
           <div className="alert alert-success">
             <h5>Upload Successful!</h5>
+            {response.duplicate && (
+              <p>This file was already uploaded, so the existing copy is used.</p>
+            )}
             <p>
               <strong>File saved as:</strong> {response.filename}
             </p>
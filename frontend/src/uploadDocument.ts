@@ -0,0 +1,78 @@
+export interface UploadResponse {
+  message: string;
+  filename: string;
+  original_filename: string;
+  file_size: number;
+  s3_key: string;
+  file_type: string;
+  duplicate: boolean;
+  content_hash: string | null;
+}
+
+interface PresignedUpload {
+  upload_url: string;
+  method: string;
+  headers: Record<string, string>;
+  s3_key: string;
+}
+
+const errorDetail = async (response: Response, fallback: string) => {
+  try {
+    const data = await response.json();
+    return data.detail || fallback;
+  } catch {
+    return fallback;
+  }
+};
+
+const sha256Hex = async (file: File) => {
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, "0"))
+    .join("");
+};
+
+// Upload straight to S3 with a presigned URL, then register the file with the API.
+// `endpoint` is the proxied upload route, e.g. "/api/upload-resume/". A file the API
+// already has (same SHA-256) isn't uploaded again; the existing copy is returned.
+export const uploadDocument = async (
+  endpoint: string,
+  file: File
+): Promise<UploadResponse> => {
+  const presignForm = new FormData();
+  presignForm.append("filename", file.name);
+  presignForm.append("file_size", String(file.size));
+  presignForm.append("content_sha256", await sha256Hex(file));
+  const presignResponse = await fetch(`${endpoint}presign`, {
+    method: "POST",
+    body: presignForm,
+  });
+  if (!presignResponse.ok) {
+    throw new Error(await errorDetail(presignResponse, "Upload failed"));
+  }
+  const presigned: PresignedUpload | UploadResponse = await presignResponse.json();
+  // A duplicate comes back as a finished upload, with no URL to PUT to
+  if (!("upload_url" in presigned)) {
+    return presigned;
+  }
+
+  const putResponse = await fetch(presigned.upload_url, {
+    method: presigned.method,
+    headers: presigned.headers,
+    body: file,
+  });
+  if (!putResponse.ok) {
+    throw new Error(`Upload to storage failed (${putResponse.status})`);
+  }
+
+  const completeForm = new FormData();
+  completeForm.append("s3_key", presigned.s3_key);
+  const completeResponse = await fetch(`${endpoint}complete`, {
+    method: "POST",
+    body: completeForm,
+  });
+  if (!completeResponse.ok) {
+    throw new Error(await errorDetail(completeResponse, "Upload failed"));
+  }
+  return completeResponse.json();
+};